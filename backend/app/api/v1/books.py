@@ -1,23 +1,32 @@
 # backend/app/api/books.py
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func, desc, asc, text
+from sqlalchemy import and_, func, desc, asc, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
-from app.db import SessionLocal
+from datetime import datetime, timedelta, timezone
+from app.db import get_async_db, get_db
 from app.models import Book
-from app.schemas import BookOut, BookUpdate
+from app.schemas import BookBulkUpdate, BookOut, BookUpdate
+from app.autocomplete import autocomplete
+from app.bulk import InvalidBulkUpdate, apply_bulk_updates, apply_filtered_update
+from app.filters import InvalidFilter, InvalidFilterValue
+from app.cache import cached_response, response_cache
+from app.conditional import conditional_get
+from app.counters import counter_buffer
+from app.facets import InvalidFacets, cached_facet_counts, parse_facets
+from app.search import apply_text_search
+from app.search_engine import enqueue_search_sync, filter_expression, rows_in_order, search_ids_async
+from app.stats import book_facts, read_snapshot, record_book_change
+from app.serializers import InvalidFields, book_serializer, json_response
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("/books", response_model=dict)
-def get_books_paginated(
+@conditional_get("v1_books")
+@cached_response("v1_books")
+async def get_books_paginated(
+    request: Request,
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(20, ge=1, le=100, description="Items per page"),
     search: Optional[str] = Query(None, description="Search in title, author, description"),
@@ -25,73 +34,105 @@ def get_books_paginated(
     language: Optional[str] = Query(None, description="Filter by language"),
     genre: Optional[str] = Query(None, description="Filter by genre"),
     copyright_status: Optional[str] = Query(None, description="Filter by copyright status"),
-    sort_by: str = Query("created_at", description="Sort field"),
+    sort_by: Optional[str] = Query(None, description="Sort field (default: relevance when searching, else created_at)"),
     sort_order: str = Query("desc", description="Sort order: asc or desc"),
     featured_only: bool = Query(False, description="Show only featured books"),
     public_only: bool = Query(True, description="Show only public books"),
-    db: Session = Depends(get_db)
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,title,author,cover_url"),
+    facets: Optional[str] = Query(None, description="Comma-separated facet counts to include, e.g. genre,language,copyright_status,publication_year"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get books with pagination, search, and filtering
     Enhanced version of the original /books endpoint
+    `facets=` adds per-facet value counts over every matching book
     """
     
-    # Base query
-    query = db.query(Book)
+    # Base query - only the requested columns are selected
+    try:
+        serializer = book_serializer.for_fields(fields)
+        facet_names = parse_facets(facets)
+    except (InvalidFields, InvalidFacets) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    query = select(*serializer.columns)
+    
+    offset = (page - 1) * limit
     
     # Apply public filter
     if public_only:
         query = query.filter(Book.is_public == True)
     
     # Apply filters
+    rank = None
     if search:
-        search_filter = or_(
-            Book.title.ilike(f"%{search}%"),
-            Book.author.ilike(f"%{search}%"),
-            Book.description.ilike(f"%{search}%")
-        )
-        query = query.filter(search_filter)
+        query, rank = await db.run_sync(lambda session: apply_text_search(query, session, search))
     
     if author:
         query = query.filter(Book.author.ilike(f"%{author}%"))
     
     if language:
         query = query.filter(Book.language == language)
-        
+    
     if genre:
         query = query.filter(Book.genre.ilike(f"%{genre}%"))
-        
+    
     if copyright_status:
         query = query.filter(Book.copyright_status == copyright_status)
-        
+    
     if featured_only:
         query = query.filter(Book.is_featured == True)
     
-    # Apply sorting
-    if hasattr(Book, sort_by):
-        sort_column = getattr(Book, sort_by)
-        if sort_order.lower() == "desc":
-            query = query.order_by(desc(sort_column))
-        else:
-            query = query.order_by(asc(sort_column))
+    # Relevance-ranked searches with exact-match filters can go to Meilisearch
+    hits = None
+    if search and not author and not genre and sort_by is None:
+        hits = await search_ids_async(search, filter_expression(
+            is_public=True if public_only else None,
+            is_featured=True if featured_only else None,
+            language=language,
+            copyright_status=copyright_status,
+        ), limit, offset)
+    
+    if hits is not None:
+        ids, total_count = hits
+        rows = await db.run_sync(
+            lambda session: rows_in_order(session.query(*serializer.columns, Book.id), ids)
+        )
     else:
-        # Default sort
-        query = query.order_by(desc(Book.created_at))
+        # Apply sorting
+        if sort_by is None and rank is not None:
+            query = query.order_by(desc(rank), desc(Book.created_at))
+        elif sort_by and hasattr(Book, sort_by):
+            sort_column = getattr(Book, sort_by)
+            if sort_order.lower() == "desc":
+                query = query.order_by(desc(sort_column))
+            else:
+                query = query.order_by(asc(sort_column))
+        else:
+            # Default sort
+            query = query.order_by(desc(Book.created_at))
     
-    # Get total count for pagination
-    total_count = query.count()
+        # Get total count for pagination
+        total_count = await db.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
     
-    # Apply pagination
-    offset = (page - 1) * limit
-    books = query.offset(offset).limit(limit).all()
+        # Apply pagination
+        rows = (await db.execute(query.offset(offset).limit(limit))).all()
     
     # Calculate pagination info
     total_pages = (total_count + limit - 1) // limit
     has_next = page < total_pages
     has_prev = page > 1
     
-    return {
-        "books": books,
+    filters = {
+        "search": search,
+        "author": author,
+        "language": language,
+        "genre": genre,
+        "copyright_status": copyright_status,
+        "featured_only": featured_only,
+        "public_only": public_only,
+    }
+    payload = {
+        "books": serializer.from_rows(rows),
         "pagination": {
             "current_page": page,
             "total_pages": total_pages,
@@ -101,85 +142,57 @@ def get_books_paginated(
             "has_previous": has_prev
         },
         "filters_applied": {
-            "search": search,
-            "author": author,
-            "language": language,
-            "genre": genre,
-            "copyright_status": copyright_status,
-            "featured_only": featured_only,
-            "public_only": public_only
+            **filters,
+            "fields": list(serializer.column_names) if fields else None
         }
     }
+    if facet_names:
+        payload["facets"] = await cached_facet_counts(db, "v1_books", filters, query, facet_names)
+    return json_response(payload)
 
 @router.get("/books/featured", response_model=List[BookOut])
-def get_featured_books(
+@conditional_get("v1_books_featured")
+@cached_response("v1_books_featured")
+async def get_featured_books(
+    request: Request,
     limit: int = Query(10, le=50, description="Number of featured books"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get featured books for homepage"""
-    return db.query(Book).filter(
+    rows = (await db.execute(select(*book_serializer.columns).filter(
         and_(Book.is_public == True, Book.is_featured == True)
-    ).order_by(desc(Book.created_at)).limit(limit).all()
+    ).order_by(desc(Book.created_at)).limit(limit))).all()
+    return json_response(book_serializer.from_rows(rows))
 
 @router.get("/books/stats")
-def get_books_stats(db: Session = Depends(get_db)):
-    """Get collection statistics"""
-    
-    # Basic stats
-    total_books = db.query(func.count(Book.id)).scalar()
-    public_books = db.query(func.count(Book.id)).filter(Book.is_public == True).scalar()
-    featured_books = db.query(func.count(Book.id)).filter(Book.is_featured == True).scalar()
-    
-    # Copyright status distribution
-    copyright_stats = db.execute(text("""
-        SELECT copyright_status, COUNT(*) as count 
-        FROM books 
-        WHERE is_public = true 
-        GROUP BY copyright_status 
-        ORDER BY count DESC
-    """)).fetchall()
-    
-    # Language distribution
-    language_stats = db.execute(text("""
-        SELECT language, COUNT(*) as count 
-        FROM books 
-        WHERE is_public = true 
-        GROUP BY language 
-        ORDER BY count DESC
-        LIMIT 10
-    """)).fetchall()
-    
-    # Top authors
-    author_stats = db.execute(text("""
-        SELECT author, COUNT(*) as book_count 
-        FROM books 
-        WHERE is_public = true AND author IS NOT NULL AND author != ''
-        GROUP BY author 
-        ORDER BY book_count DESC 
-        LIMIT 10
-    """)).fetchall()
-    
-    # Recent activity
-    recent_uploads = db.query(func.count(Book.id)).filter(
-        Book.created_at >= func.now() - text("INTERVAL '7 days'")
-    ).scalar()
+@cached_response("v1_books_stats")
+async def get_books_stats(db: AsyncSession = Depends(get_async_db)):
+    """Get collection statistics (served from the book_stats snapshot)"""
+    
+    snapshot = await db.run_sync(read_snapshot)
+    totals = snapshot["total"]
+    
+    # Recent activity - an index range scan on created_at
+    recent_uploads = await db.scalar(select(func.count(Book.id)).filter(
+        Book.created_at >= datetime.now(timezone.utc) - timedelta(days=7)
+    ))
     
     return {
-        "total_books": total_books,
-        "public_books": public_books,
-        "featured_books": featured_books,
+        "total_books": totals.get("books", 0),
+        "public_books": totals.get("public", 0),
+        "featured_books": totals.get("featured", 0),
         "recent_uploads_7days": recent_uploads,
         "copyright_distribution": [
-            {"status": row.copyright_status or "unknown", "count": row.count} 
-            for row in copyright_stats
+            {"status": status or "unknown", "count": count} 
+            for status, count in snapshot["copyright_status"].items()
         ],
         "language_distribution": [
-            {"language": row.language or "unknown", "count": row.count} 
-            for row in language_stats
+            {"language": language or "unknown", "count": count} 
+            for language, count in snapshot["language"].items()
         ],
         "top_authors": [
-            {"name": row.author, "book_count": row.book_count} 
-            for row in author_stats
+            {"name": author, "book_count": count} 
+            for author, count in snapshot["author"].items()
         ]
     }
 
@@ -188,26 +201,42 @@ def get_search_suggestions(
     q: str = Query(..., min_length=2, description="Search query"),
     db: Session = Depends(get_db)
 ):
-    """Get search suggestions for autocomplete"""
-    
-    # Title suggestions
-    title_suggestions = db.query(Book.title).filter(
-        and_(Book.is_public == True, Book.title.ilike(f"%{q}%"))
-    ).limit(5).all()
-    
-    # Author suggestions
-    author_suggestions = db.query(Book.author).filter(
-        and_(
-            Book.is_public == True, 
-            Book.author.ilike(f"%{q}%"),
-            Book.author.isnot(None),
-            Book.author != ""
-        )
-    ).distinct().limit(5).all()
+    """Get search suggestions for autocomplete (served from the in-memory index)"""
+    return autocomplete.suggest(q, db)
+
+@router.patch("/books/bulk")
+def bulk_update_books(payload: BookBulkUpdate, db: Session = Depends(get_db)):
+    """Update metadata (cover URLs, descriptions, flags...) for many books at once
+
+    Send `updates: [{id, fields}]` or a `filter` of column values (null
+    matches NULL) with the `fields` to set. Everything is applied with one
+    UPDATE in one transaction; each id is reported as updated or not_found.
+    """
+    try:
+        if payload.updates is not None and payload.filter is None and payload.fields is None:
+            results = apply_bulk_updates(db, [
+                (item.id, item.fields.dict(exclude_unset=True)) for item in payload.updates
+            ])
+        elif payload.updates is None and payload.filter is not None and payload.fields is not None:
+            results = apply_filtered_update(db, payload.filter, payload.fields.dict(exclude_unset=True))
+        else:
+            raise InvalidBulkUpdate("Send either `updates`, or `filter` together with `fields`")
+    except (InvalidBulkUpdate, InvalidFilter) as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    except InvalidFilterValue as e:
+        db.rollback()
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    updated = sum(1 for result in results if result["status"] == "updated")
+    if updated:
+        db.commit()
+        response_cache.invalidate()
     
     return {
-        "titles": [title[0] for title in title_suggestions],
-        "authors": [author[0] for author in author_suggestions]
+        "updated": updated,
+        "not_found": len(results) - updated,
+        "results": results
     }
 
 @router.put("/books/{book_id}", response_model=BookOut)
@@ -223,6 +252,7 @@ def update_book(
         raise HTTPException(status_code=404, detail="Book not found")
     
     # Update only provided fields
+    before = book_facts(book)
     update_data = book_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(book, field, value)
@@ -230,34 +260,37 @@ def update_book(
     # Update the updated_at timestamp
     book.updated_at = func.now()
     
+    record_book_change(db, before, book)
+    enqueue_search_sync(db, book.id)
     db.commit()
     db.refresh(book)
+    response_cache.invalidate()
     
     return book
 
 @router.post("/books/{book_id}/track-view")
 def track_book_view(book_id: int, db: Session = Depends(get_db)):
     """Track when someone views/reads a book"""
-    book = db.query(Book).filter(Book.id == book_id).first()
-    if not book:
+    stored = db.query(Book.view_count).filter(Book.id == book_id).first()
+    if not stored:
         raise HTTPException(status_code=404, detail="Book not found")
     
-    book.view_count = (book.view_count or 0) + 1
-    db.commit()
+    counter_buffer.increment(book_id, "view_count")
     
-    return {"message": "View tracked", "total_views": book.view_count}
+    total_views = (stored.view_count or 0) + counter_buffer.pending(book_id)["view_count"]
+    return {"message": "View tracked", "total_views": total_views}
 
 @router.post("/books/{book_id}/track-download")
 def track_book_download(book_id: int, db: Session = Depends(get_db)):
     """Track when someone downloads a book"""
-    book = db.query(Book).filter(Book.id == book_id).first()
-    if not book:
+    stored = db.query(Book.download_count).filter(Book.id == book_id).first()
+    if not stored:
         raise HTTPException(status_code=404, detail="Book not found")
     
-    book.download_count = (book.download_count or 0) + 1
-    db.commit()
+    counter_buffer.increment(book_id, "download_count")
     
-    return {"message": "Download tracked", "total_downloads": book.download_count}
+    total_downloads = (stored.download_count or 0) + counter_buffer.pending(book_id)["download_count"]
+    return {"message": "Download tracked", "total_downloads": total_downloads}
 
 @router.patch("/books/{book_id}/feature")
 def toggle_featured_status(book_id: int, featured: bool, db: Session = Depends(get_db)):
@@ -266,9 +299,13 @@ def toggle_featured_status(book_id: int, featured: bool, db: Session = Depends(g
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
     
+    before = book_facts(book)
     book.is_featured = featured
     book.updated_at = func.now()
+    record_book_change(db, before, book)
+    enqueue_search_sync(db, book.id)
     db.commit()
+    response_cache.invalidate()
     
     return {"message": f"Book {'featured' if featured else 'unfeatured'} successfully"}
 
@@ -279,8 +316,12 @@ def toggle_book_visibility(book_id: int, is_public: bool, db: Session = Depends(
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
     
+    before = book_facts(book)
     book.is_public = is_public
     book.updated_at = func.now()
+    record_book_change(db, before, book)
+    enqueue_search_sync(db, book.id)
     db.commit()
+    response_cache.invalidate()
     
     return {"message": f"Book {'published' if is_public else 'hidden'} successfully"}
\ No newline at end of file
@@ -0,0 +1,231 @@
+# backend/app/autocomplete.py - In-process autocomplete index for search suggestions
+import heapq
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app import models
+from app.core.config import settings
+
+# Upper bound on prefix matches inspected per lookup, so two-letter prefixes
+# on a huge catalog still answer in microseconds
+MAX_SCAN = 2000
+
+
+def normalize(value: str) -> str:
+    """Casefold and strip accents so "les mise" matches "Les Misérables" """
+    decomposed = unicodedata.normalize("NFKD", value)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold().strip()
+
+
+def word_suffixes(value: str) -> List[str]:
+    """Keys for every word start: "crime and punishment", "and punishment", "punishment" """
+    words = normalize(value).split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+class PrefixIndex:
+    """Sorted array of (key, ref) pairs answered with binary search
+
+    Weights live in a separate dict, so popularity changes never move entries.
+    """
+
+    def __init__(self):
+        self.entries: List[Tuple[str, object]] = []
+        self.weights: Dict[object, int] = {}
+        self.labels: Dict[object, str] = {}
+
+    def add(self, ref, label: str, weight: int = 0, bulk: bool = False):
+        """Index `label` under `ref`; with bulk=True call finish_bulk() afterwards"""
+        self.labels[ref] = label
+        self.weights[ref] = weight
+        for key in word_suffixes(label):
+            if bulk:
+                self.entries.append((key, ref))
+            else:
+                insort(self.entries, (key, ref))
+
+    def finish_bulk(self):
+        self.entries.sort()
+
+    def remove(self, ref):
+        label = self.labels.pop(ref, None)
+        self.weights.pop(ref, None)
+        if label is None:
+            return
+        for key in word_suffixes(label):
+            position = bisect_left(self.entries, (key, ref))
+            if position < len(self.entries) and self.entries[position] == (key, ref):
+                del self.entries[position]
+
+    def search(self, prefix: str, limit: int) -> List[str]:
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        candidates = set()
+        position = bisect_left(self.entries, (prefix,))
+        end = min(len(self.entries), position + MAX_SCAN)
+        while position < end and self.entries[position][0].startswith(prefix):
+            candidates.add(self.entries[position][1])
+            position += 1
+
+        labels = []
+        for ref in heapq.nlargest(limit * 2, candidates, key=lambda ref: self.weights.get(ref, 0)):
+            label = self.labels[ref]
+            if label not in labels:
+                labels.append(label)
+            if len(labels) == limit:
+                break
+        return labels
+
+
+class SuggestionIndex:
+    """Title index keyed by book id plus an author index keyed by name"""
+
+    def __init__(self):
+        self.books: Dict[int, tuple] = {}  # id -> (title, author, weight)
+        self.titles = PrefixIndex()
+        self.authors = PrefixIndex()
+        self.author_books: Dict[str, int] = {}
+
+    def add(self, book_id: int, title: str, author: Optional[str], weight: int, bulk: bool = False):
+        self.books[book_id] = (title, author, weight)
+        self.titles.add(book_id, title, weight, bulk=bulk)
+        if author:
+            if author in self.authors.labels:
+                self.authors.weights[author] += weight
+            else:
+                self.authors.add(author, author, weight, bulk=bulk)
+            self.author_books[author] = self.author_books.get(author, 0) + 1
+
+    def remove(self, book_id: int):
+        previous = self.books.pop(book_id, None)
+        if previous is None:
+            return
+        _, author, weight = previous
+        self.titles.remove(book_id)
+        if author and author in self.authors.labels:
+            self.author_books[author] -= 1
+            if self.author_books[author] <= 0:
+                del self.author_books[author]
+                self.authors.remove(author)
+            else:
+                self.authors.weights[author] -= weight
+
+
+class AutocompleteService:
+    """Title and author suggestions for public books, served from memory
+
+    The index is built once, then refreshed from rows whose `updated_at`
+    moved since the last sync (views and downloads bump it too, so weights
+    track `view_count + download_count`). Deletions are applied directly
+    via remove_book() and, across workers, by the periodic full rebuild.
+    Database reads happen outside the index lock; lookups never wait on
+    Postgres.
+    """
+
+    def __init__(self, refresh_seconds: int, rebuild_seconds: int):
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._index = SuggestionIndex()
+        self._synced_at: Optional[datetime] = None
+        self._built = threading.Event()
+        self._last_refresh = 0.0
+        self._last_rebuild = 0.0
+
+    @staticmethod
+    def _query(db):
+        Book = models.Book
+        return db.query(Book.id, Book.title, Book.author, Book.is_public,
+                        Book.view_count, Book.download_count, Book.updated_at)
+
+    @staticmethod
+    def _newest(rows, synced_at: Optional[datetime]) -> Optional[datetime]:
+        for row in rows:
+            if row.updated_at is not None and (synced_at is None or row.updated_at > synced_at):
+                synced_at = row.updated_at
+        return synced_at
+
+    def rebuild(self, db):
+        """Build a fresh index from every book and swap it in"""
+        rows = self._query(db).all()
+        index = SuggestionIndex()
+        for row in rows:
+            if row.is_public is True and row.title:
+                index.add(row.id, row.title, row.author,
+                          (row.view_count or 0) + (row.download_count or 0), bulk=True)
+        index.titles.finish_bulk()
+        index.authors.finish_bulk()
+
+        with self._lock:
+            self._index = index
+            self._synced_at = self._newest(rows, None)
+        self._last_rebuild = self._last_refresh = time.monotonic()
+        self._built.set()
+        print(f"[autocomplete] Indexed {len(index.books)} public books")
+
+    def refresh(self, db):
+        """Apply rows changed since the last sync"""
+        synced_at = self._synced_at
+        query = self._query(db)
+        if synced_at is not None:
+            # >= so rows sharing the boundary timestamp are re-applied, not missed
+            query = query.filter(models.Book.updated_at >= synced_at)
+        rows = query.all()
+
+        with self._lock:
+            for row in rows:
+                self._index.remove(row.id)
+                if row.is_public is True and row.title:
+                    self._index.add(row.id, row.title, row.author,
+                                    (row.view_count or 0) + (row.download_count or 0))
+            self._synced_at = self._newest(rows, synced_at)
+        self._last_refresh = time.monotonic()
+
+    def remove_book(self, book_id: int):
+        with self._lock:
+            self._index.remove(book_id)
+
+    def _maybe_refresh(self, db):
+        if not self._built.is_set():
+            with self._refresh_lock:
+                if not self._built.is_set():
+                    self.rebuild(db)
+            return
+
+        now = time.monotonic()
+        if now - self._last_refresh < self.refresh_seconds:
+            return
+
+        # Only one request pays for the refresh; the rest keep serving
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            if now - self._last_rebuild >= self.rebuild_seconds:
+                self.rebuild(db)
+            else:
+                self.refresh(db)
+        except Exception as e:
+            print(f"[autocomplete] Refresh failed: {e}")
+        finally:
+            self._refresh_lock.release()
+
+    def suggest(self, q: str, db, limit: int = 5) -> dict:
+        self._maybe_refresh(db)
+        with self._lock:
+            return {
+                "titles": self._index.titles.search(q, limit),
+                "authors": self._index.authors.search(q, limit),
+            }
+
+
+autocomplete = AutocompleteService(
+    refresh_seconds=settings.AUTOCOMPLETE_REFRESH_SECONDS,
+    rebuild_seconds=settings.AUTOCOMPLETE_REBUILD_SECONDS,
+)
@@ -0,0 +1,148 @@
+# backend/app/bulk.py - Bulk metadata updates in one statement and one transaction
+"""
+PATCH /api/v1/books/bulk applies per-book field changes (or one change to
+every book matching a filter) with a single UPDATE. On PostgreSQL the
+per-book values are joined in as `UPDATE books ... FROM (VALUES ...)`;
+elsewhere they go through one executemany. The affected rows are locked and
+read first so the stats snapshot and search outbox are updated in the same
+transaction, and the caller invalidates the response cache once.
+"""
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import JSON, Boolean, case, cast, column, func, update, values
+
+from app import models
+from app.dedupe import KEY_SOURCE_COLUMNS, with_keys
+from app.filters import book_criteria
+from app.search_engine import enqueue_search_sync
+from app.stats import book_facts, record_book_changes
+
+# Large enough for a full cover/description refresh, small enough for one statement
+MAX_BULK_UPDATES = 5000
+
+# Columns book_facts() reads, loaded for the stats snapshot deltas
+FACT_COLUMNS = ("source", "is_public", "is_featured", "filename", "genre", "copyright_status", "language", "author")
+
+# book_facts() columns plus the ones dedupe keys are derived from
+LOCKED_COLUMNS = tuple(dict.fromkeys(FACT_COLUMNS + KEY_SOURCE_COLUMNS))
+
+class InvalidBulkUpdate(ValueError):
+    """Raised for an empty, oversized or malformed bulk update"""
+
+
+def _locked_facts(db, criteria) -> Dict[int, SimpleNamespace]:
+    """Lock the matching books and return their current snapshot facts by id"""
+    Book = models.Book
+    rows = db.query(Book.id, *(getattr(Book, name) for name in LOCKED_COLUMNS)) \
+        .filter(criteria).order_by(Book.id).with_for_update().all()
+    return {row.id: SimpleNamespace(**row._asdict()) for row in rows}
+
+
+def _finish(db, before: Dict[int, SimpleNamespace], changes: Dict[int, dict]):
+    """Record snapshot deltas and search sync for every updated book"""
+    deltas = []
+    for book_id, old in before.items():
+        new = SimpleNamespace(**{**vars(old), **changes[book_id]})
+        deltas.append((book_facts(old), new))
+        enqueue_search_sync(db, book_id)
+    record_book_changes(db, deltas)
+
+
+def _values_update(db, items: List[Tuple[int, dict]]):
+    """One UPDATE ... FROM (VALUES ...) covering every item
+
+    Items may change different columns; a column only some items set gets a
+    boolean flag in VALUES and a CASE that keeps the current value elsewhere.
+    """
+    Book = models.Book
+    names = sorted({name for _, fields in items for name in fields})
+    partial = [name for name in names if not all(name in fields for _, fields in items)]
+
+    def value_type(name):
+        column_type = getattr(Book, name).type
+        return JSON(none_as_null=True) if isinstance(column_type, JSON) else column_type
+
+    source = values(
+        column("id", Book.id.type),
+        *(column(name, value_type(name)) for name in names),
+        *(column(f"set_{name}", Boolean()) for name in partial),
+        name="changes",
+    ).data([
+        (book_id, *(fields.get(name) for name in names), *(name in fields for name in partial))
+        for book_id, fields in items
+    ])
+
+    assignments = {}
+    for name in names:
+        new_value = cast(source.c[name], getattr(Book, name).type)
+        if name in partial:
+            new_value = case((source.c[f"set_{name}"], new_value), else_=getattr(Book, name))
+        assignments[name] = new_value
+    assignments["updated_at"] = func.now()
+
+    db.execute(
+        update(Book).where(Book.id == source.c.id).values(assignments),
+        execution_options={"synchronize_session": False},
+    )
+
+
+def _execute_per_book(db, items: List[Tuple[int, dict]]):
+    """Write per-book field values with one statement"""
+    if db.get_bind().dialect.name == "postgresql":
+        _values_update(db, items)
+    else:
+        now = datetime.now(timezone.utc)
+        db.execute(update(models.Book), [{"id": book_id, **fields, "updated_at": now} for book_id, fields in items])
+
+
+def apply_bulk_updates(db, items: Sequence[Tuple[int, dict]]) -> List[dict]:
+    """Apply `(id, fields)` pairs in one statement; returns per-id status in input order
+
+    A repeated id keeps its last entry. Nothing is committed here.
+    """
+    if not items:
+        raise InvalidBulkUpdate("No updates given")
+    if len(items) > MAX_BULK_UPDATES:
+        raise InvalidBulkUpdate(f"At most {MAX_BULK_UPDATES} updates per request, got {len(items)}")
+
+    changes: Dict[int, dict] = {}
+    for book_id, fields in items:
+        if not fields:
+            raise InvalidBulkUpdate(f"Update for book {book_id} has no fields")
+        changes[book_id] = fields
+
+    Book = models.Book
+    before = _locked_facts(db, Book.id.in_(list(changes)))
+    found = [(book_id, with_keys(before[book_id], changes[book_id])) for book_id in changes if book_id in before]
+
+    if found:
+        _execute_per_book(db, found)
+        _finish(db, before, changes)
+
+    return [{"id": book_id, "status": "updated" if book_id in before else "not_found"} for book_id in changes]
+
+
+def apply_filtered_update(db, filters: Dict[str, Optional[object]], fields: dict) -> List[dict]:
+    """Set `fields` on every book whose columns equal `filters` (None matches NULL)"""
+    if not fields:
+        raise InvalidBulkUpdate("No fields given")
+
+    Book = models.Book
+    before = _locked_facts(db, book_criteria(filters, "update"))
+    if len(before) > MAX_BULK_UPDATES:
+        raise InvalidBulkUpdate(f"Filter matches {len(before)} books; at most {MAX_BULK_UPDATES} per request")
+
+    if before:
+        if any(name in fields for name in KEY_SOURCE_COLUMNS):
+            # Dedupe keys differ per book (a new title keeps each book's author)
+            _execute_per_book(db, [(book_id, with_keys(old, fields)) for book_id, old in before.items()])
+        else:
+            db.execute(
+                update(Book).where(Book.id.in_(list(before))).values(**fields, updated_at=func.now()),
+                execution_options={"synchronize_session": False},
+            )
+        _finish(db, before, {book_id: fields for book_id in before})
+
+    return [{"id": book_id, "status": "updated"} for book_id in before]
@@ -0,0 +1,296 @@
+# backend/app/bundle.py - Multi-book ZIP downloads streamed straight from S3
+"""
+POST /books/download-bundle answers with one ZIP of many books. The archive
+is written on the fly and never exists anywhere in full:
+
+- Members are stored, not deflated. PDFs and EPUBs are already compressed,
+  and stored members let the exact Content-Length be computed up front from
+  object sizes (one concurrent HEAD per book before the response starts).
+- Local headers carry the sizes; the CRC-32 is only known after the bytes
+  have gone out, so it follows each member in a data descriptor.
+- Up to PREFETCH objects are read from S3 concurrently, each through a
+  queue of QUEUE_CHUNKS chunks, so memory stays near
+  PREFETCH * (QUEUE_CHUNKS + 1) * CHUNK_SIZE whatever the bundle size.
+- Members, offsets and the central directory switch to zip64 records as
+  soon as a value no longer fits in 32 bits, so bundles past 4 GB (or with
+  more than 65,535 members) stay readable.
+"""
+import asyncio
+import re
+import struct
+import threading
+import zlib
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+
+from sqlalchemy import select
+
+from app import models
+from app.filters import book_criteria
+from app.storage import ObjectInfo, S3Object, run_io
+
+MAX_BUNDLE_BOOKS = 1000
+
+PREFETCH = 4
+QUEUE_CHUNKS = 2
+
+# Values at or above this go into zip64 extra fields
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP64_COUNT_LIMIT = 0xFFFF
+
+FLAGS = 0x0008 | 0x0800  # data descriptor follows; names are UTF-8
+VERSION = 20
+VERSION_ZIP64 = 45
+MADE_BY = (3 << 8) | VERSION_ZIP64  # Unix, so the permissions below apply
+FILE_MODE = 0o100644 << 16
+
+UNSAFE_NAME = re.compile(r'[\x00-\x1f\x7f/\\:*?"<>|]+')
+MAX_NAME_CHARS = 150
+
+
+class InvalidBundle(ValueError):
+    """Raised for an empty, oversized or malformed bundle request"""
+
+
+@dataclass
+class Member:
+    """One book in the archive; `crc` is filled in once its bytes are sent"""
+    name: bytes
+    source: S3Object
+    info: ObjectInfo
+    offset: int = 0
+    crc: int = 0
+    book_id: Optional[int] = None
+
+    @property
+    def size(self) -> int:
+        return self.info.size
+
+    @property
+    def zip64(self) -> bool:
+        return self.size >= ZIP64_LIMIT or self.offset >= ZIP64_LIMIT
+
+
+def bundle_query(ids: Optional[Sequence[int]], filters: Optional[Dict[str, object]]):
+    """Books to bundle: `ids` as given, or every book whose columns equal `filters`"""
+    Book = models.Book
+    query = select(Book.id, Book.title, Book.author, Book.filename, Book.s3_key).where(Book.s3_key.isnot(None))
+    if ids is not None and filters is None:
+        if not ids:
+            raise InvalidBundle("No ids given")
+        if len(set(ids)) > MAX_BUNDLE_BOOKS:
+            raise InvalidBundle(f"At most {MAX_BUNDLE_BOOKS} books per bundle, got {len(set(ids))}")
+        return query.where(Book.id.in_(list(set(ids))))
+    if filters is None or ids is not None:
+        raise InvalidBundle("Send either `ids` or `filter`")
+    return query.where(book_criteria(filters, "bundle")).order_by(Book.title, Book.id).limit(MAX_BUNDLE_BOOKS + 1)
+
+
+def order_rows(rows, ids: Optional[Sequence[int]]) -> list:
+    """Rows in request order for an id bundle; filter bundles are capped here"""
+    if ids is None:
+        if len(rows) > MAX_BUNDLE_BOOKS:
+            raise InvalidBundle(f"Filter matches more than {MAX_BUNDLE_BOOKS} books; narrow it or list the ids")
+        return list(rows)
+    by_id = {row.id: row for row in rows}
+    return [by_id[book_id] for book_id in dict.fromkeys(ids) if book_id in by_id]
+
+
+def entry_name(title: Optional[str], author: Optional[str], filename: Optional[str]) -> str:
+    """`Title - Author.ext`, safe as a path in any unzip tool"""
+    ext = filename.rsplit(".", 1)[-1].lower() if filename and "." in filename else "pdf"
+    base = title or (filename.rsplit(".", 1)[0] if filename else "") or "book"
+    if author:
+        base = f"{base} - {author}"
+    base = " ".join(UNSAFE_NAME.sub(" ", base).split()).strip(".")[:MAX_NAME_CHARS].strip(" .") or "book"
+    return f"{base}.{ext}"
+
+
+def _unique(name: str, taken: set) -> str:
+    stem, dot, ext = name.rpartition(".")
+    candidate, n = name, 1
+    while candidate in taken:
+        n += 1
+        candidate = f"{stem} ({n}).{ext}" if dot else f"{name} ({n})"
+    taken.add(candidate)
+    return candidate
+
+
+async def plan_bundle(client, bucket: str, rows) -> List[Member]:
+    """HEAD every object concurrently; books whose object is gone are left out"""
+    sources = [S3Object(client, bucket, row.s3_key) for row in rows]
+    infos = await asyncio.gather(*(run_io(source.info) for source in sources), return_exceptions=True)
+
+    members, taken, offset = [], set(), 0
+    for row, source, info in zip(rows, sources, infos):
+        if isinstance(info, Exception):
+            print(f"[bundle] Skipping book {row.id}: {info}")
+            continue
+        name = _unique(entry_name(row.title, row.author, row.filename), taken)
+        member = Member(name=name.encode("utf-8"), source=source, info=info, offset=offset, book_id=row.id)
+        offset += len(local_header(member)) + member.size + len(data_descriptor(member))
+        members.append(member)
+    return members
+
+
+def _dos_time(moment: Optional[datetime]):
+    if moment is None or moment.year < 1980:
+        return 0, (1 << 5) | 1  # 1980-01-01 00:00
+    return (
+        (moment.hour << 11) | (moment.minute << 5) | (moment.second // 2),
+        ((moment.year - 1980) << 9) | (moment.month << 5) | moment.day,
+    )
+
+
+def local_header(member: Member) -> bytes:
+    time, date = _dos_time(member.info.last_modified)
+    extra = b""
+    size = member.size
+    if member.zip64:
+        extra = struct.pack("<HHQQ", 0x0001, 16, member.size, member.size)
+        size = 0xFFFFFFFF
+    return struct.pack(
+        "<IHHHHHIIIHH", 0x04034B50, VERSION_ZIP64 if member.zip64 else VERSION, FLAGS, 0,
+        time, date, 0, size, size, len(member.name), len(extra),
+    ) + member.name + extra
+
+
+def data_descriptor(member: Member) -> bytes:
+    if member.zip64:
+        return struct.pack("<IIQQ", 0x08074B50, member.crc, member.size, member.size)
+    return struct.pack("<IIII", 0x08074B50, member.crc, member.size, member.size)
+
+
+def central_header(member: Member) -> bytes:
+    time, date = _dos_time(member.info.last_modified)
+    size, offset, extra = member.size, member.offset, []
+    if size >= ZIP64_LIMIT:
+        extra += [size, size]
+        size = 0xFFFFFFFF
+    if offset >= ZIP64_LIMIT:
+        extra.append(offset)
+        offset = 0xFFFFFFFF
+    extra_bytes = struct.pack(f"<HH{len(extra)}Q", 0x0001, 8 * len(extra), *extra) if extra else b""
+    return struct.pack(
+        "<IHHHHHHIIIHHHHHII", 0x02014B50, MADE_BY, VERSION_ZIP64 if member.zip64 else VERSION, FLAGS, 0,
+        time, date, member.crc, size, size, len(member.name), len(extra_bytes), 0, 0, 0, FILE_MODE, offset,
+    ) + member.name + extra_bytes
+
+
+def end_records(count: int, directory_offset: int, directory_size: int) -> bytes:
+    """End of central directory, preceded by the zip64 end record and locator when needed"""
+    records = b""
+    if count >= ZIP64_COUNT_LIMIT or directory_offset >= ZIP64_LIMIT or directory_size >= ZIP64_LIMIT:
+        zip64_offset = directory_offset + directory_size
+        records = struct.pack(
+            "<IQHHIIQQQQ", 0x06064B50, 44, MADE_BY, VERSION_ZIP64, 0, 0,
+            count, count, directory_size, directory_offset,
+        ) + struct.pack("<IIQI", 0x07064B50, 0, zip64_offset, 1)
+        count = min(count, 0xFFFF)
+        directory_offset = min(directory_offset, 0xFFFFFFFF)
+        directory_size = min(directory_size, 0xFFFFFFFF)
+    return records + struct.pack(
+        "<IHHHHIIH", 0x06054B50, 0, 0, count, count, directory_size, directory_offset, 0,
+    )
+
+
+def _directory_offset(members: List[Member]) -> int:
+    if not members:
+        return 0
+    last = members[-1]
+    return last.offset + len(local_header(last)) + last.size + len(data_descriptor(last))
+
+
+def bundle_size(members: List[Member]) -> int:
+    """Exact length of the archive; CRCs do not change any record's length"""
+    directory_offset = _directory_offset(members)
+    directory_size = sum(len(central_header(member)) for member in members)
+    return directory_offset + directory_size + len(end_records(len(members), directory_offset, directory_size))
+
+
+class _Reader:
+    """Blocking half of one member's read: the next chunk, folded into a running CRC"""
+
+    def __init__(self, member: Member):
+        self.member = member
+        self.chunks = None
+        self.crc = 0
+        self.read = 0
+        # A cancelled read may still be inside next() when close() runs
+        self._lock = threading.Lock()
+
+    def next(self) -> Optional[bytes]:
+        with self._lock:
+            if self.chunks is None:
+                _, self.chunks = self.member.source.open(if_match=self.member.info.etag)
+            chunk = next(self.chunks, None)
+            if chunk is not None:
+                self.crc = zlib.crc32(chunk, self.crc)
+                self.read += len(chunk)
+            return chunk
+
+    def close(self):
+        with self._lock:
+            if self.chunks is not None:
+                self.chunks.close()
+
+
+async def _prefetch(member: Member, queue: asyncio.Queue):
+    """Feed `queue` with the member's chunks, then its CRC (an int) or the error"""
+    reader = _Reader(member)
+    try:
+        while True:
+            chunk = await run_io(reader.next)
+            if chunk is None:
+                break
+            await queue.put(chunk)
+        if reader.read != member.size:
+            raise IOError(f"{member.source.key} is {reader.read} bytes, expected {member.size}")
+        await queue.put(reader.crc)
+    except Exception as e:
+        await queue.put(e)
+    finally:
+        await run_io(reader.close)
+
+
+async def stream_bundle(members: List[Member]) -> AsyncIterator[bytes]:
+    """The archive's bytes, reading the next PREFETCH members while one is sent"""
+    waiting = iter(members)
+    running = deque()
+
+    def start_next():
+        member = next(waiting, None)
+        if member is not None:
+            queue = asyncio.Queue(maxsize=QUEUE_CHUNKS)
+            running.append((member, queue, asyncio.ensure_future(_prefetch(member, queue))))
+
+    try:
+        for _ in range(PREFETCH):
+            start_next()
+        while running:
+            # Stays in `running` until sent, so a disconnect cancels it below
+            member, queue, task = running[0]
+            yield local_header(member)
+            while True:
+                item = await queue.get()
+                if isinstance(item, bytes):
+                    yield item
+                    continue
+                if isinstance(item, Exception):
+                    # Content-Length is already out; a short body tells the client
+                    raise IOError(f"Bundle member {member.source.key} failed: {item}")
+                member.crc = item
+                break
+            await task
+            running.popleft()
+            yield data_descriptor(member)
+            start_next()
+
+        directory = b"".join(central_header(member) for member in members)
+        yield directory
+        yield end_records(len(members), _directory_offset(members), len(directory))
+    finally:
+        for _, _, task in running:
+            task.cancel()
@@ -0,0 +1,245 @@
+# backend/app/cache.py - TTL + LRU response cache for hot read endpoints
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+
+from app.core.config import settings
+from app.serializers import dumps
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+class RedisCacheBackend:
+    """Shared store so every uvicorn worker sees the same entries and version"""
+
+    VERSION_KEY = "readora:cache:version"
+
+    def __init__(self, url: str, ttl: int):
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def version(self) -> int:
+        return int(self.client.get(self.VERSION_KEY) or 0)
+
+    def bump_version(self) -> int:
+        return int(self.client.incr(self.VERSION_KEY))
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(f"readora:cache:{key}")
+
+    def set(self, key: str, body: bytes):
+        self.client.setex(f"readora:cache:{key}", self.ttl, body)
+
+
+class ResponseCache:
+    """In-process TTL + LRU cache of encoded JSON bodies
+
+    Entries are keyed by endpoint name, normalized query parameters and the
+    catalog version. Writes call `invalidate()`, which bumps the version so
+    every older entry becomes unreachable at once. With a shared backend the
+    version lives in Redis and misses fall through to Redis before the DB.
+    """
+
+    def __init__(self, max_entries: int, ttl: int, backend: Optional[RedisCacheBackend] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(namespace: str, params: dict) -> str:
+        """Normalize parameters so equivalent requests share one entry"""
+        parts = []
+        for name in sorted(params):
+            value = params[name]
+            if value is None or value == "":
+                continue
+            if isinstance(value, str):
+                value = value.strip()
+            parts.append(f"{name}={value}")
+        return f"{namespace}?{'&'.join(parts)}"
+
+    def _current_version(self) -> int:
+        if self.backend is not None:
+            try:
+                return self.backend.version()
+            except Exception as e:
+                print(f"[cache] Shared backend unavailable: {e}")
+        return self._version
+
+    def versioned(self, key: str) -> str:
+        """Pin a key to the current catalog version
+
+        Resolve this before reading the database so a write that lands while
+        the handler runs cannot have its stale result stored as fresh.
+        """
+        return f"{self._current_version()}:{key}"
+
+    def get(self, versioned: str) -> Optional[bytes]:
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(versioned)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(versioned)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[versioned]
+
+        if self.backend is not None:
+            try:
+                body = self.backend.get(versioned)
+            except Exception:
+                body = None
+            if body is not None:
+                self._store(versioned, body)
+                with self._lock:
+                    self.hits += 1
+                return body
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    # Async handlers use these: the Redis client blocks, so with a shared
+    # backend its round trips run on the threadpool, never the event loop
+
+    async def versioned_async(self, key: str) -> str:
+        if self.backend is None:
+            return self.versioned(key)
+        return await run_in_threadpool(self.versioned, key)
+
+    async def get_async(self, versioned: str) -> Optional[bytes]:
+        if self.backend is None:
+            return self.get(versioned)
+        return await run_in_threadpool(self.get, versioned)
+
+    async def set_async(self, versioned: str, body: bytes):
+        if self.backend is None:
+            return self.set(versioned, body)
+        await run_in_threadpool(self.set, versioned, body)
+
+    def set(self, versioned: str, body: bytes):
+        self._store(versioned, body)
+        if self.backend is not None:
+            try:
+                self.backend.set(versioned, body)
+            except Exception as e:
+                print(f"[cache] Shared backend write failed: {e}")
+
+    def _store(self, versioned: str, body: bytes):
+        with self._lock:
+            self._entries[versioned] = (time.monotonic() + self.ttl, body)
+            self._entries.move_to_end(versioned)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        """Drop every cached response - call after any catalog write commits"""
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            self.invalidations += 1
+        if self.backend is not None:
+            try:
+                self.backend.bump_version()
+            except Exception as e:
+                print(f"[cache] Shared backend invalidation failed: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "shared_backend": "redis" if self.backend is not None else None,
+            }
+
+
+def cached_response(namespace: str, exclude: tuple = ("db", "request")):
+    """Cache a read endpoint's JSON body keyed by its query parameters
+
+    The wrapped handler may return plain data or a Response; only 200
+    responses are stored. Dependencies named in `exclude` are left out of
+    the key. Both `def` and `async def` handlers are supported.
+    """
+    def make_key(kwargs):
+        return response_cache.make_key(namespace, {k: v for k, v in kwargs.items() if k not in exclude})
+
+    def hit(body):
+        return Response(content=body, media_type="application/json", headers={"X-Cache": "HIT"})
+
+    def encode(result):
+        """Body to store, or None for a non-200 Response"""
+        if isinstance(result, Response):
+            return result.body if result.status_code == 200 else None
+        return dumps(result)
+
+    def miss(body):
+        return Response(content=body, media_type="application/json", headers={"X-Cache": "MISS"})
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key = await response_cache.versioned_async(make_key(kwargs))
+                body = await response_cache.get_async(key)
+                if body is not None:
+                    return hit(body)
+                result = await func(*args, **kwargs)
+                body = encode(result)
+                if body is None:
+                    return result
+                await response_cache.set_async(key, body)
+                return miss(body)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = response_cache.versioned(make_key(kwargs))
+            body = response_cache.get(key)
+            if body is not None:
+                return hit(body)
+            result = func(*args, **kwargs)
+            body = encode(result)
+            if body is None:
+                return result
+            response_cache.set(key, body)
+            return miss(body)
+        return wrapper
+    return decorator
+
+
+def _build_cache() -> ResponseCache:
+    backend = None
+    if settings.REDIS_URL:
+        if REDIS_AVAILABLE:
+            backend = RedisCacheBackend(settings.REDIS_URL, settings.RESPONSE_CACHE_TTL)
+            print("✅ Response cache using shared Redis backend")
+        else:
+            print("⚠️ REDIS_URL set but redis is not installed: pip install redis")
+    return ResponseCache(settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_TTL, backend)
+
+
+response_cache = _build_cache()
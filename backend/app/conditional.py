@@ -0,0 +1,147 @@
+# backend/app/conditional.py - ETag / Last-Modified conditional GET support
+import hashlib
+import inspect
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from functools import wraps
+from typing import Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+from sqlalchemy import func
+
+from app import models
+from app.cache import ResponseCache, response_cache
+
+
+class CatalogFingerprint:
+    """max(updated_at) and row count of the books table, memoized
+
+    The aggregate is re-read whenever the response cache version moves (any
+    catalog write in this process or, with Redis, in any worker) and at most
+    every `ttl` seconds otherwise, so revalidations usually cost no query.
+    """
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._cached = None  # (version, expires_at, last_modified, count)
+
+    def get(self, db, version: Optional[str] = None) -> Tuple[Optional[datetime], int]:
+        """`version` is response_cache.versioned(""), passed in by async callers
+        that resolve it off the event loop"""
+        version = version if version is not None else response_cache.versioned("")
+        now = time.monotonic()
+        with self._lock:
+            if self._cached and self._cached[0] == version and self._cached[1] > now:
+                return self._cached[2], self._cached[3]
+
+        last_modified, count = db.query(
+            func.max(models.Book.updated_at), func.count(models.Book.id)
+        ).one()
+        with self._lock:
+            self._cached = (version, now + self.ttl, last_modified, count)
+        return last_modified, count
+
+
+catalog_fingerprint = CatalogFingerprint(ttl=response_cache.ttl)
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag from the given parts"""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def http_date(value: Optional[datetime]) -> Optional[str]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """Evaluate If-None-Match (preferred) or If-Modified-Since against a resource"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return etag in candidates or f"W/{etag}" in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # "-0000" dates parse as naive; the header is GMT by definition
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+
+    return False
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    return Response(status_code=304, headers=validator_headers(etag, last_modified))
+
+
+def conditional_get(namespace: str, exclude: tuple = ("db", "request")):
+    """Answer catalog listings with 304 when the client's ETag still matches
+
+    The ETag covers the endpoint, its normalized query parameters and the
+    catalog fingerprint, so a match is decided before any rows are loaded.
+    No Last-Modified is sent: a delete leaves max(updated_at) unchanged, so
+    If-Modified-Since alone would answer 304 for a listing that shrank.
+    The wrapped handler must take `request` and `db` keyword parameters;
+    `async def` handlers get an AsyncSession and are awaited.
+    """
+    def validators(kwargs, last_modified, count):
+        key = ResponseCache.make_key(
+            namespace, {k: v for k, v in kwargs.items() if k not in exclude}
+        )
+        return make_etag(key, last_modified.isoformat() if last_modified else None, count)
+
+    def finish(response, etag):
+        if isinstance(response, Response) and response.status_code == 200:
+            response.headers.update(validator_headers(etag, None))
+        return response
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                request, db = kwargs["request"], kwargs["db"]
+                version = await response_cache.versioned_async("")
+                last_modified, count = await db.run_sync(catalog_fingerprint.get, version)
+                etag = validators(kwargs, last_modified, count)
+
+                if is_not_modified(request, etag):
+                    return not_modified(etag)
+                return finish(await func(*args, **kwargs), etag)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            request, db = kwargs["request"], kwargs["db"]
+            last_modified, count = catalog_fingerprint.get(db)
+            etag = validators(kwargs, last_modified, count)
+
+            if is_not_modified(request, etag):
+                return not_modified(etag)
+            return finish(func(*args, **kwargs), etag)
+        return wrapper
+    return decorator
@@ -4,6 +4,18 @@ from typing import Optional
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    # Async read path; derived from DATABASE_URL (asyncpg/aiosqlite) when unset
+    ASYNC_DATABASE_URL: Optional[str] = None
+
+    # Connection pool, applied to the sync and async engines separately.
+    # DB_POOL_MODE=transaction when connecting through PgBouncer transaction pooling
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+    DB_POOL_MODE: str = "session"
     S3_ENDPOINT_URL: Optional[str] = None
     S3_PUBLIC_ENDPOINT_URL: Optional[str] = None
     S3_ACCESS_KEY: str
@@ -11,6 +23,38 @@ class Settings(BaseSettings):
     S3_BUCKET: str
     SECRET_KEY: str = "change-me"
 
+    # Response cache for hot read endpoints (REDIS_URL shares it across workers)
+    RESPONSE_CACHE_TTL: int = 30
+    RESPONSE_CACHE_MAX_ENTRIES: int = 512
+    REDIS_URL: Optional[str] = None
+
+    # In-memory search suggestions: delta sync interval and full rebuild interval
+    AUTOCOMPLETE_REFRESH_SECONDS: int = 30
+    AUTOCOMPLETE_REBUILD_SECONDS: int = 600
+
+    # Meilisearch search backend (unset = SQL search only)
+    MEILISEARCH_HOST: Optional[str] = None
+    MEILISEARCH_API_KEY: Optional[str] = None
+    MEILISEARCH_INDEX: str = "books"
+    SEARCH_OUTBOX_BATCH_SIZE: int = 500
+    SEARCH_OUTBOX_POLL_SECONDS: float = 2.0
+
+    # View/download counters: buffered per worker, flushed as batched increments
+    COUNTER_FLUSH_SECONDS: float = 5.0
+    COUNTER_MAX_PENDING: int = 10000
+
+    # Local disk cache for inline S3 reads (0 disables)
+    OBJECT_CACHE_DIR: str = "/tmp/readora-object-cache"
+    OBJECT_CACHE_MAX_BYTES: int = 2 * 1024 ** 3
+
+    # S3 download I/O runs on its own thread pool, apart from the metadata API's
+    DOWNLOAD_IO_THREADS: int = 16
+    DOWNLOAD_CHUNK_BYTES: int = 1024 * 1024
+
+    # Presigned download URLs: lifetime, and how long one is handed out again
+    PRESIGN_EXPIRES_SECONDS: int = 3600
+    PRESIGN_REUSE_SECONDS: int = 2700
+
     class Config:
         env_file = ".env"
 
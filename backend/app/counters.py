@@ -0,0 +1,181 @@
+# backend/app/counters.py - Write-behind view and download counters
+"""
+Views and downloads used to load the book, add one in Python and commit, so a
+popular book serialized every reader on its row lock and concurrent requests
+could overwrite each other's increment. Now requests only add to an
+in-process buffer; a background thread flushes it every
+COUNTER_FLUSH_SECONDS as one batched `SET count = count + delta` UPDATE, so
+nothing is lost to races and a hot book costs one row write per interval.
+The same transaction feeds the hourly rollup and trending scores in
+app/trending.py.
+
+The loss window is bounded: a crash drops at most one flush interval of
+counts, a buffer holding COUNTER_MAX_PENDING books flushes early, and
+shutdown flushes whatever is left. A failed flush puts its deltas back for
+the next attempt. Each uvicorn worker has its own buffer; the increments are
+additive, so workers never conflict.
+"""
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import Integer, bindparam, column, func, update, values
+
+from app import models
+from app.core.config import settings
+from app.db import SessionLocal
+from app.trending import prune as prune_trending, record_activity
+
+COUNTERS = ("view_count", "download_count")
+
+PRUNE_EVERY_SECONDS = 3600
+
+
+class CounterBuffer:
+    """Coalesces per-book counter increments in memory between flushes"""
+
+    def __init__(self, session_factory, flush_seconds: float, max_pending: int):
+        self.session_factory = session_factory
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[int, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_prune = 0.0
+
+    def increment(self, book_id: int, counter: str, amount: int = 1):
+        """Count a view or download; written to the database on the next flush"""
+        if counter not in COUNTERS:
+            raise ValueError(f"Unknown counter: {counter}")
+        with self._lock:
+            self._pending[book_id][counter] += amount
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self._wake.set()
+
+    def pending(self, book_id: int) -> Dict[str, int]:
+        """Increments for `book_id` not yet flushed, to add to the stored counts"""
+        with self._lock:
+            deltas = self._pending.get(book_id)
+            return dict(deltas) if deltas else dict.fromkeys(COUNTERS, 0)
+
+    def _take(self) -> Dict[int, Dict[str, int]]:
+        with self._lock:
+            taken, self._pending = self._pending, defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+        return taken
+
+    def _restore(self, deltas: Dict[int, Dict[str, int]]):
+        with self._lock:
+            for book_id, counts in deltas.items():
+                for counter, amount in counts.items():
+                    self._pending[book_id][counter] += amount
+
+    def flush(self) -> int:
+        """Write all buffered increments in one statement; returns how many books were touched"""
+        with self._flush_lock:
+            deltas = self._take()
+            if not deltas:
+                return 0
+            items = sorted(deltas.items())
+            db = self.session_factory()
+            try:
+                if db.get_bind().dialect.name == "postgresql":
+                    self._values_update(db, items)
+                else:
+                    self._executemany_update(db, items)
+                record_activity(db, deltas, datetime.now(timezone.utc))
+                db.commit()
+            except Exception:
+                db.rollback()
+                self._restore(deltas)
+                raise
+            finally:
+                db.close()
+            return len(items)
+
+    @staticmethod
+    def _values_update(db, items):
+        """UPDATE books ... FROM (VALUES (id, views, downloads), ...)"""
+        Book = models.Book
+        deltas = values(
+            column("id", Integer()), *(column(counter, Integer()) for counter in COUNTERS), name="deltas",
+        ).data([(book_id, *(counts[counter] for counter in COUNTERS)) for book_id, counts in items])
+        db.execute(
+            update(Book).where(Book.id == deltas.c.id).values(
+                **{counter: func.coalesce(getattr(Book, counter), 0) + deltas.c[counter] for counter in COUNTERS},
+                updated_at=func.now(),
+            ),
+            execution_options={"synchronize_session": False},
+        )
+
+    @staticmethod
+    def _executemany_update(db, items):
+        """One `SET count = count + :delta WHERE id = :id` per book (non-PostgreSQL)"""
+        books = models.Book.__table__
+        now = datetime.now(timezone.utc)
+        db.execute(
+            update(books).where(books.c.id == bindparam("book_id")).values(
+                **{counter: func.coalesce(books.c[counter], 0) + bindparam(f"add_{counter}") for counter in COUNTERS},
+                updated_at=now,
+            ),
+            [{"book_id": book_id, **{f"add_{name}": amount for name, amount in counts.items()}} for book_id, counts in items],
+        )
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="counter-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the flush thread and write out everything still buffered"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        try:
+            flushed = self.flush()
+            if flushed:
+                print(f"[counters] Flushed {flushed} books on shutdown")
+        except Exception as e:
+            print(f"[counters] Final flush failed: {e}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[counters] Flush failed, will retry: {e}")
+            if time.monotonic() - self._last_prune >= PRUNE_EVERY_SECONDS:
+                self._last_prune = time.monotonic()
+                self.prune()
+
+    def prune(self):
+        """Expire old activity buckets and fully decayed trending scores"""
+        db = self.session_factory()
+        try:
+            prune_trending(db, datetime.now(timezone.utc))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"[counters] Trending prune failed: {e}")
+        finally:
+            db.close()
+
+
+counter_buffer = CounterBuffer(
+    SessionLocal,
+    flush_seconds=settings.COUNTER_FLUSH_SECONDS,
+    max_pending=settings.COUNTER_MAX_PENDING,
+)
@@ -1,7 +1,281 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from contextlib import contextmanager
+from uuid import uuid4
+
+from fastapi import Request
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeout
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool
 from app.core.config import settings
 
-engine = create_engine(settings.DATABASE_URL)
+try:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+    ASYNC_AVAILABLE = True
+except ImportError:
+    ASYNC_AVAILABLE = False
+
+POOL_MODES = ("session", "transaction")
+
+# Requests that run on autocommit sessions (no BEGIN/ROLLBACK round trips)
+READ_METHODS = ("GET", "HEAD")
+
+
+class PoolMetrics:
+    """Checkout counters and a wait-time histogram for one engine's pool"""
+
+    # Upper bounds in milliseconds; waits above the last land in "+Inf"
+    WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.buckets = [0] * (len(self.WAIT_BUCKETS_MS) + 1)
+
+    def observe(self, waited: float, timed_out: bool = False):
+        milliseconds = waited * 1000
+        position = next(
+            (i for i, bound in enumerate(self.WAIT_BUCKETS_MS) if milliseconds <= bound),
+            len(self.WAIT_BUCKETS_MS),
+        )
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            self.buckets[position] += 1
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            waits = self.checkouts + self.timeouts
+            histogram = {f"le_{bound}ms": count for bound, count in zip(self.WAIT_BUCKETS_MS, self.buckets)}
+            histogram["+Inf"] = self.buckets[-1]
+            metrics = {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total / waits * 1000, 3) if waits else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "wait_histogram": histogram,
+            }
+        if isinstance(pool, QueuePool):
+            metrics.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+                max_overflow=pool._max_overflow,
+            )
+        return metrics
+
+
+def timed_pool(base, metrics: PoolMetrics):
+    """Pool class that records how long each checkout waited for a connection
+
+    A subclass rather than an instance attribute so the timing survives
+    Pool.recreate() after a dispose or invalidation.
+    """
+    class TimedPool(base):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                connection = super()._do_get()
+            except PoolTimeout:
+                metrics.observe(time.perf_counter() - start, timed_out=True)
+                raise
+            metrics.observe(time.perf_counter() - start)
+            return connection
+
+    TimedPool.__name__ = f"Timed{base.__name__}"
+    return TimedPool
+
+
+def engine_options(url, pool_class, metrics: PoolMetrics) -> dict:
+    """Pool, timeout and PgBouncer settings for a PostgreSQL engine
+
+    In "transaction" mode (PgBouncer transaction pooling) server connections
+    change between transactions, so asyncpg's prepared statement caches are
+    disabled and statement_timeout is applied per transaction instead of as
+    a startup parameter, which PgBouncer would reject.
+    """
+    url = make_url(url)
+    if url.get_backend_name() != "postgresql":
+        return {}
+
+    options = {
+        "poolclass": timed_pool(pool_class, metrics),
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    is_asyncpg = url.get_driver_name() == "asyncpg"
+    timeout = settings.DB_STATEMENT_TIMEOUT_MS
+
+    connect_args = {}
+    if settings.DB_POOL_MODE == "transaction":
+        if is_asyncpg:
+            connect_args.update(
+                statement_cache_size=0,
+                prepared_statement_cache_size=0,
+                prepared_statement_name_func=lambda: f"__asyncpg_{uuid4()}__",
+            )
+    elif timeout:
+        if is_asyncpg:
+            connect_args["server_settings"] = {"statement_timeout": str(timeout)}
+        else:
+            connect_args["options"] = f"-c statement_timeout={timeout}"
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+def apply_transaction_settings(sync_engine):
+    """SET LOCAL statement_timeout at the start of every transaction"""
+    timeout = settings.DB_STATEMENT_TIMEOUT_MS
+    if settings.DB_POOL_MODE != "transaction" or not timeout or sync_engine.dialect.name != "postgresql":
+        return
+
+    @event.listens_for(sync_engine, "begin")
+    def set_statement_timeout(connection):
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout)}")
+
+
+if settings.DB_POOL_MODE not in POOL_MODES:
+    raise ValueError(f"DB_POOL_MODE must be one of {', '.join(POOL_MODES)}, got {settings.DB_POOL_MODE!r}")
+
+sync_pool_metrics = PoolMetrics()
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL, QueuePool, sync_pool_metrics))
+apply_transaction_settings(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Same pool, but statements autocommit instead of opening a transaction
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False,
+                                bind=engine.execution_options(isolation_level="AUTOCOMMIT"))
 Base = declarative_base()
+
+# Async drivers for the sync URLs this app is deployed with
+ASYNC_DRIVERS = {
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_url(url: str):
+    """Rewrite a sync DATABASE_URL for its asyncio driver
+
+    asyncpg spells libpq's `sslmode` as `ssl`, so that parameter is carried
+    over; URLs that already name an async driver are returned unchanged.
+    """
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.drivername)
+    if driver is None:
+        return parsed
+
+    parsed = parsed.set(drivername=driver)
+    if driver == "postgresql+asyncpg" and "sslmode" in parsed.query:
+        sslmode = parsed.query["sslmode"]
+        parsed = parsed.difference_update_query(["sslmode"]).update_query_dict({"ssl": sslmode})
+    return parsed
+
+
+# Read endpoints await queries on this engine instead of holding a
+# threadpool worker for the whole round trip to Postgres
+async_pool_metrics = PoolMetrics()
+async_engine = None
+AsyncSessionLocal = None
+AsyncReadSessionLocal = None
+if ASYNC_AVAILABLE:
+    try:
+        async_url = async_database_url(settings.ASYNC_DATABASE_URL or settings.DATABASE_URL)
+        async_engine = create_async_engine(
+            async_url, **engine_options(async_url, AsyncAdaptedQueuePool, async_pool_metrics)
+        )
+        apply_transaction_settings(async_engine.sync_engine)
+        AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+        AsyncReadSessionLocal = async_sessionmaker(
+            async_engine.execution_options(isolation_level="AUTOCOMMIT"), autoflush=False, expire_on_commit=False
+        )
+    except Exception as e:
+        print(f"⚠️ Async database engine unavailable (pip install asyncpg greenlet): {e}")
+else:
+    print("⚠️ SQLAlchemy asyncio extension unavailable - upgrade to SQLAlchemy 2.0")
+
+
+def pool_stats() -> dict:
+    """Live pool occupancy and checkout wait times for both engines"""
+    stats = {
+        "mode": settings.DB_POOL_MODE,
+        "statement_timeout_ms": settings.DB_STATEMENT_TIMEOUT_MS or None,
+        "sync": sync_pool_metrics.snapshot(engine.pool),
+    }
+    if async_engine is not None:
+        stats["async"] = async_pool_metrics.snapshot(async_engine.sync_engine.pool)
+    return stats
+
+
+def read_only(request: Request) -> bool:
+    """Whether a request can run on an autocommit session
+
+    Transaction pool mode keeps the transaction, since statement_timeout
+    is applied there with SET LOCAL.
+    """
+    return request.method in READ_METHODS and settings.DB_POOL_MODE == "session"
+
+
+def is_autocommit(db) -> bool:
+    """Whether a sync Session's connection commits every statement on its own"""
+    return db.connection().get_execution_options().get("isolation_level") == "AUTOCOMMIT"
+
+
+@contextmanager
+def atomic(db):
+    """Run the block as one committed transaction, even on an autocommit session"""
+    autocommit = is_autocommit(db)
+    if autocommit:
+        db.execute(text("BEGIN"))
+    try:
+        yield
+        db.flush()
+        if autocommit:
+            db.execute(text("COMMIT"))
+        db.commit()
+    except Exception:
+        if autocommit:
+            db.execute(text("ROLLBACK"))
+        db.rollback()
+        raise
+
+
+def get_db(request: Request):
+    """Request-scoped Session shared by every router
+
+    Sessions check out a connection on their first query, so responses
+    served from the cache never touch the pool. Read requests get an
+    autocommit session, saving the BEGIN and ROLLBACK round trips.
+    """
+    db = (ReadSessionLocal if read_only(request) else SessionLocal)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db(request: Request):
+    """get_db() for async handlers"""
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async database engine is not configured")
+    factory = AsyncReadSessionLocal if read_only(request) else AsyncSessionLocal
+    async with factory() as db:
+        yield db
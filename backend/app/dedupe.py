@@ -0,0 +1,183 @@
+# backend/app/dedupe.py - Duplicate detection keys and the batch existence check
+"""
+Every book carries two indexed match keys:
+
+- `dedupe_key`: title and author casefolded, accent-stripped and
+  whitespace-collapsed, so "Les Misérables / Victor Hugo" and
+  "les miserables / VICTOR  HUGO" are the same book.
+- `source_id`: a stable id in the upstream catalogue (for example
+  "gutenberg:1342"), derived from `source_url` when it is recognised.
+
+POST /books/exists answers thousands of ingestion candidates with one
+query over those two indexes instead of downloading the catalogue or
+issuing a LIKE per book. Keys are computed in Python so the API, the bulk
+update path and the import scripts agree without a database extension.
+"""
+import re
+import unicodedata
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import String, event, inspect, or_, select, text
+
+from app import models
+from app.filters import any_of
+
+MAX_EXISTS_CANDIDATES = 10000
+
+# Upstream catalogues whose URLs carry a stable numeric id
+SOURCE_ID_PATTERNS = [
+    ("gutenberg", re.compile(r"gutenberg\.org/ebooks/(\d+)")),
+]
+
+# Columns the keys are derived from; a change to any of them recomputes both
+KEY_SOURCE_COLUMNS = ("title", "author", "source_url")
+
+BACKFILL_BATCH_SIZE = 1000
+
+Candidate = Tuple[Optional[str], Optional[str], Optional[str]]  # (title, author, source_id)
+
+
+class InvalidExistsCheck(ValueError):
+    """Raised for an empty, oversized or keyless existence check"""
+
+
+def normalize_text(value: Optional[str]) -> str:
+    """Casefold, strip accents and collapse whitespace"""
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.casefold().split())
+
+
+def dedupe_key(title: Optional[str], author: Optional[str]) -> Optional[str]:
+    """Normalized title+author key; None without a title"""
+    normalized_title = normalize_text(title)
+    if not normalized_title:
+        return None
+    # Unit separator: never survives normalize_text(), so keys cannot collide
+    return f"{normalized_title}\x1f{normalize_text(author)}"
+
+
+def source_id_for(source_url: Optional[str]) -> Optional[str]:
+    """Catalogue id such as "gutenberg:1342" for a recognised source URL"""
+    for prefix, pattern in SOURCE_ID_PATTERNS:
+        match = pattern.search(source_url or "")
+        if match:
+            return f"{prefix}:{match.group(1)}"
+    return None
+
+
+def key_fields(title: Optional[str], author: Optional[str], source_url: Optional[str]) -> dict:
+    """Column values for dedupe_key and source_id"""
+    return {"dedupe_key": dedupe_key(title, author), "source_id": source_id_for(source_url)}
+
+
+def with_keys(current, fields: dict) -> dict:
+    """`fields` plus recomputed keys when they change a key source column"""
+    if not any(name in fields for name in KEY_SOURCE_COLUMNS):
+        return fields
+    merged = {name: fields.get(name, getattr(current, name)) for name in KEY_SOURCE_COLUMNS}
+    return {**fields, **key_fields(**merged)}
+
+
+@event.listens_for(models.Book, "before_insert")
+@event.listens_for(models.Book, "before_update")
+def _set_book_keys(mapper, connection, book):
+    """Keep the keys current on every ORM insert and title/author/source change"""
+    state = inspect(book)
+    if state.pending or any(state.attrs[name].history.has_changes() for name in KEY_SOURCE_COLUMNS):
+        for name, value in key_fields(book.title, book.author, book.source_url).items():
+            setattr(book, name, value)
+
+
+def check_dedupe_schema(engine) -> bool:
+    """Whether books has the key columns; migrate_database.py adds them"""
+    existing = {column["name"] for column in inspect(engine).get_columns("books")}
+    return {"dedupe_key", "source_id"} <= existing
+
+
+def backfill_keys(engine) -> int:
+    """Fill the keys of rows written without them (older rows, raw SQL imports)
+
+    Run by migrate_database.py, or `python -m app.dedupe` after a bulk load.
+    Returns how many rows were backfilled.
+    """
+    Book = models.Book
+    filled, last_id = 0, 0
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(
+                select(Book.id, Book.title, Book.author, Book.source_url)
+                .where(Book.dedupe_key.is_(None), Book.title.isnot(None), Book.id > last_id)
+                .order_by(Book.id).limit(BACKFILL_BATCH_SIZE)
+            ).all()
+            if not rows:
+                return filled
+            # Plain SQL so the backfill does not bump updated_at (and every ETag)
+            connection.execute(
+                text("UPDATE books SET dedupe_key = :dedupe_key, source_id = :source_id WHERE id = :id"),
+                [{"id": row.id, **key_fields(row.title, row.author, row.source_url)} for row in rows],
+            )
+        filled += len(rows)
+        last_id = rows[-1].id
+
+
+def existence_query(candidates: Sequence[Candidate], dialect: str):
+    """(id, dedupe_key, source_id) of every book matching any candidate key"""
+    if not candidates:
+        raise InvalidExistsCheck("No books to check")
+    if len(candidates) > MAX_EXISTS_CANDIDATES:
+        raise InvalidExistsCheck(f"At most {MAX_EXISTS_CANDIDATES} books per check, got {len(candidates)}")
+
+    keys, source_ids = set(), set()
+    for index, (title, author, source_id) in enumerate(candidates):
+        key = dedupe_key(title, author)
+        if key is None and not source_id:
+            raise InvalidExistsCheck(f"Book {index} needs a title or a source_id")
+        if key is not None:
+            keys.add(key)
+        if source_id:
+            source_ids.add(source_id)
+
+    Book = models.Book
+    conditions = []
+    if keys:
+        conditions.append(any_of(Book.dedupe_key, keys, String, dialect))
+    if source_ids:
+        conditions.append(any_of(Book.source_id, source_ids, String, dialect))
+    return select(Book.id, Book.dedupe_key, Book.source_id).where(or_(*conditions)).order_by(Book.id)
+
+
+def align_existing(rows, candidates: Sequence[Candidate]) -> List[Optional[dict]]:
+    """Per candidate, the lowest matching id and which key matched (source_id wins), or None"""
+    by_key: Dict[str, int] = {}
+    by_source: Dict[str, int] = {}
+    for row in rows:
+        if row.dedupe_key is not None:
+            by_key.setdefault(row.dedupe_key, row.id)
+        if row.source_id is not None:
+            by_source.setdefault(row.source_id, row.id)
+
+    aligned = []
+    for title, author, source_id in candidates:
+        if source_id and source_id in by_source:
+            aligned.append({"id": by_source[source_id], "matched_on": "source_id"})
+        elif dedupe_key(title, author) in by_key:
+            aligned.append({"id": by_key[dedupe_key(title, author)], "matched_on": "title_author"})
+        else:
+            aligned.append(None)
+    return aligned
+
+
+def existence_payload(aligned: List[Optional[dict]]) -> dict:
+    """Matches aligned with the request plus the indexes of new books"""
+    return {
+        "results": aligned,
+        "found": sum(1 for match in aligned if match is not None),
+        "new": [index for index, match in enumerate(aligned) if match is None],
+    }
+
+
+if __name__ == "__main__":
+    from app.db import engine
+
+    print(f"[dedupe] Backfilled keys for {backfill_keys(engine)} books")
@@ -0,0 +1,385 @@
+# backend/app/epub.py - Random access to EPUB chapters with ranged S3 reads
+"""
+An EPUB is a ZIP archive. Its central directory at the end of the file
+lists every member with its offset, so one chapter can be read without
+fetching the rest of the book:
+
+1. Read the last TAIL_BYTES of the object, find the end of central
+   directory record (zip64 too) and read whatever part of the directory
+   the tail did not cover.
+2. Read META-INF/container.xml, the OPF package document it points to
+   (manifest and spine) and the table of contents: the EPUB 3 nav document,
+   or the EPUB 2 NCX.
+3. Read chapter n as one ranged GET covering its local header and
+   compressed bytes, then inflate it.
+
+Steps 1 and 2 build an EpubIndex, cached per S3 key for the
+lifetime of the process; opening chapter 40 of War and Peace afterwards
+costs a single read of a few KB. All of this blocks on S3; call it through
+app.storage.run_io.
+"""
+import posixpath
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote, urldefrag
+from xml.etree import ElementTree
+
+from botocore.exceptions import ClientError
+
+from app.storage import S3Object
+
+# Covers the end record of any archive without a long comment, and the
+# whole central directory of most EPUBs
+TAIL_BYTES = 16 * 1024
+END_RECORD_BYTES = 22
+MAX_COMMENT_BYTES = 0xFFFF
+LOCAL_HEADER_BYTES = 30
+# Local extra fields rarely differ from the central ones by more than this
+LOCAL_EXTRA_SLACK = 256
+
+MAX_CHAPTER_BYTES = 32 * 1024 * 1024
+MAX_INDEXES = 512
+
+STORED, DEFLATED = 0, 8
+
+CONTAINER_PATH = "META-INF/container.xml"
+NS = {
+    "container": "urn:oasis:names:tc:opendocument:xmlns:container",
+    "opf": "http://www.idpf.org/2007/opf",
+    "dc": "http://purl.org/dc/elements/1.1/",
+    "ncx": "http://www.daisy.org/z3986/2005/ncx/",
+    "xhtml": "http://www.w3.org/1999/xhtml",
+}
+EPUB_TYPE = "{http://www.idpf.org/2007/ops}type"
+
+
+class InvalidEpub(ValueError):
+    """The stored file is not an EPUB this module can read"""
+
+
+class ChapterNotFound(LookupError):
+    """No spine item with that number"""
+
+
+class BookFileMissing(LookupError):
+    """The book row points at an object that is not in the bucket"""
+
+
+@contextmanager
+def _reading(source: S3Object):
+    """Report a missing object as BookFileMissing and a malformed archive as InvalidEpub"""
+    try:
+        yield
+    except ClientError as e:
+        code = e.response.get("Error", {}).get("Code")
+        if code in ("NoSuchKey", "NotFound", "404"):
+            raise BookFileMissing(f"{source.key} is missing from storage")
+        if code == "InvalidRange":
+            raise InvalidEpub("Archive is shorter than its directory says")
+        raise
+    except (struct.error, UnicodeDecodeError, IndexError) as e:
+        raise InvalidEpub(f"Malformed ZIP structure: {e}")
+
+
+@dataclass(frozen=True)
+class ZipEntry:
+    method: int
+    flags: int
+    compressed_size: int
+    size: int
+    offset: int  # of the local header
+    name_length: int
+    extra_length: int
+
+
+@dataclass(frozen=True)
+class Chapter:
+    number: int  # 1-based position in the spine
+    path: str  # member name inside the archive
+    media_type: str
+    title: Optional[str]
+    linear: bool
+    size: int
+
+
+@dataclass(frozen=True)
+class EpubIndex:
+    etag: Optional[str]
+    size: int
+    title: Optional[str]
+    chapters: List[Chapter]
+    entries: Dict[str, ZipEntry]
+
+
+def _read(source: S3Object, etag: Optional[str], start: int, end: int) -> bytes:
+    return b"".join(source.read_range(start, end, if_match=etag))
+
+
+def _end_record(tail: bytes) -> int:
+    """Position of the end of central directory record in `tail`, or -1"""
+    position = tail.rfind(b"PK\x05\x06")
+    while position >= 0:
+        comment_length = struct.unpack_from("<H", tail, position + 20)[0] \
+            if position + END_RECORD_BYTES <= len(tail) else -1
+        if position + END_RECORD_BYTES + comment_length == len(tail):
+            return position
+        position = tail.rfind(b"PK\x05\x06", 0, position)
+    return -1
+
+
+def _zip64_extra(extra: bytes, fields: List[int]) -> List[int]:
+    """Replace the 0xFFFFFFFF values in `fields` (sizes, then offset) from the zip64 extra"""
+    position = 0
+    while position + 4 <= len(extra):
+        header, length = struct.unpack_from("<HH", extra, position)
+        if header == 0x0001:
+            values = iter(struct.unpack_from(f"<{length // 8}Q", extra, position + 4))
+            return [next(values, field) if field == 0xFFFFFFFF else field for field in fields]
+        position += 4 + length
+    return fields
+
+
+def read_directory(source: S3Object, size: int, etag: Optional[str]) -> Dict[str, ZipEntry]:
+    """Every member of the archive by name, from its central directory"""
+    tail_start = max(0, size - TAIL_BYTES)
+    tail = _read(source, etag, tail_start, size - 1) if size else b""
+    position = _end_record(tail)
+    if position < 0 and tail_start > 0:
+        # A long archive comment pushed the end record further back
+        tail_start = max(0, size - END_RECORD_BYTES - MAX_COMMENT_BYTES)
+        tail = _read(source, etag, tail_start, size - 1)
+        position = _end_record(tail)
+    if position < 0:
+        raise InvalidEpub("No ZIP end of central directory record")
+
+    count, directory_size, directory_offset = struct.unpack_from("<HII", tail, position + 10)
+    if 0xFFFFFFFF in (directory_size, directory_offset) or count == 0xFFFF:
+        locator = position - 20
+        if locator < 0 or tail[locator:locator + 4] != b"PK\x06\x07":
+            raise InvalidEpub("zip64 end of central directory locator missing")
+        record_offset = struct.unpack_from("<Q", tail, locator + 8)[0]
+        record = _read(source, etag, record_offset, record_offset + 55)
+        if record[:4] != b"PK\x06\x06":
+            raise InvalidEpub("zip64 end of central directory record missing")
+        count, directory_size, directory_offset = struct.unpack_from("<QQQ", record, 32)
+
+    if directory_offset >= tail_start:
+        start = directory_offset - tail_start
+        directory = tail[start:start + directory_size]
+    else:
+        directory = _read(source, etag, directory_offset, tail_start - 1) + tail
+        directory = directory[:directory_size]
+    if len(directory) != directory_size:
+        raise InvalidEpub("ZIP central directory runs past the end of the file")
+
+    entries, position = {}, 0
+    for _ in range(count):
+        if directory[position:position + 4] != b"PK\x01\x02":
+            raise InvalidEpub("Corrupt ZIP central directory")
+        (flags, method, compressed_size, uncompressed_size, name_length, extra_length,
+         comment_length, offset) = struct.unpack_from("<8xHH8xIIHHH8xI", directory, position)
+        name = directory[position + 46:position + 46 + name_length]
+        extra = directory[position + 46 + name_length:position + 46 + name_length + extra_length]
+        uncompressed_size, compressed_size, offset = _zip64_extra(
+            extra, [uncompressed_size, compressed_size, offset]
+        )
+        decoded = name.decode("utf-8" if flags & 0x0800 else "cp437")
+        entries[decoded] = ZipEntry(method, flags, compressed_size, uncompressed_size, offset,
+                                    name_length, extra_length)
+        position += 46 + name_length + extra_length + comment_length
+    return entries
+
+
+def read_entry(source: S3Object, etag: Optional[str], entry: ZipEntry, size: int) -> bytes:
+    """One member's uncompressed bytes, in one ranged GET (two if its local extra is large)"""
+    if entry.flags & 0x0001:
+        raise InvalidEpub("Encrypted ZIP members are not supported")
+    if entry.method not in (STORED, DEFLATED):
+        raise InvalidEpub(f"Unsupported ZIP compression method {entry.method}")
+    if entry.size > MAX_CHAPTER_BYTES:
+        raise InvalidEpub(f"Member is {entry.size} bytes; at most {MAX_CHAPTER_BYTES} are served")
+
+    guess = LOCAL_HEADER_BYTES + entry.name_length + entry.extra_length + LOCAL_EXTRA_SLACK
+    data = _read(source, etag, entry.offset, min(entry.offset + guess + entry.compressed_size, size) - 1)
+    if data[:4] != b"PK\x03\x04":
+        raise InvalidEpub("Corrupt ZIP local header")
+    name_length, extra_length = struct.unpack_from("<HH", data, 26)
+    start = LOCAL_HEADER_BYTES + name_length + extra_length
+    if start + entry.compressed_size > len(data):
+        data += _read(source, etag, entry.offset + len(data), entry.offset + start + entry.compressed_size - 1)
+    raw = data[start:start + entry.compressed_size]
+
+    if entry.method == STORED:
+        return raw
+    try:
+        return zlib.decompressobj(-15).decompress(raw, MAX_CHAPTER_BYTES)
+    except zlib.error as e:
+        raise InvalidEpub(f"Corrupt deflate stream: {e}")
+
+
+def _parse(data: bytes, what: str):
+    try:
+        return ElementTree.fromstring(data)
+    except ElementTree.ParseError as e:
+        raise InvalidEpub(f"Malformed {what}: {e}")
+
+
+def _resolve(base: str, href: str) -> str:
+    """Archive path of `href` relative to the document at `base`, without its fragment"""
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base), unquote(urldefrag(href)[0])))
+
+
+def _text(element) -> Optional[str]:
+    text = " ".join("".join(element.itertext()).split())
+    return text or None
+
+
+def _nav_titles(document, path: str) -> Dict[str, str]:
+    """Chapter titles from an EPUB 3 nav document's toc, first label per file"""
+    titles = {}
+    navs = document.iter(f"{{{NS['xhtml']}}}nav")
+    toc = next((nav for nav in navs if "toc" in (nav.get(EPUB_TYPE) or "").split()), None)
+    for link in (toc.iter(f"{{{NS['xhtml']}}}a") if toc is not None else ()):
+        href, label = link.get("href"), _text(link)
+        if href and label:
+            titles.setdefault(_resolve(path, href), label)
+    return titles
+
+
+def _ncx_titles(document, path: str) -> Dict[str, str]:
+    """Chapter titles from an EPUB 2 NCX, first label per file"""
+    titles = {}
+    for point in document.iter(f"{{{NS['ncx']}}}navPoint"):
+        label = point.find("ncx:navLabel/ncx:text", NS)
+        content = point.find("ncx:content", NS)
+        if label is not None and content is not None and content.get("src") and _text(label):
+            titles.setdefault(_resolve(path, content.get("src")), _text(label))
+    return titles
+
+
+def build_index(source: S3Object) -> EpubIndex:
+    """Directory, package document and table of contents of one EPUB"""
+    info = source.info()
+    entries = read_directory(source, info.size, info.etag)
+
+    def member(path: str) -> bytes:
+        if path not in entries:
+            raise InvalidEpub(f"{path} is missing from the archive")
+        return read_entry(source, info.etag, entries[path], info.size)
+
+    rootfile = _parse(member(CONTAINER_PATH), CONTAINER_PATH).find(".//container:rootfile", NS)
+    if rootfile is None or not rootfile.get("full-path"):
+        raise InvalidEpub("container.xml names no package document")
+    package_path = rootfile.get("full-path")
+    package = _parse(member(package_path), package_path)
+
+    manifest = {
+        item.get("id"): item for item in package.iterfind("opf:manifest/opf:item", NS) if item.get("href")
+    }
+    spine = package.find("opf:spine", NS)
+    if spine is None:
+        raise InvalidEpub("Package document has no spine")
+
+    titles: Dict[str, str] = {}
+    nav = next((item for item in manifest.values() if "nav" in (item.get("properties") or "").split()), None)
+    ncx = manifest.get(spine.get("toc"))
+    try:
+        if nav is not None:
+            path = _resolve(package_path, nav.get("href"))
+            titles = _nav_titles(_parse(member(path), path), path)
+        if not titles and ncx is not None:
+            path = _resolve(package_path, ncx.get("href"))
+            titles = _ncx_titles(_parse(member(path), path), path)
+    except InvalidEpub as e:
+        # Chapters stay readable without titles
+        print(f"[epub] Table of contents of {source.key} unreadable: {e}")
+
+    chapters = []
+    for itemref in spine.iterfind("opf:itemref", NS):
+        item = manifest.get(itemref.get("idref"))
+        if item is None:
+            continue
+        path = _resolve(package_path, item.get("href"))
+        if path not in entries:
+            continue
+        chapters.append(Chapter(
+            number=len(chapters) + 1,
+            path=path,
+            media_type=item.get("media-type") or "application/xhtml+xml",
+            title=titles.get(path),
+            linear=itemref.get("linear") != "no",
+            size=entries[path].size,
+        ))
+
+    title = package.find("opf:metadata/dc:title", NS)
+    return EpubIndex(
+        etag=info.etag,
+        size=info.size,
+        title=_text(title) if title is not None else None,
+        chapters=chapters,
+        entries={chapter.path: entries[chapter.path] for chapter in chapters},
+    )
+
+
+class EpubIndexes:
+    """EpubIndex per S3 key, least recently used dropped past `max_entries`"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._indexes: "OrderedDict[str, EpubIndex]" = OrderedDict()
+        self.hits = self.builds = 0
+
+    def get(self, source: S3Object, refresh: bool = False) -> EpubIndex:
+        with self._lock:
+            index = None if refresh else self._indexes.get(source.key)
+            if index is not None:
+                self._indexes.move_to_end(source.key)
+                self.hits += 1
+                return index
+        with _reading(source):
+            index = build_index(source)
+        with self._lock:
+            self._indexes[source.key] = index
+            self._indexes.move_to_end(source.key)
+            while len(self._indexes) > self.max_entries:
+                self._indexes.popitem(last=False)
+            self.builds += 1
+        return index
+
+    def read_chapter(self, source: S3Object, number: int) -> Tuple[Chapter, bytes]:
+        """Chapter `number` (1-based) and its bytes"""
+        index = self.get(source)
+        with _reading(source):
+            try:
+                return self._read_chapter(source, index, number)
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") != "PreconditionFailed":
+                    raise
+        # The object was replaced since its index was built
+        index = self.get(source, refresh=True)
+        with _reading(source):
+            return self._read_chapter(source, index, number)
+
+    @staticmethod
+    def _read_chapter(source: S3Object, index: EpubIndex, number: int) -> Tuple[Chapter, bytes]:
+        if not 1 <= number <= len(index.chapters):
+            raise ChapterNotFound(f"Chapter {number} not found; the book has {len(index.chapters)}")
+        chapter = index.chapters[number - 1]
+        return chapter, read_entry(source, index.etag, index.entries[chapter.path], index.size)
+
+    def forget(self, key: str):
+        with self._lock:
+            self._indexes.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._indexes), "hits": self.hits, "builds": self.builds}
+
+
+epub_indexes = EpubIndexes(MAX_INDEXES)
@@ -0,0 +1,119 @@
+# backend/app/facets.py - Per-query facet counts for search and listing endpoints
+"""
+`facets=genre,language` on /books/search and /api/v1/books returns value
+counts for the books matching the current filters, next to the results.
+On PostgreSQL every requested facet is counted in a single pass with
+GROUP BY GROUPING SETS; elsewhere the per-facet groups are UNION ALLed.
+Counts depend only on the filters, not on page, limit, sort or fields, so
+they are cached separately under a normalized key and shared by every page
+of the same search.
+"""
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, literal, select, union_all
+from sqlalchemy.orm import Query
+
+from app import models
+from app.cache import response_cache
+from app.serializers import dumps, loads
+
+FACET_COLUMNS = {
+    "genre": models.Book.genre,
+    "language": models.Book.language,
+    "copyright_status": models.Book.copyright_status,
+    "publication_year": models.Book.publication_year,
+}
+
+# Values returned per facet, largest counts first
+FACET_TOP_N = 20
+
+# Filters matched case-insensitively (ILIKE or full-text search); only these
+# may share a cache entry across letter case. Whitespace is significant to
+# ILIKE, so it is left alone.
+CASE_INSENSITIVE_FILTERS = frozenset({"q", "search", "title", "author", "genre"})
+
+
+class InvalidFacets(ValueError):
+    """Raised when a `facets=` parameter names an unsupported facet"""
+
+
+def parse_facets(facets: Optional[str]) -> Tuple[str, ...]:
+    """Validate a comma-separated facet list; order and duplicates are ignored"""
+    if not facets:
+        return ()
+    names = {name.strip() for name in facets.split(",") if name.strip()}
+    unknown = names - FACET_COLUMNS.keys()
+    if unknown:
+        raise InvalidFacets(
+            f"Unknown facets: {', '.join(sorted(unknown))}. "
+            f"Available: {', '.join(FACET_COLUMNS)}"
+        )
+    return tuple(sorted(names))
+
+
+def _facet_rows(db, query, names: Tuple[str, ...]):
+    """(facet, value, count) rows for the books matched by a Query or select()"""
+    statement = query.statement if isinstance(query, Query) else query
+    matched = statement.with_only_columns(*(FACET_COLUMNS[name] for name in names)).order_by(None).subquery()
+    columns = [matched.c[FACET_COLUMNS[name].key] for name in names]
+
+    if db.get_bind().dialect.name == "postgresql":
+        # GROUPING(col) = 0 marks the set a row belongs to, so real NULL
+        # values are not confused with the rolled-up columns
+        stmt = select(
+            *(func.grouping(column) for column in columns), *columns, func.count()
+        ).group_by(func.grouping_sets(*columns))
+        for row in db.execute(stmt):
+            flags, values, count = row[:len(names)], row[len(names):-1], row[-1]
+            position = flags.index(0)
+            yield names[position], values[position], count
+        return
+
+    stmt = union_all(*(
+        select(literal(name).label("facet"), column.label("value"), func.count().label("n"))
+        .group_by(column)
+        for name, column in zip(names, columns)
+    ))
+    yield from db.execute(stmt)
+
+
+def facet_counts(db, query, names: Tuple[str, ...], top_n: int = FACET_TOP_N) -> Dict[str, List[dict]]:
+    """Count the top values of each facet among the books matched by `query`"""
+    counts: Dict[str, List[dict]] = {name: [] for name in names}
+    if not names:
+        return counts
+
+    for facet, value, count in _facet_rows(db, query, names):
+        if value is None or value == "":
+            continue
+        counts[facet].append({"value": value, "count": count})
+
+    for name in names:
+        counts[name] = sorted(counts[name], key=lambda item: (-item["count"], str(item["value"])))[:top_n]
+    return counts
+
+
+def _cache_key(namespace: str, filters: dict, names: Tuple[str, ...]) -> str:
+    normalized = {
+        name: value.lower() if name in CASE_INSENSITIVE_FILTERS and isinstance(value, str) else value
+        for name, value in filters.items()
+    }
+    normalized["facets"] = ",".join(names)
+    return response_cache.make_key(f"facets:{namespace}", normalized)
+
+
+async def cached_facet_counts(db, namespace: str, filters: dict, query,
+                              names: Tuple[str, ...]) -> Dict[str, List[dict]]:
+    """facet_counts() memoized per normalized filter set and catalog version
+
+    `db` is an AsyncSession; cache lookups stay off the event loop.
+    """
+    key = await response_cache.versioned_async(_cache_key(namespace, filters, names))
+
+    body = await response_cache.get_async(key)
+    if body is not None:
+        return loads(body)
+
+    counts = await db.run_sync(facet_counts, query, names)
+    await response_cache.set_async(key, dumps(counts))
+    return counts
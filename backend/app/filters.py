@@ -0,0 +1,79 @@
+# backend/app/filters.py - Book filters shared by the batch endpoints
+"""
+PATCH /api/v1/books/bulk and POST /books/download-bundle both accept a
+`filter` such as {"genre": "Poetry", "is_public": true}. book_criteria()
+turns it into a WHERE clause, checking every name against the books table
+and coercing every value to its column's type first, so a mistyped value
+is answered with 422 instead of failing in the database driver.
+
+The batch lookups (ids, dedupe keys, source ids) match a column against
+thousands of values with any_of().
+"""
+from typing import Collection, Dict, Optional
+
+from pydantic import ValidationError, parse_obj_as
+from sqlalchemy import JSON, BigInteger, Integer, any_, bindparam, true
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from app import models
+
+# Range of a 32-bit INTEGER column; larger values fail in the database
+INTEGER_RANGE = (-2 ** 31, 2 ** 31 - 1)
+
+
+class InvalidFilter(ValueError):
+    """Raised for an empty filter or an unknown filter column"""
+
+
+class InvalidFilterValue(ValueError):
+    """Raised when a filter value does not fit its column's type"""
+
+
+def filter_value(attribute, name: str, value):
+    """`value` coerced to the column's Python type, so a mistyped filter never reaches the database"""
+    column_type = attribute.type
+    if isinstance(column_type, JSON):
+        raise InvalidFilterValue(f"Cannot filter on JSON column: {name}")
+    python_type = column_type.python_type
+    try:
+        coerced = parse_obj_as(python_type, value)
+    except ValidationError:
+        raise InvalidFilterValue(f"Filter {name} must be of type {python_type.__name__}, got {value!r}")
+    if isinstance(column_type, Integer) and not isinstance(column_type, BigInteger) \
+            and not INTEGER_RANGE[0] <= coerced <= INTEGER_RANGE[1]:
+        raise InvalidFilterValue(f"Filter {name} is out of range: {value!r}")
+    return coerced
+
+
+def book_criteria(filters: Dict[str, Optional[object]], action: str):
+    """Books whose columns equal `filters` (None matches NULL)
+
+    `action` completes the refusal of an empty filter: "An empty filter
+    would <action> every book".
+    """
+    if not filters:
+        raise InvalidFilter(f"An empty filter would {action} every book; list the ids instead")
+
+    Book = models.Book
+    criteria = true()
+    for name, value in filters.items():
+        if name not in Book.__table__.columns:
+            raise InvalidFilter(f"Unknown filter column: {name}")
+        attribute = getattr(Book, name)
+        if value is None:
+            criteria = criteria & attribute.is_(None)
+        else:
+            criteria = criteria & (attribute == filter_value(attribute, name, value))
+    return criteria
+
+
+def any_of(column, values: Collection, element_type, dialect: str):
+    """`column` equal to one of `values`
+
+    On PostgreSQL the values are bound as a single array (`= ANY(:values)`),
+    so the statement and its plan are the same however many are sent; an
+    IN list elsewhere.
+    """
+    if dialect == "postgresql":
+        return column == any_(bindparam(f"{column.key}_values", list(values), type_=ARRAY(element_type)))
+    return column.in_(list(values))
@@ -0,0 +1,120 @@
+# backend/app/lookup.py - Batch book lookup by ids or (title, author) pairs
+"""
+GET /books?ids=… and POST /books/lookup resolve a whole shelf, reading list
+or tool batch with one query instead of one /books/{id} call per book. On
+PostgreSQL ids are bound as a single array (see app/filters.any_of), so
+the statement and its plan are the same however many ids are sent. Results
+come back aligned with the input: one entry per requested key, null when
+the book does not exist.
+"""
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import Integer, func, or_, tuple_
+
+from app import models
+from app.filters import any_of
+
+MAX_LOOKUP_KEYS = 5000
+
+TitleAuthor = Tuple[str, Optional[str]]
+
+
+class InvalidLookup(ValueError):
+    """Raised for an empty, oversized or malformed lookup"""
+
+
+def _check_size(count: int):
+    if not count:
+        raise InvalidLookup("No ids or books to look up")
+    if count > MAX_LOOKUP_KEYS:
+        raise InvalidLookup(f"At most {MAX_LOOKUP_KEYS} books per lookup, got {count}")
+
+
+def parse_ids(ids: str) -> List[int]:
+    """Parse a comma-separated `ids=` parameter, keeping order and duplicates"""
+    try:
+        parsed = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise InvalidLookup(f"ids must be comma-separated integers: {ids}")
+    _check_size(len(parsed))
+    return parsed
+
+
+def by_ids(query, ids: Sequence[int], dialect: str):
+    """Restrict a query selecting Book.id last to `ids`; see align_by_id()"""
+    _check_size(len(ids))
+    return query.filter(any_of(models.Book.id, set(ids), Integer, dialect))
+
+
+def align_by_id(rows, ids: Sequence[int]) -> list:
+    """Rows (Book.id last) reordered to `ids`, with None for missing ids"""
+    by_id = {row[-1]: row for row in rows}
+    return [by_id.get(book_id) for book_id in ids]
+
+
+def _normalize(value: Optional[str]) -> str:
+    return " ".join((value or "").lower().split())
+
+
+# SQLite has no regexp_replace; each pass halves runs of spaces, so this covers runs up to 64
+_SPACE_PASSES = 6
+
+
+def _normalized(column, dialect: str):
+    """_normalize() in SQL: lowercased, whitespace runs collapsed to one space, trimmed"""
+    value = func.lower(column)
+    if dialect == "postgresql":
+        return func.trim(func.regexp_replace(value, r"\s+", " ", "g"))
+    for whitespace in ("\t", "\n", "\r"):
+        value = func.replace(value, whitespace, " ")
+    for _ in range(_SPACE_PASSES):
+        value = func.replace(value, "  ", " ")
+    return func.trim(value)
+
+
+def pair_columns(dialect: str):
+    """Trailing columns a pair lookup must select after Book.id"""
+    Book = models.Book
+    return _normalized(Book.title, dialect), _normalized(func.coalesce(Book.author, ""), dialect)
+
+
+def by_pairs(query, pairs: Sequence[TitleAuthor], dialect: str):
+    """Restrict a query selecting pair_columns() last to case-insensitive title/author matches
+
+    A pair without an author matches the title alone.
+    """
+    _check_size(len(pairs))
+    title, author = pair_columns(dialect)
+    with_author = {(_normalize(t), _normalize(a)) for t, a in pairs if a}
+    title_only = {_normalize(t) for t, a in pairs if not a}
+
+    conditions = []
+    if with_author:
+        conditions.append(tuple_(title, author).in_(with_author))
+    if title_only:
+        conditions.append(title.in_(title_only))
+    return query.filter(or_(*conditions)).order_by(models.Book.id)
+
+
+def align_by_pair(rows, pairs: Sequence[TitleAuthor]) -> list:
+    """Rows (..., id, title, author normalized) aligned to `pairs`; the lowest id wins"""
+    by_pair, by_title = {}, {}
+    for row in rows:
+        by_pair.setdefault((row[-2], row[-1]), row)
+        by_title.setdefault(row[-2], row)
+    aligned = []
+    for title, author in pairs:
+        if author:
+            aligned.append(by_pair.get((_normalize(title), _normalize(author))))
+        else:
+            aligned.append(by_title.get(_normalize(title)))
+    return aligned
+
+
+def lookup_payload(serializer, aligned: list, keys: list) -> dict:
+    """Books aligned with the request keys plus the keys that were not found"""
+    return {
+        "books": [serializer.from_row(row) if row is not None else None for row in aligned],
+        "found": sum(1 for row in aligned if row is not None),
+        "missing": [key for key, row in zip(keys, aligned) if row is None],
+    }
@@ -1,17 +1,46 @@
 # backend/app/main.py - Complete Updated Version with Cover URL Support
 import uuid
 from typing import List, Optional
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, Form, Query
+from fastapi import FastAPI, Depends, HTTPException, UploadFile, Form, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_, inspect as sql_inspect
-from app.db import SessionLocal, engine
+from sqlalchemy import or_, and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import SessionLocal, engine, get_async_db, get_db, pool_stats
+from app.api.v1 import books as books_v1
 from app import models, schemas
+from app.object_cache import object_cache
+from app.ranges import is_first_read
+from app.pagination import InvalidCursor, after_cursor, encode_cursor, newest_first
+from app.autocomplete import autocomplete
+from app.bundle import InvalidBundle, bundle_query, bundle_size, order_rows, plan_bundle, stream_bundle
+from app.counters import counter_buffer
+from app.dedupe import (
+    InvalidExistsCheck, align_existing, check_dedupe_schema, existence_payload, existence_query,
+)
+from app.epub import BookFileMissing, ChapterNotFound, InvalidEpub, epub_indexes
+from app.facets import InvalidFacets, cached_facet_counts, parse_facets
+from app.filters import InvalidFilter, InvalidFilterValue
+from app.lookup import (
+    InvalidLookup, align_by_id, align_by_pair, by_ids, by_pairs, lookup_payload, pair_columns, parse_ids,
+)
+from app.cache import cached_response, response_cache
+from app.conditional import conditional_get, is_not_modified, make_etag, not_modified, validator_headers
+from app.search import (
+    FUZZY_MIN_RESULTS, apply_fuzzy_search, apply_text_search, check_search_schema, trigram_enabled,
+)
+from app.search_engine import (
+    OutboxWorker, enqueue_search_sync, filter_expression, rows_in_order, search_ids_async,
+)
+from app.stats import book_facts, read_snapshot as read_library_snapshot, record_book_change
+from app.storage import S3Object, presigned_urls, run_io
+from app.serializers import InvalidFields, book_serializer, dumps, json_response
+from app.trending import DEFAULT_PERIOD, InvalidPeriod, current_score, parse_period, trending_query
 from app.core.config import settings
 import boto3
 from botocore.client import Config as BotoConfig
-from fastapi.responses import StreamingResponse
-from datetime import datetime
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
+from datetime import datetime, timezone
 
 # Create tables if not exist
 try:
@@ -20,6 +49,24 @@ try:
 except Exception as e:
     print(f"⚠️ Database table creation warning: {e}")
 
+# Search and duplicate detection schema comes from migrate_database.py; only check it here
+try:
+    fulltext, trigram = check_search_schema(engine)
+    if fulltext:
+        print("✅ Full-text search index ready")
+    if trigram:
+        print("✅ Trigram fuzzy search ready")
+except Exception as e:
+    print(f"⚠️ Search schema check warning: {e}")
+
+try:
+    if check_dedupe_schema(engine):
+        print("✅ Duplicate detection keys ready")
+    else:
+        print("⚠️ books.dedupe_key/source_id missing - run migrate_database.py")
+except Exception as e:
+    print(f"⚠️ Duplicate detection check warning: {e}")
+
 app = FastAPI(
     title="Readora Professional Library API",
     description="Global Digital Library Management System - Professional Edition",
@@ -42,12 +89,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+app.include_router(books_v1.router, prefix="/api/v1", tags=["v1"])
+
+search_outbox_worker = OutboxWorker(
+    SessionLocal,
+    batch_size=settings.SEARCH_OUTBOX_BATCH_SIZE,
+    poll_seconds=settings.SEARCH_OUTBOX_POLL_SECONDS,
+)
+
+@app.on_event("startup")
+def start_search_outbox_worker():
+    search_outbox_worker.start()
+
+@app.on_event("shutdown")
+def stop_search_outbox_worker():
+    search_outbox_worker.stop()
+
+@app.on_event("startup")
+def start_counter_flush():
+    counter_buffer.start()
+
+@app.on_event("shutdown")
+def flush_counters():
+    counter_buffer.stop()
 
 # Initialize S3 clients
 try:
@@ -86,9 +150,17 @@ def read_root():
             "user_uploads": "/books/user-uploads", 
             "all_books": "/books",
             "upload": "/books (POST)",
+            "lookup": "/books/lookup (POST)",
+            "exists": "/books/exists (POST)",
+            "download_bundle": "/books/download-bundle (POST)",
+            "chapters": "/books/{id}/chapters",
             "search": "/books/search",
             "featured": "/books/featured",
+            "trending": "/books/trending?window=7d",
             "stats": "/stats",
+            "paginated_books": "/api/v1/books",
+            "cache_stats": "/cache/stats",
+            "pool_stats": "/db/pool/stats",
             "health": "/health",
             "docs": "/docs"
         }
@@ -108,17 +180,22 @@ def health_check():
 
 # Get public library books
 @app.get("/books/public")
-def get_public_books(
+@conditional_get("books_public")
+@cached_response("books_public")
+async def get_public_books(
+    request: Request,
     genre: Optional[str] = Query(None, description="Filter by genre"),
     featured_only: bool = Query(False, description="Show only featured books"),
     limit: int = Query(100, description="Maximum number of books to return"),
-    db: Session = Depends(get_db)
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,title,author,cover_url"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get public library books - curated, legal, public domain content"""
     try:
         print(f"[get_public_books] Fetching public books (genre={genre}, featured={featured_only}, limit={limit})")
         
-        query = db.query(models.Book)
+        serializer = book_serializer.for_fields(fields)
+        query = select(*serializer.columns)
         
         try:
             public_filter = or_(
@@ -157,26 +234,28 @@ def get_public_books(
         except:
             query = query.order_by(models.Book.title.asc())
         
-        books = query.limit(limit).all()
-        print(f"[get_public_books] Found {len(books)} public books")
+        rows = (await db.execute(query.limit(limit))).all()
+        print(f"[get_public_books] Found {len(rows)} public books")
         
-        return convert_books_to_dict(books)
+        return json_response(serializer.from_rows(rows))
         
+    except InvalidFields as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"[get_public_books] Error: {e}")
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 # Get user uploaded books
 @app.get("/books/user-uploads")
-def get_user_uploads(
+async def get_user_uploads(
     limit: int = Query(50, description="Maximum number of books to return"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get user uploaded books - personal collections"""
     try:
         print(f"[get_user_uploads] Fetching user uploads (limit={limit})")
         
-        query = db.query(models.Book)
+        query = select(*book_serializer.columns)
         
         try:
             query = query.filter(
@@ -190,10 +269,10 @@ def get_user_uploads(
             print(f"[get_user_uploads] Using fallback filter: {e}")
             query = query.filter(models.Book.filename.isnot(None))
         
-        books = query.order_by(models.Book.created_at.desc()).limit(limit).all()
-        print(f"[get_user_uploads] Found {len(books)} user uploads")
+        rows = (await db.execute(query.order_by(models.Book.created_at.desc()).limit(limit))).all()
+        print(f"[get_user_uploads] Found {len(rows)} user uploads")
         
-        return convert_books_to_dict(books)
+        return json_response(book_serializer.from_rows(rows))
         
     except Exception as e:
         print(f"[get_user_uploads] Error: {e}")
@@ -201,15 +280,20 @@ def get_user_uploads(
 
 # Get featured books
 @app.get("/books/featured")
-def get_featured_books(
+@conditional_get("books_featured")
+@cached_response("books_featured")
+async def get_featured_books(
+    request: Request,
     limit: int = Query(12, description="Maximum number of featured books"),
-    db: Session = Depends(get_db)
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,title,author,cover_url"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get featured books for homepage display"""
     try:
         print(f"[get_featured_books] Fetching featured books (limit={limit})")
         
-        query = db.query(models.Book)
+        serializer = book_serializer.for_fields(fields)
+        query = select(*serializer.columns)
         
         try:
             query = query.filter(models.Book.is_featured.is_(True))
@@ -219,30 +303,85 @@ def get_featured_books(
             else:
                 query = query.filter(models.Book.source == 'Sample Data')
         
-        books = query.order_by(models.Book.title.asc()).limit(limit).all()
-        print(f"[get_featured_books] Found {len(books)} featured books")
+        rows = (await db.execute(query.order_by(models.Book.title.asc()).limit(limit))).all()
+        print(f"[get_featured_books] Found {len(rows)} featured books")
         
-        return convert_books_to_dict(books)
+        return json_response(serializer.from_rows(rows))
         
+    except InvalidFields as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"[get_featured_books] Error: {e}")
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+# Trending books
+@app.get("/books/trending")
+@conditional_get("books_trending")
+@cached_response("books_trending")
+async def get_trending_books(
+    request: Request,
+    window: str = Query(DEFAULT_PERIOD, description="Trending period: 24h, 7d or 30d"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of books"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,title,author,cover_url"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Public books ranked by recent views and downloads
+
+    Scores decay with a half-life of a quarter of the window and are kept
+    current by the counter flush (see app/trending.py), so this is a single
+    index scan. `trending_score` is the decayed weighted activity right now.
+    """
+    try:
+        period = parse_period(window)
+        serializer = book_serializer.for_fields(fields)
+        rows = (await db.execute(trending_query(serializer.columns, period, limit))).all()
+        now = datetime.now(timezone.utc)
+        
+        books = []
+        for row in rows:
+            book = serializer.from_row(row)
+            book["trending_score"] = round(current_score(row[-1], period, now), 2)
+            books.append(book)
+        return json_response({"window": period, "books": books})
+        
+    except (InvalidFields, InvalidPeriod) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"[get_trending_books] Error: {e}")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
 # Enhanced search endpoint
 @app.get("/books/search")
-def search_books(
+@cached_response("books_search")
+async def search_books(
     q: str = Query(..., description="Search query"),
     category: str = Query("all", description="Category: all, public, uploads"),
     genre: Optional[str] = Query(None, description="Filter by genre"),
     author: Optional[str] = Query(None, description="Filter by author"),
     limit: int = Query(50, description="Maximum results"),
-    db: Session = Depends(get_db)
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,title,author,cover_url"),
+    fuzzy: bool = Query(True, description="Add typo-tolerant title/author matches when exact results are sparse"),
+    threshold: float = Query(0.5, ge=0.0, le=1.0, description="Minimum word similarity for fuzzy matches"),
+    facets: Optional[str] = Query(None, description="Comma-separated facet counts to include, e.g. genre,language,copyright_status,publication_year"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Advanced book search across title, author, description, and genre"""
+    """Advanced book search across title, author, description, and genre
+
+    On PostgreSQL this is a ranked full-text search (websearch syntax:
+    quoted phrases, `or`, `-exclude`); elsewhere it falls back to ILIKE.
+    When fewer than a few books match and pg_trgm is available, titles and
+    authors similar to the query ("Sherlok", "Dostoyevsky") are appended.
+    With Meilisearch configured, searches without genre/author substring
+    filters are ranked there instead and fall back to SQL on any error.
+    `facets=` adds per-facet value counts over all exact matches.
+    """
     try:
         print(f"[search_books] Search: '{q}' in {category} (genre={genre}, author={author})")
         
-        query = db.query(models.Book)
+        serializer = book_serializer.for_fields(fields)
+        facet_names = parse_facets(facets)
+        # Trailing id (ignored by the serializer) lets fuzzy results skip exact hits
+        query = select(*serializer.columns, models.Book.id)
         
         if category == "public":
             try:
@@ -266,20 +405,6 @@ def search_books(
             except:
                 query = query.filter(models.Book.filename.isnot(None))
         
-        search_filter = or_(
-            models.Book.title.ilike(f"%{q}%"),
-            models.Book.author.ilike(f"%{q}%"),
-            models.Book.description.ilike(f"%{q}%")
-        )
-        
-        try:
-            if hasattr(models.Book, 'genre'):
-                search_filter = or_(search_filter, models.Book.genre.ilike(f"%{q}%"))
-        except:
-            pass
-            
-        query = query.filter(search_filter)
-        
         if genre and genre != "all":
             try:
                 if hasattr(models.Book, 'genre'):
@@ -290,61 +415,89 @@ def search_books(
         if author:
             query = query.filter(models.Book.author.ilike(f"%{author}%"))
         
-        books = query.order_by(models.Book.title.asc()).limit(limit).all()
-        print(f"[search_books] Found {len(books)} results")
+        exact, rank = await db.run_sync(lambda session: apply_text_search(query, session, q))
+        facet_filters = {"q": q, "category": category, "genre": genre, "author": author}
+        
+        # Meilisearch has no substring filters, so genre/author searches stay on SQL
+        hits = None
+        if not author and (not genre or genre == "all"):
+            hits = await search_ids_async(q, filter_expression(category), limit)
+        if hits is not None:
+            ids, _ = hits
+            rows = await db.run_sync(
+                lambda session: rows_in_order(session.query(*serializer.columns, models.Book.id), ids)
+            )
+            print(f"[search_books] Meilisearch found {len(rows)} results")
+            payload = {
+                "query": q,
+                "category": category,
+                "total_results": len(rows),
+                "fuzzy": False,
+                "engine": "meilisearch",
+                "books": serializer.from_rows(rows)
+            }
+            if facet_names:
+                payload["facets"] = await cached_facet_counts(
+                    db, "books_search", facet_filters, exact, facet_names
+                )
+            return json_response(payload)
         
-        return {
+        if rank is not None:
+            exact = exact.order_by(rank.desc(), models.Book.title.asc())
+        else:
+            exact = exact.order_by(models.Book.title.asc())
+        
+        rows = (await db.execute(exact.limit(limit))).all()
+        print(f"[search_books] Found {len(rows)} results")
+        
+        fuzzy_used = False
+        if fuzzy and len(rows) < min(FUZZY_MIN_RESULTS, limit) and await db.run_sync(trigram_enabled):
+            # Sets the similarity threshold on this transaction's connection
+            similar, score = await db.run_sync(lambda session: apply_fuzzy_search(query, session, q, threshold))
+            found_ids = [row[-1] for row in rows]
+            if found_ids:
+                similar = similar.filter(models.Book.id.notin_(found_ids))
+            similar = similar.order_by(score.desc(), models.Book.title.asc()).limit(limit - len(rows))
+            extra = (await db.execute(similar)).all()
+            print(f"[search_books] Fuzzy fallback added {len(extra)} results (threshold={threshold})")
+            rows += extra
+            fuzzy_used = bool(extra)
+        
+        payload = {
             "query": q,
             "category": category,
-            "total_results": len(books),
-            "books": convert_books_to_dict(books)
+            "total_results": len(rows),
+            "fuzzy": fuzzy_used,
+            "engine": "sql",
+            "books": serializer.from_rows(rows)
         }
+        if facet_names:
+            payload["facets"] = await cached_facet_counts(
+                db, "books_search", facet_filters, exact, facet_names
+            )
+        return json_response(payload)
         
+    except (InvalidFields, InvalidFacets) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"[search_books] Error: {e}")
         raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
 
 # Statistics endpoint
 @app.get("/stats")
-def get_library_stats(db: Session = Depends(get_db)):
-    """Get library statistics"""
+@cached_response("stats")
+async def get_library_stats(db: AsyncSession = Depends(get_async_db)):
+    """Get library statistics (served from the book_stats snapshot)"""
     try:
-        total_books = db.query(models.Book).count()
-        
-        try:
-            public_books = db.query(models.Book).filter(
-                or_(
-                    models.Book.source == 'Sample Data',
-                    models.Book.is_public.is_(True)
-                )
-            ).count()
-            user_uploads = db.query(models.Book).filter(
-                and_(
-                    models.Book.source != 'Sample Data',
-                    models.Book.filename.isnot(None)
-                )
-            ).count()
-            featured_count = db.query(models.Book).filter(models.Book.is_featured.is_(True)).count()
-        except:
-            public_books = db.query(models.Book).filter(models.Book.source == 'Sample Data').count()
-            user_uploads = total_books - public_books
-            featured_count = 0
-        
-        genres = {}
-        try:
-            if hasattr(models.Book, 'genre'):
-                genre_results = db.query(models.Book.genre).filter(models.Book.genre.isnot(None)).all()
-                for (genre,) in genre_results:
-                    if genre:
-                        genres[genre] = genres.get(genre, 0) + 1
-        except:
-            pass
+        snapshot = await db.run_sync(read_library_snapshot)
+        totals = snapshot["total"]
+        genres = snapshot["genre"]
         
         return {
-            "total_books": total_books,
-            "public_library_books": public_books,
-            "user_uploaded_books": user_uploads,
-            "featured_books": featured_count,
+            "total_books": totals.get("books", 0),
+            "public_library_books": totals.get("library_public", 0),
+            "user_uploaded_books": totals.get("user_uploads", 0),
+            "featured_books": totals.get("featured", 0),
             "available_genres": list(genres.keys()),
             "genre_distribution": genres,
             "supported_formats": ["PDF", "EPUB", "HTML", "TXT"],
@@ -355,32 +508,172 @@ def get_library_stats(db: Session = Depends(get_db)):
         print(f"[get_stats] Error: {e}")
         raise HTTPException(status_code=500, detail=f"Stats error: {str(e)}")
 
+# Response cache counters
+@app.get("/cache/stats")
+def get_cache_stats():
+    """Hit/miss counters for the read endpoint response cache, the S3 object cache, presigned URLs and EPUB indexes"""
+    return {
+        **response_cache.stats(),
+        "objects": object_cache.stats(),
+        "presigned_urls": presigned_urls.stats(),
+        "epub_indexes": epub_indexes.stats(),
+    }
+
+# Connection pool telemetry
+@app.get("/db/pool/stats")
+def get_pool_stats():
+    """Checked-out/overflow connections and checkout wait times per engine"""
+    return pool_stats()
+
 # Get all books (legacy endpoint)
 @app.get("/books")
-def get_books(db: Session = Depends(get_db)):
-    """Get all books (legacy endpoint - maintained for compatibility)"""
+async def get_books(
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size - enables keyset pagination"),
+    stream: bool = Query(False, description="Stream the whole catalog as NDJSON"),
+    ids: Optional[str] = Query(None, description="Comma-separated ids to fetch in one query, e.g. 12,7,31"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get all books (legacy endpoint - maintained for compatibility)
+
+    Without parameters the full catalog is returned as one JSON array. Pass
+    `limit` (and `cursor`) to page through it newest-first, or `stream=true`
+    to receive one JSON object per line in constant server memory. `ids`
+    returns just those books in the given order (see POST /books/lookup).
+    """
+    if ids is not None:
+        try:
+            book_ids = parse_ids(ids)
+        except InvalidLookup as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return await lookup_books_by_id(db, book_serializer, book_ids)
+    
+    if stream:
+        print(f"[get_books] Streaming catalog as NDJSON (cursor={cursor})")
+        return StreamingResponse(stream_books_ndjson(cursor), media_type="application/x-ndjson")
+
     try:
-        print("[get_books] Fetching all books...")
-        books = db.query(models.Book).order_by(models.Book.created_at.desc()).all()
-        print(f"[get_books] Found {len(books)} total books")
-        return convert_books_to_dict(books)
-        
+        query = newest_first(select(*book_serializer.columns))
+
+        if limit is None and cursor is None:
+            print("[get_books] Fetching all books...")
+            rows = (await db.execute(query)).all()
+            print(f"[get_books] Found {len(rows)} total books")
+            return json_response(book_serializer.from_rows(rows))
+
+        page_size = limit or 100
+        rows = (await db.execute(after_cursor(query, cursor).limit(page_size + 1))).all()
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        print(f"[get_books] Page of {len(rows)} books (cursor={cursor}, has_more={has_more})")
+
+        return json_response({
+            "books": book_serializer.from_rows(rows),
+            "next_cursor": encode_cursor(rows[-1]) if has_more else None,
+            "has_more": has_more
+        })
+
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"[get_books] Error: {e}")
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+async def lookup_books_by_id(db: AsyncSession, serializer, book_ids: List[int]):
+    query = by_ids(select(*serializer.columns, models.Book.id), book_ids, db.get_bind().dialect.name)
+    rows = (await db.execute(query)).all()
+    print(f"[lookup_books] Found {len(rows)} of {len(set(book_ids))} ids")
+    return json_response(lookup_payload(serializer, align_by_id(rows, book_ids), book_ids))
+
+# Batch lookup by ids or (title, author) pairs
+@app.post("/books/lookup")
+async def lookup_books(lookup: schemas.BookLookup, db: AsyncSession = Depends(get_async_db)):
+    """Resolve up to several thousand books in one query
+
+    Send `ids`, or `books` as [{title, author}] pairs (case-insensitive; an
+    omitted author matches on title alone). `books` in the response is
+    aligned with the request - null where nothing matched - and `missing`
+    lists the keys that were not found.
+    """
+    try:
+        serializer = book_serializer.for_fields(lookup.fields)
+        if lookup.ids is not None and lookup.books is None:
+            return await lookup_books_by_id(db, serializer, lookup.ids)
+        if lookup.books is None or lookup.ids is not None:
+            raise InvalidLookup("Send either `ids` or `books`")
+        
+        pairs = [(book.title, book.author) for book in lookup.books]
+        dialect = db.get_bind().dialect.name
+        query = by_pairs(select(*serializer.columns, models.Book.id, *pair_columns(dialect)), pairs, dialect)
+        rows = (await db.execute(query)).all()
+        aligned = align_by_pair(rows, pairs)
+        return json_response(lookup_payload(serializer, aligned, [book.dict() for book in lookup.books]))
+        
+    except (InvalidFields, InvalidLookup) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Batch existence check for ingestion scripts
+@app.post("/books/exists")
+async def books_exist(check: schemas.BookExists, db: AsyncSession = Depends(get_async_db)):
+    """Which of up to 10,000 candidate books are already in the library
+
+    Candidates match on `source_id` (e.g. "gutenberg:1342") or on title and
+    author, compared casefolded and without accents. `results` is aligned
+    with the request - {id, matched_on} or null - and `new` lists the
+    indexes of candidates that are not in the library yet.
+    """
+    try:
+        candidates = [(book.title, book.author, book.source_id) for book in check.books]
+        rows = (await db.execute(existence_query(candidates, db.get_bind().dialect.name))).all()
+        print(f"[books_exist] {len(rows)} matches for {len(candidates)} candidates")
+        return json_response(existence_payload(align_existing(rows, candidates)))
+        
+    except InvalidExistsCheck as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def stream_books_ndjson(cursor: Optional[str] = None, batch_size: int = 500):
+    """Yield every book as an NDJSON line using a server-side cursor
+
+    The generator owns its session because the request-scoped one from
+    get_async_db is closed before the response body is sent.
+    """
+    db = SessionLocal()
+    try:
+        query = after_cursor(newest_first(db.query(*book_serializer.columns)), cursor)
+        query = query.execution_options(stream_results=True).yield_per(batch_size)
+        for row in query:
+            yield dumps(book_serializer.from_row(row)) + b"\n"
+    except InvalidCursor as e:
+        yield dumps({"error": str(e)}) + b"\n"
+    except Exception as e:
+        print(f"[stream_books_ndjson] Error: {e}")
+        yield dumps({"error": f"Database error: {str(e)}"}) + b"\n"
+    finally:
+        db.close()
+
 # Get single book by ID
 @app.get("/books/{book_id}")
-def get_book_by_id(book_id: int, db: Session = Depends(get_db)):
-    """Get a single book by ID"""
+async def get_book_by_id(book_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Get a single book by ID (honours If-None-Match / If-Modified-Since)"""
     try:
         print(f"[get_book_by_id] Fetching book ID: {book_id}")
-        book = db.query(models.Book).filter(models.Book.id == book_id).first()
+        found = (await db.execute(
+            select(models.Book.id, models.Book.updated_at).filter(models.Book.id == book_id)
+        )).first()
+        
+        if not found:
+            raise HTTPException(status_code=404, detail=f"Book with ID {book_id} not found")
+        
+        updated_at = found.updated_at
+        etag = make_etag("book", book_id, updated_at.isoformat() if updated_at else None)
+        if is_not_modified(request, etag, updated_at):
+            return not_modified(etag, updated_at)
         
-        if not book:
+        row = (await db.execute(select(*book_serializer.columns).filter(models.Book.id == book_id))).first()
+        if not row:
             raise HTTPException(status_code=404, detail=f"Book with ID {book_id} not found")
         
-        return convert_book_to_dict(book)
+        return json_response(book_serializer.from_row(row), headers=validator_headers(etag, updated_at))
         
     except HTTPException:
         raise
@@ -463,8 +756,12 @@ def upload_book(
         new_book = models.Book(**book_data)
         
         db.add(new_book)
+        db.flush()
+        record_book_change(db, None, new_book)
+        enqueue_search_sync(db, new_book.id)
         db.commit()
         db.refresh(new_book)
+        response_cache.invalidate()
         
         print(f"[upload] Book {new_book.id} created successfully")
         
@@ -476,9 +773,24 @@ def upload_book(
 
 # Download/stream book
 @app.get("/books/{book_id}/download")
-def download_book(book_id: int, inline: bool = False, db: Session = Depends(get_db)):
-    """Download or stream a book"""
-    book = db.query(models.Book).filter(models.Book.id == book_id).first()
+async def download_book(request: Request, book_id: int, inline: bool = False, redirect: bool = False,
+                        db: AsyncSession = Depends(get_async_db)):
+    """Download or stream a book
+
+    Inline PDFs honor Range/If-Range (206, multipart/byteranges, 416), so
+    viewers can render page one and seek without fetching the whole file.
+    Hot files are served from the local disk cache (app/object_cache.py).
+    S3 and disk reads run on the download I/O pool (app/storage.py), never
+    on the threadpool the metadata endpoints share.
+
+    Attachments get a presigned S3 URL, reused across requests for most of
+    its lifetime; with redirect=true the answer is a 302 to it instead of
+    JSON, saving the client a round trip.
+    """
+    Book = models.Book
+    book = (await db.execute(
+        select(Book.id, Book.filename, Book.s3_key).where(Book.id == book_id)
+    )).first()
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
 
@@ -498,41 +810,134 @@ def download_book(book_id: int, inline: bool = False, db: Session = Depends(get_
         content_type = content_type_map.get(file_ext, 'application/pdf')
         
         if inline and file_ext == 'pdf':
-            obj = s3_internal.get_object(Bucket=settings.S3_BUCKET, Key=book.s3_key)
-            body = obj["Body"]
+            range_header = request.headers.get("range")
             headers = {
-                "Content-Disposition": f'inline; filename="{book.filename}"',
-                "Content-Type": content_type
+                "Content-Disposition": f'inline; filename="{book.filename}"'
             }
+            response = await run_io(
+                object_cache.serve, S3Object(s3_internal, settings.S3_BUCKET, book.s3_key),
+                range_header, request.headers.get("if-range"), content_type, headers
+            )
             
-            try:
-                book.view_count = (book.view_count or 0) + 1
-                db.commit()
-            except:
-                pass
+            # A viewer seeking through the file is still one view
+            if is_first_read(range_header):
+                counter_buffer.increment(book.id, "view_count")
             
-            return StreamingResponse(body, media_type=content_type, headers=headers)
+            return response
         else:
-            s3_params = {
-                "Bucket": settings.S3_BUCKET,
-                "Key": book.s3_key,
-                "ResponseContentType": content_type,
-                "ResponseContentDisposition": f'attachment; filename="{book.filename}"'
-            }
-            url = s3_presign.generate_presigned_url("get_object", Params=s3_params, ExpiresIn=3600)
+            url = presigned_urls.get(
+                s3_presign, settings.S3_BUCKET, book.s3_key, content_type,
+                f'attachment; filename="{book.filename}"'
+            )
             
-            try:
-                book.download_count = (book.download_count or 0) + 1
-                db.commit()
-            except:
-                pass
+            counter_buffer.increment(book.id, "download_count")
             
+            if redirect:
+                return RedirectResponse(url, status_code=302)
             return {"url": url, "format": file_ext.upper()}
 
     except Exception as e:
         print(f"[download] Error: {e}")
         raise HTTPException(status_code=500, detail=f"Download failed: {str(e)}")
 
+# EPUB chapters, read out of the archive with ranged GETs
+async def epub_source(db: AsyncSession, book_id: int) -> S3Object:
+    Book = models.Book
+    book = (await db.execute(select(Book.filename, Book.s3_key).where(Book.id == book_id))).first()
+    if not book:
+        raise HTTPException(status_code=404, detail="Book not found")
+    if not book.s3_key or not (book.filename or "").lower().endswith(".epub"):
+        raise HTTPException(status_code=400, detail="Chapters are only available for EPUB books")
+    if not s3_internal:
+        raise HTTPException(status_code=500, detail="S3 storage not available")
+    return S3Object(s3_internal, settings.S3_BUCKET, book.s3_key)
+
+async def epub_io(func, *args):
+    """Run an app.epub call on the download pool, answering its failures with 404/422"""
+    try:
+        return await run_io(func, *args)
+    except (BookFileMissing, ChapterNotFound) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except InvalidEpub as e:
+        raise HTTPException(status_code=422, detail=f"Unreadable EPUB: {e}")
+    except Exception as e:
+        print(f"[chapters] Error: {e}")
+        raise HTTPException(status_code=500, detail=f"Chapter read failed: {str(e)}")
+
+@app.get("/books/{book_id}/chapters")
+async def list_chapters(book_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Spine of an EPUB with table-of-contents titles
+
+    Built from the archive's central directory, package document and nav
+    (or NCX) without downloading the book, then cached per file.
+    """
+    source = await epub_source(db, book_id)
+    index = await epub_io(epub_indexes.get, source)
+    
+    etag = make_etag("chapters", source.key, index.etag)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    return json_response({
+        "book_id": book_id,
+        "title": index.title,
+        "chapters": [
+            {"number": chapter.number, "title": chapter.title, "href": chapter.path,
+             "media_type": chapter.media_type, "linear": chapter.linear, "size": chapter.size}
+            for chapter in index.chapters
+        ],
+    }, headers=validator_headers(etag, None))
+
+@app.get("/books/{book_id}/chapters/{number}")
+async def read_chapter(book_id: int, number: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Chapter `number` (1-based, in spine order) as stored in the EPUB, usually XHTML
+
+    Costs one ranged read of the chapter's compressed bytes once the book's
+    index is cached.
+    """
+    source = await epub_source(db, book_id)
+    index = await epub_io(epub_indexes.get, source)
+    etag = make_etag("chapter", source.key, index.etag, number)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    chapter, content = await epub_io(epub_indexes.read_chapter, source, number)
+    
+    return Response(content, media_type=chapter.media_type, headers=validator_headers(etag, None))
+
+# Many books as one streamed ZIP
+@app.post("/books/download-bundle")
+async def download_bundle(bundle: schemas.BookBundle, db: AsyncSession = Depends(get_async_db)):
+    """Download up to 1,000 books as one ZIP, streamed while it is read from S3
+
+    Send `ids` or a column-equality `filter` such as {"genre": "Poetry",
+    "is_public": true}. Members are stored uncompressed and named
+    "Title - Author.ext"; books whose file is missing from storage are left
+    out. Content-Length is exact, and archives past 4 GB use zip64.
+    """
+    if not s3_internal:
+        raise HTTPException(status_code=500, detail="S3 storage not available")
+
+    try:
+        rows = (await db.execute(bundle_query(bundle.ids, bundle.filter))).all()
+        members = await plan_bundle(s3_internal, settings.S3_BUCKET, order_rows(rows, bundle.ids))
+    except (InvalidBundle, InvalidFilter) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except InvalidFilterValue as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if not members:
+        raise HTTPException(status_code=404, detail="No downloadable books matched")
+
+    for member in members:
+        counter_buffer.increment(member.book_id, "download_count")
+    size = bundle_size(members)
+    print(f"[download_bundle] {len(members)} books, {size} bytes")
+    return StreamingResponse(
+        stream_bundle(members), media_type="application/zip",
+        headers={
+            "Content-Disposition": 'attachment; filename="readora-bundle.zip"',
+            "Content-Length": str(size),
+        },
+    )
+
 # Delete book
 @app.delete("/books/{book_id}")
 def delete_book(book_id: int, db: Session = Depends(get_db)):
@@ -547,11 +952,17 @@ def delete_book(book_id: int, db: Session = Depends(get_db)):
         if s3_internal and hasattr(book, 's3_key') and book.s3_key:
             try:
                 s3_internal.delete_object(Bucket=settings.S3_BUCKET, Key=book.s3_key)
+                presigned_urls.forget(book.s3_key)
+                epub_indexes.forget(book.s3_key)
             except Exception as s3_error:
                 print(f"[delete] S3 warning: {s3_error}")
         
+        record_book_change(db, book_facts(book), None)
+        enqueue_search_sync(db, book_id, "delete")
         db.delete(book)
         db.commit()
+        response_cache.invalidate()
+        autocomplete.remove_book(book_id)
         
         return {
             "message": f"Book '{book_title}' deleted successfully",
@@ -569,18 +980,7 @@ def convert_books_to_dict(books):
 
 def convert_book_to_dict(book):
     """Convert single book to dictionary with ALL columns"""
-    mapper = sql_inspect(book.__class__)
-    book_dict = {}
-    
-    for column in mapper.columns:
-        try:
-            value = getattr(book, column.name)
-            book_dict[column.name] = value
-        except Exception as e:
-            print(f"[convert] Warning getting {column.name}: {e}")
-            book_dict[column.name] = None
-    
-    return book_dict
+    return book_serializer.from_instance(book)
 
 print("🚀 Readora Professional Library API starting...")
 print("📚 Endpoints: /books, /books/public, /books/featured, /health")
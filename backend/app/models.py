@@ -1,5 +1,5 @@
 # backend/app/models.py - COMPLETE VERSION WITH COVER SUPPORT
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, JSON, BigInteger
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, JSON, BigInteger, Float, Index
 from sqlalchemy.sql import func
 from app.db import Base
 
@@ -42,6 +42,10 @@ class Book(Base):
     download_count = Column(Integer, default=0, nullable=True)
     view_count = Column(Integer, default=0, nullable=True)
     
+    # Duplicate detection keys - maintained by app/dedupe.py
+    dedupe_key = Column(String, index=True, nullable=True)
+    source_id = Column(String, index=True, nullable=True)
+    
     # Updated timestamp
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=True)
 
@@ -56,4 +60,48 @@ class ContentSource(Base):
     default_license = Column(String)
     requires_attribution = Column(Boolean, default=False)
     notes = Column(Text)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class BookStat(Base):
+    """Incrementally maintained /stats snapshot - see app/stats.py"""
+    __tablename__ = "book_stats"
+    __table_args__ = (
+        Index("idx_book_stats_dimension_count", "dimension", "book_count"),
+    )
+
+    dimension = Column(String, primary_key=True)
+    value = Column(String, primary_key=True)
+    book_count = Column(BigInteger, nullable=False, default=0)
+
+class SearchOutbox(Base):
+    """Pending search index changes, written in the same transaction as the book"""
+    __tablename__ = "search_outbox"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    book_id = Column(Integer, nullable=False)
+    op = Column(String(10), nullable=False, default="upsert")  # upsert | delete
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class BookActivity(Base):
+    """Hourly view/download rollup fed by the counter flush - see app/trending.py"""
+    __tablename__ = "book_activity"
+    __table_args__ = (
+        Index("idx_book_activity_bucket", "bucket"),
+    )
+
+    book_id = Column(Integer, primary_key=True)
+    bucket = Column(DateTime(timezone=True), primary_key=True)  # start of the hour, UTC
+    views = Column(BigInteger, nullable=False, default=0)
+    downloads = Column(BigInteger, nullable=False, default=0)
+
+class BookTrending(Base):
+    """Decayed popularity per book and trending period, kept in log2 form - see app/trending.py"""
+    __tablename__ = "book_trending"
+    __table_args__ = (
+        Index("idx_book_trending_period_score", "period", "log_score"),
+    )
+
+    period = Column(String(10), primary_key=True)  # "24h" | "7d" | "30d"
+    book_id = Column(Integer, primary_key=True)
+    log_score = Column(Float, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
\ No newline at end of file
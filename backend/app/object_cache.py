@@ -0,0 +1,350 @@
+# backend/app/object_cache.py - Local disk read-through cache for hot S3 objects
+"""
+A handful of classics account for most inline reads, and each read used to
+go back to MinIO for the whole file. ObjectCache keeps recently read
+objects on local disk, up to OBJECT_CACHE_MAX_BYTES, and evicts the least
+recently used ones.
+
+- Entries are keyed by (s3_key, ETag), so a replaced object is never served
+  stale. Object info comes from a HEAD that is memoized for INFO_TTL seconds.
+- Hits are opened before the response is built and streamed from that
+  descriptor through object_response, so Range and If-Range behave as on
+  the S3 path and an eviction mid-request cannot break the download. A
+  cached file that has vanished is treated as a miss.
+- Workers sharing the directory share the budget: every RESCAN_SECONDS
+  each one adopts files the others filled and forgets ones they evicted,
+  and hits touch the file's mtime so the on-disk order stays LRU.
+- Misses are single-flight. The first reader starts one background copy
+  from S3 into a .part file. That reader and any concurrent readers of the
+  same object follow the file as it grows, so the fill streams to clients
+  while it is written and S3 sees one GET. The copy completes even if
+  every client disconnects.
+- Ranged reads on a miss are served straight from S3 while the fill warms
+  the cache for the next reader.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterator, Optional, Tuple
+
+from starlette.background import BackgroundTask
+from fastapi.responses import Response, StreamingResponse
+
+from app.core.config import settings
+from app.ranges import object_response, validator_headers
+from app.storage import CHUNK_SIZE, ObjectInfo, stream_async
+
+INFO_TTL = 30.0
+MAX_INFO_ENTRIES = 4096
+
+# Followers give up on a fill that makes no progress for this long
+FILL_STALL_SECONDS = 60.0
+
+PART_SUFFIX = ".part"
+
+# How often a worker re-reads the directory to see other workers' files
+RESCAN_SECONDS = 60.0
+
+
+class Fill:
+    """One in-flight S3 -> disk copy that any number of readers can follow"""
+
+    def __init__(self, part_path: str, final_path: str, size: int):
+        self.part_path = part_path
+        self.final_path = final_path
+        self.size = size
+        self.written = 0
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._changed = threading.Condition()
+
+    def advance(self, count: int):
+        with self._changed:
+            self.written += count
+            self._changed.notify_all()
+
+    def finish(self, error: Optional[BaseException] = None):
+        with self._changed:
+            self.done = True
+            self.error = error
+            self._changed.notify_all()
+
+    def _open(self):
+        try:
+            return open(self.part_path, "rb")
+        except FileNotFoundError:
+            # Finished and renamed between lookup and open
+            return open(self.final_path, "rb")
+
+    def follow(self) -> Iterator[bytes]:
+        """The object's bytes as they land on disk"""
+        # Later renames and evictions do not affect an open descriptor
+        with self._open() as part:
+            sent = 0
+            while sent < self.size:
+                with self._changed:
+                    while self.written <= sent and not self.done:
+                        if not self._changed.wait(FILL_STALL_SECONDS):
+                            raise TimeoutError(f"Cache fill of {self.part_path} stalled")
+                    if self.written <= sent:
+                        raise IOError(f"Cache fill of {self.part_path} failed: {self.error}")
+                    available = self.written
+                chunk = part.read(min(available - sent, CHUNK_SIZE))
+                sent += len(chunk)
+                yield chunk
+
+
+class CachedFile:
+    """An open cache file, read like an S3Object
+
+    Reads go through the descriptor, so they survive the path being evicted.
+    """
+
+    def __init__(self, file, key: str, info: ObjectInfo):
+        self.file = file
+        self.key = key
+        self._info = info
+
+    def info(self) -> ObjectInfo:
+        return self._info
+
+    def open(self, if_match: Optional[str] = None) -> Tuple[ObjectInfo, Iterator[bytes]]:
+        return self._info, self.read_range(0, self._info.size - 1)
+
+    def read_range(self, start: int, end: int, if_match: Optional[str] = None) -> Iterator[bytes]:
+        while start <= end:
+            chunk = os.pread(self.file.fileno(), min(CHUNK_SIZE, end - start + 1), start)
+            if not chunk:
+                raise IOError(f"Cached copy of {self.key} is shorter than {self._info.size} bytes")
+            start += len(chunk)
+            yield chunk
+
+    def close(self):
+        self.file.close()
+
+
+class ObjectCache:
+    """Size-bounded LRU of S3 objects on local disk"""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # One object may not take more than a quarter of the cache
+        self.max_object_bytes = max_bytes // 4
+        self.enabled = max_bytes > 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # file name -> size, oldest first
+        self._total = 0
+        self._fills: Dict[str, Fill] = {}
+        self._info: Dict[str, Tuple[float, ObjectInfo]] = {}
+        self._scanned_at = 0.0
+        self.hits = self.misses = self.fills = self.evictions = 0
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+            with self._lock:
+                self._rescan()
+
+    def _rescan(self):
+        """Match the LRU to the directory, which other workers may share
+
+        Files left by a previous run or filled by another worker are adopted
+        by mtime; entries whose file is gone are forgotten; unfinished fills
+        nobody is writing any more are deleted. Called with the lock held.
+        """
+        files = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_file():
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if entry.name.endswith(PART_SUFFIX):
+                # Leave fills another worker may still be writing
+                if time.time() - stat.st_mtime > FILL_STALL_SECONDS:
+                    try:
+                        os.unlink(entry.path)
+                    except OSError:
+                        pass
+                continue
+            files.append((stat.st_mtime, entry.name, stat.st_size))
+
+        on_disk = {name for _, name, _ in files}
+        for name in [name for name in self._entries if name not in on_disk]:
+            self._total -= self._entries.pop(name)
+        adopted = OrderedDict((name, size) for _, name, size in sorted(files) if name not in self._entries)
+        self._total += sum(adopted.values())
+        # Unknown to this worker, so older than anything it has used
+        adopted.update(self._entries)
+        self._entries = adopted
+        self._scanned_at = time.monotonic()
+        self._evict()
+
+    @staticmethod
+    def _name(key: str, etag: Optional[str]) -> str:
+        return hashlib.sha256(f"{key}\0{etag}".encode()).hexdigest()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def info(self, source) -> ObjectInfo:
+        """HEAD the object, memoized briefly per key"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._info.get(source.key)
+            if cached and cached[0] > now:
+                return cached[1]
+        info = source.info()
+        with self._lock:
+            if len(self._info) >= MAX_INFO_ENTRIES:
+                self._info.clear()
+            self._info[source.key] = (now + INFO_TTL, info)
+        return info
+
+    def lookup(self, key: str, etag: Optional[str]) -> Optional[str]:
+        """Path of the cached copy, marking it recently used; it may vanish before it is opened"""
+        name = self._name(key, etag)
+        with self._lock:
+            if name in self._entries:
+                self._entries.move_to_end(name)
+                return self._path(name)
+        # Another worker sharing the directory may have filled it
+        path = self._path(name)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return None
+        with self._lock:
+            self._add(name, size)
+        return path
+
+    def _drop(self, name: str):
+        """Forget an entry whose file has disappeared"""
+        with self._lock:
+            size = self._entries.pop(name, None)
+            if size is not None:
+                self._total -= size
+
+    def _add(self, name: str, size: int):
+        if time.monotonic() - self._scanned_at > RESCAN_SECONDS:
+            self._rescan()
+        if name not in self._entries:
+            self._entries[name] = size
+            self._total += size
+        self._entries.move_to_end(name)
+        self._evict()
+
+    def _evict(self):
+        while self._total > self.max_bytes and self._entries:
+            name, size = self._entries.popitem(last=False)
+            self._total -= size
+            self.evictions += 1
+            try:
+                os.unlink(self._path(name))
+            except OSError:
+                pass
+
+    def fill(self, source, info: ObjectInfo) -> Optional[Fill]:
+        """The in-flight copy of `source`, starting one if none is running
+
+        Returns None for objects too large to cache.
+        """
+        if info.size > self.max_object_bytes:
+            return None
+        name = self._name(source.key, info.etag)
+        final_path = self._path(name)
+        with self._lock:
+            fill = self._fills.get(name)
+            if fill is not None:
+                return fill
+            if name in self._entries:
+                # Completed since the caller's lookup
+                fill = Fill(final_path, final_path, info.size)
+                fill.written, fill.done = info.size, True
+                return fill
+            part_path = f"{final_path}.{threading.get_ident()}{PART_SUFFIX}"
+            open(part_path, "wb").close()
+            fill = self._fills[name] = Fill(part_path, final_path, info.size)
+            self.fills += 1
+        threading.Thread(target=self._copy, args=(source, info, name, fill), name="object-cache-fill",
+                         daemon=True).start()
+        return fill
+
+    def _copy(self, source, info: ObjectInfo, name: str, fill: Fill):
+        try:
+            fetched, chunks = source.open()
+            if fetched.etag != info.etag or fetched.size != info.size:
+                raise IOError(f"{source.key} changed during the cache fill")
+            with open(fill.part_path, "wb", buffering=0) as part:
+                for chunk in chunks:
+                    part.write(chunk)
+                    fill.advance(len(chunk))
+            os.replace(fill.part_path, fill.final_path)
+            with self._lock:
+                self._add(name, info.size)
+            fill.finish()
+        except Exception as e:
+            print(f"[object_cache] Fill of {source.key} failed: {e}")
+            fill.finish(e)
+            try:
+                os.unlink(fill.part_path)
+            except OSError:
+                pass
+        finally:
+            with self._lock:
+                self._fills.pop(name, None)
+
+    def serve(self, source, range_header: Optional[str], if_range: Optional[str],
+              content_type: str, headers: dict) -> Response:
+        """Inline response for `source` (an app.storage.S3Object), from disk when possible
+
+        Blocks on S3 and the disk; call it through app.storage.run_io.
+        """
+        if not self.enabled:
+            return object_response(source, range_header, if_range, content_type, headers)
+
+        info = self.info(source)
+        path = self.lookup(source.key, info.etag)
+        if path is not None:
+            try:
+                cached = CachedFile(open(path, "rb"), source.key, info)
+            except FileNotFoundError:
+                # Evicted since the lookup, here or by another worker
+                self._drop(os.path.basename(path))
+            else:
+                self.hits += 1
+                try:
+                    os.utime(cached.file.fileno())
+                except OSError:
+                    pass
+                response = object_response(cached, range_header, if_range, content_type, headers, info=info)
+                response.background = BackgroundTask(cached.close)
+                return response
+
+        self.misses += 1
+        fill = self.fill(source, info)
+        if fill is None or range_header:
+            return object_response(source, range_header, if_range, content_type, headers, info=info)
+        return StreamingResponse(
+            stream_async(fill.follow()), media_type=content_type,
+            headers={**headers, **validator_headers(info), "Content-Length": str(info.size)},
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "in_flight_fills": len(self._fills),
+                "hits": self.hits,
+                "misses": self.misses,
+                "fills": self.fills,
+                "evictions": self.evictions,
+            }
+
+
+object_cache = ObjectCache(settings.OBJECT_CACHE_DIR, settings.OBJECT_CACHE_MAX_BYTES)
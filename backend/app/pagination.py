@@ -0,0 +1,56 @@
+# backend/app/pagination.py - Keyset (cursor) pagination helpers
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+from app import models
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor we did not issue"""
+
+
+def encode_cursor(book) -> str:
+    """Encode the (created_at, id) position of a book as an opaque cursor"""
+    created_at = book.created_at.isoformat() if book.created_at else None
+    raw = json.dumps([created_at, book.id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, book_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (datetime.fromisoformat(created_at) if created_at else None), int(book_id)
+    except Exception as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def newest_first(query):
+    """Stable newest-first ordering used by every keyset walk over books"""
+    return query.order_by(models.Book.created_at.desc().nulls_last(), models.Book.id.desc())
+
+
+def after_cursor(query, cursor: Optional[str]):
+    """Restrict a newest-first query to rows strictly after the cursor position"""
+    if not cursor:
+        return query
+
+    created_at, book_id = decode_cursor(cursor)
+    Book = models.Book
+
+    if created_at is None:
+        # Rows without a timestamp sort last (NULLS LAST), walk them by id only
+        return query.filter(and_(Book.created_at.is_(None), Book.id < book_id))
+
+    return query.filter(
+        or_(
+            Book.created_at < created_at,
+            and_(Book.created_at == created_at, Book.id < book_id),
+            Book.created_at.is_(None),
+        )
+    )
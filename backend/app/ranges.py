@@ -0,0 +1,178 @@
+# backend/app/ranges.py - HTTP Range / If-Range support for streamed book files
+"""
+Browser PDF viewers fetch the first and last few hundred KB of a file and
+then only the pages being looked at, but only if the server answers Range
+requests. object_response() turns a Range header into ranged S3 GETs:
+
+- no Range, or an If-Range that no longer matches: 200 with the whole file
+- one range: 206 with Content-Range
+- several ranges: 206 multipart/byteranges, one ranged GET per part
+- nothing satisfiable: 416 with `Content-Range: bytes */size`
+
+Malformed headers are ignored (full response), as RFC 9110 allows, and so
+are requests with more than MAX_RANGES ranges. Overlapping ranges are
+coalesced.
+"""
+import secrets
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from typing import Iterator, List, Optional, Tuple
+
+from fastapi.responses import Response, StreamingResponse
+
+from app.conditional import http_date
+from app.storage import ObjectInfo, stream_async
+
+MAX_RANGES = 16
+
+ByteRange = Tuple[int, int]  # inclusive start, end
+
+
+class RangeNotSatisfiable(ValueError):
+    """None of the requested ranges overlap the file"""
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[List[ByteRange]]:
+    """Satisfiable ranges for `header`, or None to send the whole file"""
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+
+    ranges = []
+    for part in spec.split(","):
+        first, dash, last = part.strip().partition("-")
+        if not dash:
+            return None
+        try:
+            if not first:
+                length = int(last)
+                if length <= 0 or size == 0:
+                    continue
+                ranges.append((max(size - length, 0), size - 1))
+                continue
+            start = int(first)
+            end = int(last) if last else max(start, size - 1)
+        except ValueError:
+            return None
+        if start < 0 or end < start:
+            return None
+        if start >= size:
+            continue
+        ranges.append((start, min(end, size - 1)))
+
+    if not ranges:
+        raise RangeNotSatisfiable(f"No satisfiable range in {header!r} for {size} bytes")
+    if len(ranges) > MAX_RANGES:
+        return None
+    return _coalesce(ranges)
+
+
+def _coalesce(ranges: List[ByteRange]) -> List[ByteRange]:
+    """Merge overlapping ranges; order is kept when nothing overlaps"""
+    ordered = sorted(ranges)
+    if all(ordered[i][1] < ordered[i + 1][0] for i in range(len(ordered) - 1)):
+        return ranges
+    merged = [ordered[0]]
+    for start, end in ordered[1:]:
+        if start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def is_first_read(header: Optional[str]) -> bool:
+    """No Range, or one that starts at byte 0 - a new read rather than a seek"""
+    if not header:
+        return True
+    spec = header.partition("=")[2].split(",")[0].strip()
+    return spec.startswith("0-")
+
+
+def if_range_allows(if_range: Optional[str], info: ObjectInfo) -> bool:
+    """Whether a Range may be honored given If-Range (an ETag or an HTTP date)"""
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        # Weak validators never match If-Range
+        return info.etag is not None and if_range == info.etag
+    if info.last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_range)
+    except (TypeError, ValueError):
+        return False
+    modified = info.last_modified
+    if modified.tzinfo is None:
+        modified = modified.replace(tzinfo=timezone.utc)
+    return since == modified.replace(microsecond=0)
+
+
+def validator_headers(info: ObjectInfo) -> dict:
+    headers = {"Accept-Ranges": "bytes"}
+    if info.etag:
+        headers["ETag"] = info.etag
+    if info.last_modified:
+        headers["Last-Modified"] = http_date(info.last_modified)
+    return headers
+
+
+def _multipart(source, info: ObjectInfo, ranges: List[ByteRange], content_type: str,
+               boundary: str) -> Tuple[Iterator[bytes], int]:
+    """multipart/byteranges body and its exact length"""
+    heads = [
+        (f"\r\n--{boundary}\r\nContent-Type: {content_type}\r\n"
+         f"Content-Range: bytes {start}-{end}/{info.size}\r\n\r\n").encode()
+        for start, end in ranges
+    ]
+    tail = f"\r\n--{boundary}--\r\n".encode()
+    length = sum(len(head) + end - start + 1 for head, (start, end) in zip(heads, ranges)) + len(tail)
+
+    def body():
+        for head, (start, end) in zip(heads, ranges):
+            yield head
+            yield from source.read_range(start, end, if_match=info.etag)
+        yield tail
+
+    return body(), length
+
+
+def object_response(source, range_header: Optional[str], if_range: Optional[str],
+                    content_type: str, headers: dict, info: Optional[ObjectInfo] = None) -> Response:
+    """Stream `source` (an app.storage.S3Object) honoring Range and If-Range
+
+    Pass `info` when the caller already has it to skip the HEAD request.
+    This blocks on S3; call it through app.storage.run_io.
+    """
+    if range_header:
+        info = info or source.info()
+        base = {**headers, **validator_headers(info)}
+        try:
+            ranges = parse_range(range_header, info.size) if if_range_allows(if_range, info) else None
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**base, "Content-Range": f"bytes */{info.size}"})
+
+        if ranges and len(ranges) == 1:
+            start, end = ranges[0]
+            return StreamingResponse(
+                stream_async(source.read_range(start, end, if_match=info.etag)), status_code=206,
+                media_type=content_type,
+                headers={**base, "Content-Range": f"bytes {start}-{end}/{info.size}",
+                         "Content-Length": str(end - start + 1)},
+            )
+        if ranges:
+            boundary = secrets.token_hex(16)
+            body, length = _multipart(source, info, ranges, content_type, boundary)
+            return StreamingResponse(
+                stream_async(body), status_code=206, media_type=f"multipart/byteranges; boundary={boundary}",
+                headers={**base, "Content-Length": str(length)},
+            )
+
+    info, chunks = source.open()
+    return StreamingResponse(
+        stream_async(chunks), media_type=content_type,
+        headers={**headers, **validator_headers(info), "Content-Length": str(info.size)},
+    )
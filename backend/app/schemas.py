@@ -1,6 +1,6 @@
 # backend/app/schemas.py - COMPLETE VERSION WITH COVER SUPPORT
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from datetime import datetime
 
 class BookCreate(BaseModel):
@@ -43,6 +43,7 @@ class BookOut(BaseModel):
     verification_date: Optional[datetime] = None
 
     class Config:
+        orm_mode = True
         from_attributes = True
 
 class BookUpdate(BaseModel):
@@ -64,6 +65,38 @@ class BookUpdate(BaseModel):
     is_public: Optional[bool] = None
     is_featured: Optional[bool] = None
 
+class BookBulkItem(BaseModel):
+    id: int
+    fields: BookUpdate
+
+class BookBulkUpdate(BaseModel):
+    # Either per-book `updates`, or `fields` applied to every book matching `filter`
+    updates: Optional[List[BookBulkItem]] = None
+    filter: Optional[Dict[str, Any]] = None
+    fields: Optional[BookUpdate] = None
+
+class BookRef(BaseModel):
+    title: str
+    author: Optional[str] = None
+
+class BookLookup(BaseModel):
+    ids: Optional[List[int]] = None
+    books: Optional[List[BookRef]] = None
+    fields: Optional[str] = None
+
+class BookCandidate(BaseModel):
+    title: Optional[str] = None
+    author: Optional[str] = None
+    source_id: Optional[str] = None  # e.g. "gutenberg:1342"
+
+class BookExists(BaseModel):
+    books: List[BookCandidate]
+
+class BookBundle(BaseModel):
+    # Either `ids` (kept in order) or a column-equality `filter`, e.g. {"genre": "Poetry"}
+    ids: Optional[List[int]] = None
+    filter: Optional[Dict[str, Any]] = None
+
 class ContentSourceOut(BaseModel):
     id: int
     name: str
@@ -76,4 +109,5 @@ class ContentSourceOut(BaseModel):
     created_at: datetime
 
     class Config:
+        orm_mode = True
         from_attributes = True
\ No newline at end of file
@@ -0,0 +1,113 @@
+# backend/app/search.py - Ranked full-text and trigram fuzzy search with an ILIKE fallback
+from typing import Optional, Tuple
+
+from sqlalchemy import func, literal, literal_column, or_, text
+from sqlalchemy.orm import Session
+
+from app import models
+from app.db import is_autocommit
+
+# Must match the configuration in migrate_database.py's search_vector column
+TEXT_SEARCH_CONFIG = "english"
+
+# Fall back to fuzzy matching when exact search returns fewer than this
+FUZZY_MIN_RESULTS = 3
+
+# Added by migrate_database.py (a weighted, STORED generated tsvector with a
+# GIN index); not mapped on the model so SQLite dev databases and create_all keep working
+search_vector = literal_column("books.search_vector")
+
+_fulltext_enabled: Optional[bool] = None
+_trigram_enabled: Optional[bool] = None
+
+
+def trigram_enabled(db) -> bool:
+    """Whether pg_trgm is installed on the connected database"""
+    global _trigram_enabled
+    if _trigram_enabled is None:
+        if db.get_bind().dialect.name != "postgresql":
+            _trigram_enabled = False
+        else:
+            _trigram_enabled = bool(db.execute(text(
+                "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+            )).scalar())
+    return _trigram_enabled
+
+
+def fulltext_enabled(db) -> bool:
+    """Whether books.search_vector exists on the connected database"""
+    global _fulltext_enabled
+    if _fulltext_enabled is None:
+        if db.get_bind().dialect.name != "postgresql":
+            _fulltext_enabled = False
+        else:
+            _fulltext_enabled = bool(db.execute(text("""
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = 'books' AND column_name = 'search_vector'
+            """)).scalar())
+    return _fulltext_enabled
+
+
+def check_search_schema(engine) -> Tuple[bool, bool]:
+    """Whether full-text and trigram search are available
+
+    The search_vector column, its GIN index and pg_trgm are created by
+    migrate_database.py; workers only look for them and fall back to ILIKE.
+    """
+    with Session(engine) as session:
+        fulltext, trigram = fulltext_enabled(session), trigram_enabled(session)
+    if engine.dialect.name != "postgresql":
+        return fulltext, trigram
+    if not fulltext:
+        print("[search] books.search_vector is missing; run migrate_database.py for ranked search")
+    if not trigram:
+        print("[search] pg_trgm is not installed; run migrate_database.py for fuzzy search")
+    return fulltext, trigram
+
+
+def ilike_filter(q: str):
+    """Substring match used where full-text search is unavailable"""
+    Book = models.Book
+    return or_(
+        Book.title.ilike(f"%{q}%"),
+        Book.author.ilike(f"%{q}%"),
+        Book.description.ilike(f"%{q}%"),
+        Book.genre.ilike(f"%{q}%"),
+    )
+
+
+def apply_text_search(query, db, q: str) -> Tuple[object, Optional[object]]:
+    """Restrict a books query to matches for `q`
+
+    Returns the filtered query and a relevance expression to ORDER BY
+    (descending), or None when falling back to ILIKE, which has no rank.
+    """
+    if fulltext_enabled(db):
+        tsquery = func.websearch_to_tsquery(TEXT_SEARCH_CONFIG, q)
+        query = query.filter(search_vector.op("@@")(tsquery))
+        return query, func.ts_rank(search_vector, tsquery)
+
+    return query.filter(ilike_filter(q)), None
+
+
+def apply_fuzzy_search(query, db, q: str, threshold: float):
+    """Restrict a books query to titles/authors within `threshold` word similarity of `q`
+
+    Returns the filtered query and the similarity score to ORDER BY
+    (descending). The threshold is set on the connection so the `<%`
+    operator can be answered from the trigram GIN indexes.
+    """
+    Book = models.Book
+    # Autocommit read sessions keep their connection for the whole request,
+    # so there the setting is made session-wide rather than transaction-local
+    db.execute(
+        text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, :local)"),
+        {"threshold": str(threshold), "local": not is_autocommit(db)},
+    )
+    term = literal(q)
+    query = query.filter(or_(term.op("<%")(Book.title), term.op("<%")(Book.author)))
+    score = func.greatest(
+        func.word_similarity(term, Book.title),
+        func.word_similarity(term, func.coalesce(Book.author, "")),
+    )
+    return query, score
@@ -0,0 +1,286 @@
+# backend/app/search_engine.py - Meilisearch backend fed by a transactional outbox
+"""
+When MEILISEARCH_HOST is set, /books/search and the v1 `search=` filter ask
+Meilisearch for matching ids and load the rows from Postgres; any Meilisearch
+error falls back to the SQL search in app/search.py.
+
+Index updates never call Meilisearch from a request. Write paths add a
+search_outbox row in the same transaction as the book change
+(enqueue_search_sync), and OutboxWorker drains the table in batches on a
+background thread, so a crash between commit and indexing loses nothing.
+scripts/reindex_search.py rebuilds the whole index.
+"""
+import json
+import threading
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app import models
+from app.cache import response_cache
+from app.core.config import settings
+
+SEARCHABLE_ATTRIBUTES = ["title", "author", "genre", "description"]
+FILTERABLE_ATTRIBUTES = [
+    "is_public", "is_featured", "has_file", "language", "copyright_status", "source", "genre",
+]
+
+
+class SearchEngineError(Exception):
+    """Meilisearch could not be reached or rejected a request"""
+
+
+class MeilisearchClient:
+    """Just the parts of the Meilisearch HTTP API this app needs (stdlib only)"""
+
+    def __init__(self, host: str, index: str, api_key: Optional[str] = None, timeout: float = 2.0):
+        self.host = host.rstrip("/")
+        self.index = index
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, payload=None):
+        data = json.dumps(payload).encode() if payload is not None else None
+        request = urllib.request.Request(f"{self.host}{path}", data=data, method=method)
+        request.add_header("Content-Type", "application/json")
+        if self.api_key:
+            request.add_header("Authorization", f"Bearer {self.api_key}")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = response.read()
+        except (urllib.error.URLError, OSError) as e:
+            raise SearchEngineError(f"Meilisearch {method} {path} failed: {e}") from e
+        return json.loads(body) if body else None
+
+    def configure_index(self):
+        try:
+            self._request("POST", "/indexes", {"uid": self.index, "primaryKey": "id"})
+        except SearchEngineError:
+            pass  # already exists
+        self._request("PATCH", f"/indexes/{self.index}/settings", {
+            "searchableAttributes": SEARCHABLE_ATTRIBUTES,
+            "filterableAttributes": FILTERABLE_ATTRIBUTES,
+        })
+
+    def add_documents(self, documents: List[dict]):
+        if documents:
+            self._request("POST", f"/indexes/{self.index}/documents?primaryKey=id", documents)
+
+    def delete_documents(self, ids: List[int]):
+        if ids:
+            self._request("POST", f"/indexes/{self.index}/documents/delete-batch", ids)
+
+    def search(self, q: str, filters: Optional[str], limit: int, offset: int = 0) -> Tuple[List[int], int]:
+        payload = {"q": q, "limit": limit, "offset": offset, "attributesToRetrieve": ["id"]}
+        if filters:
+            payload["filter"] = filters
+        result = self._request("POST", f"/indexes/{self.index}/search", payload)
+        ids = [hit["id"] for hit in result.get("hits", [])]
+        return ids, result.get("estimatedTotalHits", len(ids))
+
+
+def _build_client() -> Optional[MeilisearchClient]:
+    if not settings.MEILISEARCH_HOST:
+        return None
+    return MeilisearchClient(settings.MEILISEARCH_HOST, settings.MEILISEARCH_INDEX, settings.MEILISEARCH_API_KEY)
+
+
+search_client = _build_client()
+
+
+def search_engine_enabled() -> bool:
+    return search_client is not None
+
+
+def quote_filter(value) -> str:
+    """Render a value for a Meilisearch filter expression"""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+# Meilisearch equivalents of the SQL category filters in main.search_books
+CATEGORY_FILTERS = {
+    "public": '(source = "Sample Data" OR copyright_status = "Public Domain" OR is_public = true)',
+    "uploads": '(source IS NOT NULL AND source != "Sample Data" AND has_file = true)',
+}
+
+
+def filter_expression(category: Optional[str] = None, **equals) -> Optional[str]:
+    """AND together a category filter and exact-match conditions (None is skipped)"""
+    parts = [CATEGORY_FILTERS[category]] if category in CATEGORY_FILTERS else []
+    parts += [f"{field} = {quote_filter(value)}" for field, value in equals.items() if value is not None]
+    return " AND ".join(parts) or None
+
+
+def book_document(book) -> dict:
+    """Meilisearch document for a book row or instance"""
+    return {
+        "id": book.id,
+        "title": book.title,
+        "author": book.author,
+        "description": book.description,
+        "genre": book.genre,
+        "language": book.language,
+        "copyright_status": book.copyright_status,
+        "source": book.source,
+        "is_public": book.is_public is True,
+        "is_featured": book.is_featured is True,
+        "has_file": book.filename is not None,
+        "view_count": book.view_count or 0,
+        "download_count": book.download_count or 0,
+    }
+
+
+def document_columns():
+    Book = models.Book
+    return (Book.id, Book.title, Book.author, Book.description, Book.genre, Book.language,
+            Book.copyright_status, Book.source, Book.is_public, Book.is_featured,
+            Book.filename, Book.view_count, Book.download_count)
+
+
+def search_ids(q: str, filters: Optional[str], limit: int, offset: int = 0) -> Optional[Tuple[List[int], int]]:
+    """Ranked ids and total hits from Meilisearch, or None to use SQL instead"""
+    if search_client is None:
+        return None
+    try:
+        return search_client.search(q, filters, limit, offset)
+    except SearchEngineError as e:
+        print(f"[search_engine] Falling back to SQL search: {e}")
+        return None
+
+
+async def search_ids_async(q: str, filters: Optional[str], limit: int, offset: int = 0) -> Optional[Tuple[List[int], int]]:
+    """search_ids() for async handlers - the blocking HTTP call runs on the threadpool"""
+    if search_client is None:
+        return None
+    return await run_in_threadpool(search_ids, q, filters, limit, offset)
+
+
+def rows_in_order(query, ids: List[int]) -> list:
+    """Load rows for `ids` in one query, keeping the search engine's order
+
+    The query must select Book.id as its last column.
+    """
+    if not ids:
+        return []
+    rows = query.filter(models.Book.id.in_(ids)).all()
+    by_id = {row[-1]: row for row in rows}
+    return [by_id[book_id] for book_id in ids if book_id in by_id]
+
+
+def enqueue_search_sync(db, book_id: int, op: str = "upsert"):
+    """Record a pending index change in the caller's transaction"""
+    if search_client is None:
+        return
+    db.add(models.SearchOutbox(book_id=book_id, op=op))
+
+
+class OutboxWorker:
+    """Background thread draining search_outbox into Meilisearch in batches"""
+
+    def __init__(self, session_factory, batch_size: int, poll_seconds: float):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._configured = False
+
+    def start(self):
+        if search_client is None or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="search-outbox", daemon=True)
+        self._thread.start()
+        print("✅ Search outbox worker started")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        backoff = self.poll_seconds
+        while not self._stop.is_set():
+            try:
+                if not self._configured:
+                    search_client.configure_index()
+                    self._configured = True
+                drained = self.drain_once()
+                backoff = self.poll_seconds
+                if drained >= self.batch_size:
+                    continue  # more waiting, go again immediately
+            except Exception as e:
+                print(f"[search_engine] Outbox drain failed: {e}")
+                backoff = min(backoff * 2, 60)
+            self._stop.wait(backoff)
+
+    def drain_once(self) -> int:
+        """Push one batch of outbox entries; returns how many were processed"""
+        db = self.session_factory()
+        try:
+            query = db.query(models.SearchOutbox).order_by(models.SearchOutbox.id).limit(self.batch_size)
+            if db.get_bind().dialect.name == "postgresql":
+                # Several uvicorn workers can drain concurrently without double work
+                query = query.with_for_update(skip_locked=True)
+            entries = query.all()
+            if not entries:
+                db.rollback()
+                return 0
+
+            # Last operation per book wins
+            latest: Dict[int, str] = {}
+            for entry in entries:
+                latest[entry.book_id] = entry.op
+
+            upsert_ids = [book_id for book_id, op in latest.items() if op == "upsert"]
+            delete_ids = [book_id for book_id, op in latest.items() if op == "delete"]
+
+            documents = []
+            if upsert_ids:
+                rows = db.query(*document_columns()).filter(models.Book.id.in_(upsert_ids)).all()
+                documents = [book_document(row) for row in rows]
+                found = {row.id for row in rows}
+                delete_ids += [book_id for book_id in upsert_ids if book_id not in found]
+
+            search_client.add_documents(documents)
+            search_client.delete_documents(delete_ids)
+
+            db.query(models.SearchOutbox).filter(
+                models.SearchOutbox.id.in_([entry.id for entry in entries])
+            ).delete(synchronize_session=False)
+            db.commit()
+
+            response_cache.invalidate()
+            print(f"[search_engine] Synced {len(documents)} upserts, {len(delete_ids)} deletes")
+            return len(entries)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+def reindex_all(db, batch_size: int = 1000, client: Optional[MeilisearchClient] = None) -> int:
+    """Push every book to Meilisearch, paging through books by id"""
+    client = client or search_client
+    if client is None:
+        raise SearchEngineError("MEILISEARCH_HOST is not configured")
+
+    client.configure_index()
+    total = 0
+    last_id = 0
+    while True:
+        rows = db.query(*document_columns()).filter(
+            models.Book.id > last_id
+        ).order_by(models.Book.id).limit(batch_size).all()
+        if not rows:
+            break
+        client.add_documents([book_document(row) for row in rows])
+        total += len(rows)
+        last_id = rows[-1].id
+        print(f"[search_engine] Reindexed {total} books (last id {last_id})")
+    return total
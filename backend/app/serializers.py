@@ -0,0 +1,107 @@
+# backend/app/serializers.py - Precompiled row serializers for read-only endpoints
+from datetime import date, datetime
+from decimal import Decimal
+from operator import attrgetter
+from typing import Any, Iterable, List, Optional
+
+from fastapi.responses import Response
+from sqlalchemy import inspect as sql_inspect
+
+from app import models
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+    import json
+
+
+class InvalidFields(ValueError):
+    """Raised when a `fields=` parameter names columns the model does not have"""
+
+
+def _json_default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload: Any) -> bytes:
+    """Encode a payload to JSON bytes with the fastest available encoder"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=_json_default, separators=(",", ":")).encode()
+
+
+def loads(body: bytes) -> Any:
+    """Decode JSON bytes produced by dumps()"""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def json_response(payload: Any, status_code: int = 200, headers: dict = None) -> Response:
+    """Return already-encoded JSON, bypassing FastAPI's jsonable_encoder pass"""
+    return Response(content=dumps(payload), status_code=status_code,
+                    media_type="application/json", headers=headers)
+
+
+class RowSerializer:
+    """Column accessors for a model, resolved once instead of per row
+
+    `columns` can be handed straight to `db.query(*columns)` so listing
+    endpoints get plain Core rows back and skip the ORM identity map.
+    Sparse fieldsets from `for_fields` narrow that SELECT list, so large
+    TEXT/JSON columns are never read from the database unless asked for.
+    """
+
+    MAX_CACHED_FIELDSETS = 256
+
+    def __init__(self, model, column_names: Optional[tuple] = None):
+        self.model = model
+        self.column_names = column_names or tuple(attr.key for attr in sql_inspect(model).column_attrs)
+        self.columns = tuple(getattr(model, name) for name in self.column_names)
+        self._getter = attrgetter(*self.column_names)
+        self._fieldsets = {}
+
+    def for_fields(self, fields: Optional[str]) -> "RowSerializer":
+        """Serializer restricted to a comma-separated list of column names"""
+        if not fields:
+            return self
+
+        names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+        if not names:
+            return self
+
+        serializer = self._fieldsets.get(names)
+        if serializer is not None:
+            return serializer
+
+        unknown = [name for name in names if name not in self.column_names]
+        if unknown:
+            raise InvalidFields(f"Unknown fields: {', '.join(unknown)}")
+
+        serializer = RowSerializer(self.model, names)
+        if len(self._fieldsets) < self.MAX_CACHED_FIELDSETS:
+            self._fieldsets[names] = serializer
+        return serializer
+
+    def from_instance(self, obj) -> dict:
+        """Serialize a loaded ORM instance"""
+        values = self._getter(obj)
+        if len(self.column_names) == 1:
+            values = (values,)
+        return dict(zip(self.column_names, values))
+
+    def from_row(self, row) -> dict:
+        """Serialize a Core row selected with `self.columns`"""
+        return dict(zip(self.column_names, row))
+
+    def from_rows(self, rows: Iterable) -> List[dict]:
+        names = self.column_names
+        return [dict(zip(names, row)) for row in rows]
+
+
+book_serializer = RowSerializer(models.Book)
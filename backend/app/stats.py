@@ -0,0 +1,248 @@
+# backend/app/stats.py - Incrementally maintained library statistics snapshot
+"""
+The book_stats table holds one row per (dimension, value) with a book count:
+
+    ("total", "books" | "library_public" | "public" | "featured" | "user_uploads")
+    ("genre", <genre>)                      - every book with a genre
+    ("copyright_status" | "language", <v>)  - public books only
+    ("author", <author>)                    - public books with an author
+    ("meta", "built")                       - marker written by rebuild_snapshot
+
+Write paths call record_book_change() inside their transaction so the
+snapshot moves with the catalog; /stats and /books/stats only read a
+handful of small rows no matter how many books exist. Scripts that write
+to `books` directly should call invalidate_snapshot() instead - the next
+read then rebuilds it with a single aggregate query.
+
+The first build and writers that find no snapshot meet on a PostgreSQL
+advisory lock: builds run one at a time, and a write either commits before
+the build's aggregate runs or waits for the marker and records its delta.
+"""
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.db import atomic
+from app.models import BookStat
+
+BUILT_MARKER = ("meta", "built")
+
+# Advisory lock key for the first build ("bkst")
+BUILD_LOCK_KEY = 0x626B7374
+
+Fact = Tuple[str, str]
+
+
+def book_facts(book) -> List[Fact]:
+    """Every snapshot row a book contributes one to"""
+    if book is None:
+        return []
+
+    facts = [("total", "books")]
+    if book.source == "Sample Data" or book.is_public is True:
+        facts.append(("total", "library_public"))
+    if book.is_public is True:
+        facts.append(("total", "public"))
+    if book.is_featured is True:
+        facts.append(("total", "featured"))
+    if book.source is not None and book.source != "Sample Data" and book.filename is not None:
+        facts.append(("total", "user_uploads"))
+    if book.genre:
+        facts.append(("genre", book.genre))
+    if book.is_public is True:
+        facts.append(("copyright_status", book.copyright_status or ""))
+        facts.append(("language", book.language or ""))
+        if book.author:
+            facts.append(("author", book.author))
+    return facts
+
+
+def record_book_change(db, before: Optional[List[Fact]], after) -> None:
+    """Apply the difference between a book's old facts and its new state
+
+    `before` is the result of book_facts() taken before the change (None
+    for inserts); `after` is the book itself (None for deletes). Call this
+    before commit so the snapshot and the catalog change atomically.
+    """
+    record_book_changes(db, [(before, after)])
+
+
+def record_book_changes(db, changes: Iterable[Tuple[Optional[List[Fact]], object]]) -> None:
+    """record_book_change() for many books with a single snapshot upsert"""
+    deltas = Counter()
+    for before, after in changes:
+        deltas.update(book_facts(after))
+        deltas.subtract(before or [])
+    deltas = {fact: n for fact, n in deltas.items() if n}
+    if not deltas:
+        return
+
+    if not _is_built(db):
+        # A first build may be running: wait for it so this delta is either
+        # in its aggregate (committed before it starts) or recorded here
+        _lock_build(db, shared=True)
+        if not _is_built(db, refresh=True):
+            # Nothing to keep in sync yet - the first read builds a full snapshot
+            return
+
+    _upsert(db, deltas)
+
+
+def _is_built(db, refresh: bool = False) -> bool:
+    options = {"populate_existing": True} if refresh else {}
+    return db.get(BookStat, BUILT_MARKER, **options) is not None
+
+
+def _lock_build(db, shared: bool = False) -> None:
+    """Hold the snapshot build lock until the transaction ends (PostgreSQL only)
+
+    Other databases serialize writers on their own, so the re-check of the
+    marker after this call is enough there.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    function = "pg_advisory_xact_lock_shared" if shared else "pg_advisory_xact_lock"
+    db.execute(text(f"SELECT {function}(:key)"), {"key": BUILD_LOCK_KEY})
+
+
+def _upsert(db, deltas: Dict[Fact, int]):
+    rows = [{"dimension": d, "value": v, "book_count": n} for (d, v), n in deltas.items()]
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        for row in rows:
+            stat = db.get(BookStat, (row["dimension"], row["value"]))
+            if stat is None:
+                db.add(BookStat(**row))
+            else:
+                stat.book_count = BookStat.book_count + row["book_count"]
+        return
+
+    stmt = insert(BookStat).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[BookStat.dimension, BookStat.value],
+        set_={"book_count": BookStat.book_count + stmt.excluded.book_count},
+    )
+    db.execute(stmt)
+
+
+# One pass over books: GROUPING SETS yields the grand total row (with FILTER
+# counts for the flag totals) plus one group per distribution dimension.
+_AGGREGATE_COLUMNS = """
+    COUNT(*) AS books,
+    COUNT(*) FILTER (WHERE source = 'Sample Data' OR is_public = true) AS library_public,
+    COUNT(*) FILTER (WHERE is_public = true) AS public,
+    COUNT(*) FILTER (WHERE is_featured = true) AS featured,
+    COUNT(*) FILTER (WHERE source != 'Sample Data' AND filename IS NOT NULL) AS user_uploads,
+    COUNT(*) FILTER (WHERE is_public = true AND author IS NOT NULL AND author != '') AS public_authored
+"""
+
+_REBUILD_POSTGRES = f"""
+    SELECT
+        CASE
+            WHEN GROUPING(genre) = 0 THEN 'genre'
+            WHEN GROUPING(copyright_status) = 0 THEN 'copyright_status'
+            WHEN GROUPING(language) = 0 THEN 'language'
+            WHEN GROUPING(author) = 0 THEN 'author'
+            ELSE 'total'
+        END AS dimension,
+        COALESCE(genre, copyright_status, language, author) AS value,
+        {_AGGREGATE_COLUMNS}
+    FROM books
+    GROUP BY GROUPING SETS ((), (genre), (copyright_status), (language), (author))
+"""
+
+# Same result shape for databases without GROUPING SETS (SQLite dev setups)
+_REBUILD_PORTABLE = " UNION ALL ".join(
+    f"SELECT '{dimension}' AS dimension, {column} AS value, {_AGGREGATE_COLUMNS} FROM books {group_by}"
+    for dimension, column, group_by in [
+        ("total", "NULL", ""),
+        ("genre", "genre", "GROUP BY genre"),
+        ("copyright_status", "copyright_status", "GROUP BY copyright_status"),
+        ("language", "language", "GROUP BY language"),
+        ("author", "author", "GROUP BY author"),
+    ]
+)
+
+
+def rebuild_snapshot(db) -> None:
+    """Recompute the whole snapshot from books with one aggregate query"""
+    _lock_build(db)
+    dialect = db.get_bind().dialect.name
+    query = _REBUILD_POSTGRES if dialect == "postgresql" else _REBUILD_PORTABLE
+
+    counts: Dict[Fact, int] = {}
+    for row in db.execute(text(query)).mappings():
+        dimension, value = row["dimension"], row["value"]
+        if dimension == "total":
+            for name in ("books", "library_public", "public", "featured", "user_uploads"):
+                counts[("total", name)] = row[name]
+        elif dimension == "genre":
+            if value:
+                counts[("genre", value)] = row["books"]
+        elif dimension == "author":
+            if value and row["public_authored"]:
+                counts[("author", value)] = row["public_authored"]
+        elif row["public"]:
+            counts[(dimension, value or "")] = counts.get((dimension, value or ""), 0) + row["public"]
+
+    db.query(BookStat).delete()
+    db.add_all(BookStat(dimension=d, value=v, book_count=n) for (d, v), n in counts.items())
+    db.add(BookStat(dimension=BUILT_MARKER[0], value=BUILT_MARKER[1], book_count=0))
+    db.flush()
+    print(f"[stats] Snapshot rebuilt with {len(counts)} rows")
+
+
+def invalidate_snapshot(db) -> None:
+    """Drop the snapshot so the next read rebuilds it from scratch"""
+    db.query(BookStat).delete()
+
+
+def read_snapshot(db, top_n: int = 10) -> Dict[str, Dict[str, int]]:
+    """Snapshot grouped by dimension, building it first if it is missing
+
+    Totals, genres and copyright statuses are returned whole; the long-tail
+    language and author dimensions are limited to the `top_n` largest.
+    """
+    if not _is_built(db):
+        with atomic(db):
+            _lock_build(db)
+            # Another request may have built it while this one waited
+            if not _is_built(db, refresh=True):
+                rebuild_snapshot(db)
+
+    snapshot: Dict[str, Dict[str, int]] = {
+        "total": {}, "genre": {}, "copyright_status": {}, "language": {}, "author": {}
+    }
+
+    small = db.query(BookStat).filter(
+        BookStat.dimension.in_(["total", "genre", "copyright_status"]),
+        BookStat.book_count > 0,
+    ).order_by(BookStat.book_count.desc())
+    for stat in small:
+        snapshot[stat.dimension][stat.value] = stat.book_count
+
+    for dimension in ("language", "author"):
+        top = db.query(BookStat).filter(
+            BookStat.dimension == dimension, BookStat.book_count > 0
+        ).order_by(BookStat.book_count.desc()).limit(top_n)
+        for stat in top:
+            snapshot[dimension][stat.value] = stat.book_count
+
+    return snapshot
+
+
+if __name__ == "__main__":
+    from app.db import SessionLocal
+
+    session = SessionLocal()
+    try:
+        rebuild_snapshot(session)
+        session.commit()
+    finally:
+        session.close()
@@ -0,0 +1,159 @@
+# backend/app/storage.py - Reading book files from S3 in whole or in byte ranges
+"""
+The inline reader and range responses (app/ranges.py) only need three
+things from an object: its size and validators, its full body, and a slice
+of it. S3Object provides them over the boto3 client with GetObject's Range
+parameter, so a seek in a 50 MB PDF fetches only the bytes asked for.
+
+All of that I/O is blocking, so it runs on download_executor, a thread
+pool sized by DOWNLOAD_IO_THREADS and separate from the threadpool that
+serves `def` endpoints. Response bodies are async iterators (stream_async)
+that borrow a thread only to read the next DOWNLOAD_CHUNK_BYTES; while a
+slow client drains its socket no thread is held, so slow readers cannot
+starve the metadata API.
+
+Attachment downloads never touch the bytes: PresignedUrls hands out
+presigned GET URLs, reusing each one for PRESIGN_REUSE_SECONDS of its
+PRESIGN_EXPIRES_SECONDS lifetime so hot books are not re-signed per click.
+"""
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterator, Optional, Tuple
+
+from app.core.config import settings
+
+CHUNK_SIZE = settings.DOWNLOAD_CHUNK_BYTES
+
+download_executor = ThreadPoolExecutor(max_workers=settings.DOWNLOAD_IO_THREADS, thread_name_prefix="s3-io")
+
+
+async def run_io(func, *args, **kwargs):
+    """Run blocking S3 or disk I/O on download_executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(download_executor, functools.partial(func, *args, **kwargs))
+
+
+async def stream_async(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """Pull each chunk of a blocking iterator on download_executor"""
+    done = object()
+    try:
+        while True:
+            chunk = await run_io(next, chunks, done)
+            if chunk is done:
+                return
+            yield chunk
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            await run_io(close)
+
+
+@dataclass(frozen=True)
+class ObjectInfo:
+    size: int
+    etag: Optional[str]  # quoted, as S3 returns it
+    last_modified: Optional[datetime]
+
+
+def _info(response) -> ObjectInfo:
+    return ObjectInfo(
+        size=response["ContentLength"],
+        etag=response.get("ETag"),
+        last_modified=response.get("LastModified"),
+    )
+
+
+def _chunks(body) -> Iterator[bytes]:
+    try:
+        for chunk in body.iter_chunks(CHUNK_SIZE):
+            yield chunk
+    finally:
+        body.close()
+
+
+class S3Object:
+    """One object in a bucket"""
+
+    def __init__(self, client, bucket: str, key: str):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+
+    def info(self) -> ObjectInfo:
+        return _info(self.client.head_object(Bucket=self.bucket, Key=self.key))
+
+    def open(self, if_match: Optional[str] = None) -> Tuple[ObjectInfo, Iterator[bytes]]:
+        """The whole object: its info and a chunk iterator over the body"""
+        params = {"Bucket": self.bucket, "Key": self.key}
+        if if_match:
+            params["IfMatch"] = if_match
+        response = self.client.get_object(**params)
+        return _info(response), _chunks(response["Body"])
+
+    def read_range(self, start: int, end: int, if_match: Optional[str] = None) -> Iterator[bytes]:
+        """Bytes start..end inclusive, via one ranged GET
+
+        With `if_match` S3 refuses the read if the object changed since its
+        info() was taken, so a response never mixes two versions.
+        """
+        params = {"Bucket": self.bucket, "Key": self.key, "Range": f"bytes={start}-{end}"}
+        if if_match:
+            params["IfMatch"] = if_match
+        return _chunks(self.client.get_object(**params)["Body"])
+
+
+class PresignedUrls:
+    """Presigned GET URLs memoized per (key, disposition)
+
+    A URL is reused for `reuse_seconds`, so whoever receives it last still
+    has at least expires_seconds - reuse_seconds left to start the download.
+    """
+
+    MAX_ENTRIES = 10000
+
+    def __init__(self, expires_seconds: int, reuse_seconds: int):
+        self.expires_seconds = expires_seconds
+        self.reuse_seconds = min(reuse_seconds, expires_seconds)
+        self._lock = threading.Lock()
+        self._urls: Dict[Tuple[str, str, str], Tuple[float, str]] = {}
+        self.hits = self.signed = 0
+
+    def get(self, client, bucket: str, key: str, content_type: str, disposition: str) -> str:
+        memo_key = (key, disposition, content_type)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._urls.get(memo_key)
+            if cached and cached[0] > now:
+                self.hits += 1
+                return cached[1]
+        url = client.generate_presigned_url("get_object", Params={
+            "Bucket": bucket,
+            "Key": key,
+            "ResponseContentType": content_type,
+            "ResponseContentDisposition": disposition,
+        }, ExpiresIn=self.expires_seconds)
+        with self._lock:
+            if len(self._urls) >= self.MAX_ENTRIES:
+                self._urls = {k: v for k, v in self._urls.items() if v[0] > now}
+                if len(self._urls) >= self.MAX_ENTRIES:
+                    self._urls.clear()
+            self._urls[memo_key] = (now + self.reuse_seconds, url)
+            self.signed += 1
+        return url
+
+    def forget(self, key: str):
+        """Drop URLs for a deleted or replaced object"""
+        with self._lock:
+            self._urls = {k: v for k, v in self._urls.items() if k[0] != key}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._urls), "hits": self.hits, "signed": self.signed}
+
+
+presigned_urls = PresignedUrls(settings.PRESIGN_EXPIRES_SECONDS, settings.PRESIGN_REUSE_SECONDS)
@@ -0,0 +1,153 @@
+# backend/app/trending.py - Hourly activity rollup and decayed trending scores
+"""
+Every counter flush (app/counters.py) adds its deltas to two tables in the
+same transaction:
+
+- book_activity: views and downloads per book per UTC hour, the history.
+- book_trending: one exponentially decayed popularity score per book and
+  period ("24h", "7d", "30d"); activity loses half its weight every quarter
+  of the period.
+
+A decayed score normally has to be recomputed as time passes. Stored as
+log2(sum of weight * 2^(hours_since_epoch / half_life)) instead, every
+book's score ages at the same rate, so ordering by the stored value is
+ordering by the current decayed score. A flush only needs to fold its new
+activity into the touched rows (log-add-exp, in SQL), and
+/books/trending?window=7d is an index scan on (period, log_score).
+"""
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Set
+
+from sqlalchemy import case, func, select
+
+from app import models
+
+# Half-life in hours per period: a quarter of the period
+HALF_LIVES = {"24h": 6.0, "7d": 42.0, "30d": 180.0}
+DEFAULT_PERIOD = "7d"
+
+# A download says more about interest than opening the reader
+DOWNLOAD_WEIGHT = 3
+
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+ACTIVITY_RETENTION_DAYS = 90
+
+# Scores decayed below this are dropped by prune()
+MIN_SCORE = 0.01
+
+LN2 = math.log(2)
+
+# Dialects already warned about, so an unsupported database logs once, not per flush
+_unsupported: Set[str] = set()
+
+
+class InvalidPeriod(ValueError):
+    """Raised for a `window=` that is not one of HALF_LIVES"""
+
+
+def parse_period(window: str) -> str:
+    if window not in HALF_LIVES:
+        raise InvalidPeriod(f"window must be one of {', '.join(HALF_LIVES)}, got {window}")
+    return window
+
+
+def _hours(moment: datetime) -> float:
+    return (moment - EPOCH).total_seconds() / 3600
+
+
+def current_score(log_score: float, period: str, now: datetime) -> float:
+    """The decayed score at `now`, in weighted views"""
+    return 2 ** (log_score - _hours(now) / HALF_LIVES[period])
+
+
+def _insert(db):
+    """The dialect's INSERT with ON CONFLICT, or None where there is none"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        if dialect not in _unsupported:
+            _unsupported.add(dialect)
+            print(f"[trending] Rollups need PostgreSQL or SQLite, not {dialect}; trending scores are disabled")
+        return None
+    return insert
+
+
+def _log_add(a, b):
+    """log2(2^a + 2^b) without overflow; past 50 the smaller term is noise"""
+    high = case((a >= b, a), else_=b)
+    gap = func.abs(a - b)
+    return case((gap > 50, high), else_=high + func.ln(1 + func.power(2.0, -gap)) / LN2)
+
+
+def record_activity(db, deltas: Dict[int, Dict[str, int]], now: datetime) -> None:
+    """Fold flushed counter deltas into the hourly rollup and every trending score
+
+    Runs inside the counter flush transaction; nothing is committed here.
+    On databases without ON CONFLICT the counters are still written and
+    the rollup is skipped.
+    """
+    weights = {
+        book_id: counts["view_count"] + DOWNLOAD_WEIGHT * counts["download_count"]
+        for book_id, counts in deltas.items()
+    }
+    weights = {book_id: weight for book_id, weight in weights.items() if weight > 0}
+    if not weights:
+        return
+    insert = _insert(db)
+    if insert is None:
+        return
+
+    bucket = now.replace(minute=0, second=0, microsecond=0)
+    Activity = models.BookActivity
+    stmt = insert(Activity).values([
+        {"book_id": book_id, "bucket": bucket,
+         "views": deltas[book_id]["view_count"], "downloads": deltas[book_id]["download_count"]}
+        for book_id in sorted(weights)
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[Activity.book_id, Activity.bucket],
+        set_={"views": Activity.views + stmt.excluded.views,
+              "downloads": Activity.downloads + stmt.excluded.downloads},
+    ))
+
+    Trending = models.BookTrending
+    hours = _hours(now)
+    stmt = insert(Trending).values([
+        {"period": period, "book_id": book_id, "log_score": math.log2(weight) + hours / half_life}
+        for period, half_life in HALF_LIVES.items()
+        for book_id, weight in sorted(weights.items())
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[Trending.period, Trending.book_id],
+        set_={"log_score": _log_add(Trending.log_score, stmt.excluded.log_score), "updated_at": func.now()},
+    ))
+
+
+def prune(db, now: datetime) -> None:
+    """Drop hourly buckets past retention and scores that have decayed to nothing"""
+    Activity, Trending = models.BookActivity, models.BookTrending
+    db.query(Activity).filter(
+        Activity.bucket < now - timedelta(days=ACTIVITY_RETENTION_DAYS)
+    ).delete(synchronize_session=False)
+    for period, half_life in HALF_LIVES.items():
+        floor = math.log2(MIN_SCORE) + _hours(now) / half_life
+        db.query(Trending).filter(
+            Trending.period == period, Trending.log_score < floor
+        ).delete(synchronize_session=False)
+
+
+def trending_query(columns, period: str, limit: int):
+    """Public books by decayed score for `period`, best first; log_score is the last column"""
+    Book, Trending = models.Book, models.BookTrending
+    return (
+        select(*columns, Trending.log_score)
+        .join(Trending, Trending.book_id == Book.id)
+        .where(Trending.period == period, Book.is_public.is_(True))
+        .order_by(Trending.log_score.desc())
+        .limit(limit)
+    )
@@ -51,6 +51,10 @@ def run_migration():
             "ALTER TABLE books ADD COLUMN IF NOT EXISTS download_count INTEGER DEFAULT 0;",
             "ALTER TABLE books ADD COLUMN IF NOT EXISTS view_count INTEGER DEFAULT 0;",
             "ALTER TABLE books ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;",
+
+            # Duplicate detection keys (filled by backfill_dedupe_keys below, see app/dedupe.py)
+            "ALTER TABLE books ADD COLUMN IF NOT EXISTS dedupe_key VARCHAR;",
+            "ALTER TABLE books ADD COLUMN IF NOT EXISTS source_id VARCHAR;",
         ]
         
         # Index creation queries (only if they don't exist)
@@ -61,6 +65,13 @@ def run_migration():
             "CREATE INDEX IF NOT EXISTS idx_books_is_featured ON books(is_featured);",
             "CREATE INDEX IF NOT EXISTS idx_books_genre ON books(genre);",
             "CREATE INDEX IF NOT EXISTS idx_books_publication_year ON books(publication_year);",
+            # Keyset pagination for GET /books (created_at, id) newest-first
+            "CREATE INDEX IF NOT EXISTS idx_books_created_at_id ON books(created_at DESC NULLS LAST, id DESC);",
+            # max(updated_at) catalog fingerprint for ETag / Last-Modified
+            "CREATE INDEX IF NOT EXISTS idx_books_updated_at ON books(updated_at);",
+            # POST /books/exists batch duplicate checks
+            "CREATE INDEX IF NOT EXISTS ix_books_dedupe_key ON books(dedupe_key);",
+            "CREATE INDEX IF NOT EXISTS ix_books_source_id ON books(source_id);",
         ]
         
         # Wait for database to be ready
@@ -186,12 +197,67 @@ def create_content_sources_table():
     except Exception as e:
         print(f"❌ Failed to create content_sources table: {e}")
 
+# Ranked search: a weighted document, title (A) > author (B) > genre (C) >
+# description (D). A STORED generated column keeps it current on every
+# INSERT/UPDATE without a trigger, and the GIN index serves the @@ match.
+# The configuration must match TEXT_SEARCH_CONFIG in app/search.py.
+FULLTEXT_QUERIES = [
+    """
+    ALTER TABLE books ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(author, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(genre, '')), 'C') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'D')
+    ) STORED;
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_books_search_vector ON books USING GIN (search_vector);",
+]
+
+# Fuzzy search: trigram indexes let `<%` (word similarity) use an index, so
+# misspellings like "Sherlok" still find their book. CREATE EXTENSION needs
+# a privileged role; without it the API keeps exact search only.
+TRIGRAM_QUERIES = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm;",
+    "CREATE INDEX IF NOT EXISTS idx_books_title_trgm ON books USING GIN (title gin_trgm_ops);",
+    "CREATE INDEX IF NOT EXISTS idx_books_author_trgm ON books USING GIN (author gin_trgm_ops);",
+]
+
+def create_search_schema():
+    """Create the full-text column and the trigram indexes used by app/search.py"""
+    print("🔍 Creating search indexes...")
+    
+    engine = create_engine(DATABASE_URL)
+    for name, queries in (("Full-text search", FULLTEXT_QUERIES), ("Trigram fuzzy search", TRIGRAM_QUERIES)):
+        # Own transaction per feature, so a refused CREATE EXTENSION leaves full-text search in place
+        try:
+            with engine.begin() as connection:
+                for query in queries:
+                    connection.execute(text(query))
+            print(f"   ✅ {name} ready")
+        except Exception as e:
+            print(f"   ⚠️  {name} skipped: {e}")
+
+def backfill_dedupe_keys():
+    """Fill dedupe_key/source_id for books that do not have them yet"""
+    print("🔄 Backfilling duplicate detection keys...")
+    
+    try:
+        from app.dedupe import backfill_keys
+        
+        filled = backfill_keys(create_engine(DATABASE_URL))
+        print(f"   ✅ Backfilled {filled} books")
+    except Exception as e:
+        print(f"❌ Failed to backfill duplicate detection keys: {e}")
+
 if __name__ == "__main__":
     print("🚀 Starting Readora database migration...")
     
     # Run migrations
     if run_migration():
         create_content_sources_table()
+        create_search_schema()
+        backfill_dedupe_keys()
         print("\n🎉 All migrations completed successfully!")
     else:
         print("\n❌ Migration failed!")
@@ -0,0 +1,124 @@
+# backend/scripts/bench_async.py
+"""
+Sync vs async read path load test
+Serves the same newest-first listing query from a `def` handler on
+SessionLocal (threadpool) and an `async def` handler on AsyncSessionLocal
+(asyncpg), then hammers each with keep-alive clients and reports
+p50/p99 latency and throughput.
+
+Usage:
+    DATABASE_URL=postgresql://... python scripts/bench_async.py [clients] [seconds]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+for key, value in {"S3_ACCESS_KEY": "bench", "S3_SECRET_KEY": "bench", "S3_BUCKET": "bench"}.items():
+    os.environ.setdefault(key, value)
+os.environ.setdefault("DATABASE_URL", "postgresql://postgres:postgres@db:5432/postgres")
+
+import uvicorn
+from fastapi import Depends, FastAPI
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal, get_async_db
+from app.pagination import newest_first
+from app.serializers import book_serializer, json_response
+
+HOST, PORT = "127.0.0.1", 8765
+PAGE_SIZE = 20
+
+bench_app = FastAPI()
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@bench_app.get("/sync")
+def sync_books(db: Session = Depends(get_db)):
+    rows = newest_first(db.query(*book_serializer.columns)).limit(PAGE_SIZE).all()
+    return json_response(book_serializer.from_rows(rows))
+
+
+@bench_app.get("/async")
+async def async_books(db=Depends(get_async_db)):
+    rows = (await db.execute(newest_first(select(*book_serializer.columns)).limit(PAGE_SIZE))).all()
+    return json_response(book_serializer.from_rows(rows))
+
+
+async def client(path, deadline, latencies, errors):
+    """One keep-alive HTTP/1.1 connection issuing requests back to back"""
+    reader, writer = await asyncio.open_connection(HOST, PORT)
+    request = f"GET {path} HTTP/1.1\r\nHost: {HOST}\r\n\r\n".encode()
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(request)
+            status = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode().partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            if b" 200 " not in status:
+                errors.append(status)
+                continue
+            latencies.append(time.perf_counter() - start)
+    except (ConnectionError, asyncio.IncompleteReadError) as e:
+        errors.append(e)
+    finally:
+        writer.close()
+
+
+async def load(path, clients, seconds):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    await asyncio.gather(*(client(path, deadline, latencies, errors) for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+
+    if not latencies:
+        print(f"   {path:<7} no successful requests ({len(errors)} errors)")
+        return
+    cuts = statistics.quantiles(latencies, n=100)
+    print(f"   {path:<7} {len(latencies) / elapsed:8.0f} req/s   p50 {cuts[49] * 1000:7.1f} ms"
+          f"   p99 {cuts[98] * 1000:7.1f} ms   {len(errors)} errors")
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 15
+
+    server = uvicorn.Server(uvicorn.Config(bench_app, host=HOST, port=PORT, log_level="warning",
+                                           backlog=clients * 2))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    print(f"🏋️  {clients} concurrent clients, {seconds:.0f}s per path, {PAGE_SIZE} books per response")
+    for path in ("/sync", "/async"):
+        asyncio.run(load(path, clients, seconds))
+
+    server.should_exit = True
+    thread.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# backend/scripts/bench_counters.py
+"""
+Hot-book download counter benchmark
+Hammers a single book's download_count from many threads, first the old way
+(load the row, add one in Python, commit) and then through the write-behind
+CounterBuffer, and reports throughput plus how many increments were lost.
+
+Usage:
+    DATABASE_URL=postgresql://... python scripts/bench_counters.py [threads] [seconds]
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+for key, value in {"S3_ACCESS_KEY": "bench", "S3_SECRET_KEY": "bench", "S3_BUCKET": "bench"}.items():
+    os.environ.setdefault(key, value)
+os.environ.setdefault("DATABASE_URL", "postgresql://postgres:postgres@db:5432/postgres")
+
+from app import models
+from app.core.config import settings
+from app.counters import CounterBuffer
+from app.db import SessionLocal, engine
+
+
+def direct_download(book_id):
+    """What download_book used to do for every request"""
+    db = SessionLocal()
+    try:
+        book = db.query(models.Book).filter(models.Book.id == book_id).first()
+        book.download_count = (book.download_count or 0) + 1
+        db.commit()
+    finally:
+        db.close()
+
+
+def stored_count(book_id):
+    db = SessionLocal()
+    try:
+        return db.query(models.Book.download_count).filter(models.Book.id == book_id).scalar() or 0
+    finally:
+        db.close()
+
+
+def run(label, hit, book_id, threads, seconds, before_check=None):
+    counts, errors = [0] * threads, []
+    start_count = stored_count(book_id)
+    deadline = time.perf_counter() + seconds
+
+    def worker(slot):
+        while time.perf_counter() < deadline:
+            try:
+                hit(book_id)
+                counts[slot] += 1
+            except Exception as e:
+                errors.append(e)
+
+    workers = [threading.Thread(target=worker, args=(slot,)) for slot in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    if before_check:
+        before_check()
+    attempted = sum(counts)
+    lost = attempted - (stored_count(book_id) - start_count)
+    print(f"   {label:<9} {attempted / elapsed:10.0f} downloads/s   {attempted:8d} counted"
+          f"   {lost:6d} lost   {len(errors)} errors")
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    book = models.Book(title="Counter benchmark", author="bench", is_public=False)
+    db.add(book)
+    db.commit()
+    book_id = book.id
+    db.close()
+
+    buffer = CounterBuffer(SessionLocal, settings.COUNTER_FLUSH_SECONDS, settings.COUNTER_MAX_PENDING)
+
+    print(f"🏋️  {threads} threads, {seconds:.0f}s per mode, one hot book, "
+          f"flush every {settings.COUNTER_FLUSH_SECONDS:g}s")
+    try:
+        run("direct", direct_download, book_id, threads, seconds)
+        buffer.start()
+        run("buffered", lambda bid: buffer.increment(bid, "download_count"), book_id, threads, seconds,
+            before_check=buffer.stop)
+    finally:
+        db = SessionLocal()
+        db.query(models.Book).filter(models.Book.id == book_id).delete()
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# backend/scripts/bench_search.py
+"""
+Search benchmark on a synthetic 100k-book catalog (PostgreSQL only)
+Builds a temporary copy of the books table (including the search_vector
+column and the GIN/trigram indexes), fills it with generated titles/authors/
+blurbs and compares the old ILIKE scan against ranked full-text search and,
+when pg_trgm is installed, the fuzzy fallback for misspelled queries.
+
+Usage:
+    DATABASE_URL=postgresql://... python scripts/bench_search.py [num_books]
+"""
+
+import os
+import sys
+import time
+
+from sqlalchemy import create_engine, text
+
+DATABASE_URL = os.getenv('DATABASE_URL', 'postgresql://postgres:postgres@db:5432/postgres')
+
+WORDS = [
+    "war", "peace", "crime", "punishment", "pride", "prejudice", "ocean", "whale",
+    "garden", "secret", "island", "treasure", "journey", "night", "river", "city",
+    "kingdom", "shadow", "letters", "mountain", "winter", "summer", "stranger", "house",
+]
+
+QUERIES = ["treasure island", "crime", "\"secret garden\"", "whale -ocean"]
+
+MISSPELLED = ["tresure iland", "punishmnt", "Autor 4242"]
+
+
+def build_catalog(connection, count):
+    connection.execute(text("CREATE TEMP TABLE bench_books (LIKE books INCLUDING ALL) ON COMMIT PRESERVE ROWS"))
+    words = "ARRAY[" + ",".join(f"'{w}'" for w in WORDS) + "]"
+    connection.execute(text(f"""
+        INSERT INTO bench_books (id, title, author, genre, description, is_public)
+        SELECT
+            i,
+            initcap(w[1 + i % 24] || ' ' || w[1 + (i / 24) % 24] || ' ' || w[1 + (i / 576) % 24]),
+            'Author ' || (i % 5000),
+            (ARRAY['Fiction', 'Poetry', 'History', 'Adventure'])[1 + i % 4],
+            repeat(w[1 + (i * 7) % 24] || ' ' || w[1 + (i * 13) % 24] || ' of the ' || w[1 + (i * 3) % 24] || '. ', 12),
+            true
+        FROM generate_series(1, :count) AS i, (SELECT {words} AS w) AS vocab
+    """), {"count": count})
+    connection.execute(text("ANALYZE bench_books"))
+
+
+def timed(connection, label, sql, params, repeats=5):
+    plan = connection.execute(text("EXPLAIN (ANALYZE, FORMAT TEXT) " + sql), params).scalars().all()
+    scan = next((line.strip() for line in plan if "Scan" in line), plan[0].strip())
+
+    best = float("inf")
+    rows = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        rows = len(connection.execute(text(sql), params).all())
+        best = min(best, time.perf_counter() - start)
+    print(f"   {label:<10} {best * 1000:8.2f} ms  {rows:>3} rows  {scan[:70]}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    engine = create_engine(DATABASE_URL)
+
+    with engine.connect() as connection:
+        has_vector = connection.execute(text("""
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'books' AND column_name = 'search_vector'
+        """)).scalar()
+        if not has_vector:
+            print("❌ books.search_vector missing - run `python migrate_database.py` to create it")
+            sys.exit(1)
+
+        print(f"🏗️  Building {count:,} synthetic books...")
+        build_catalog(connection, count)
+
+        for q in QUERIES:
+            print(f"\n🔍 {q}")
+            timed(connection, "ILIKE", """
+                SELECT id, title FROM bench_books
+                WHERE title ILIKE :like OR author ILIKE :like OR description ILIKE :like OR genre ILIKE :like
+                ORDER BY title LIMIT 50
+            """, {"like": f"%{q}%"})
+            timed(connection, "FTS", """
+                SELECT id, title FROM bench_books
+                WHERE search_vector @@ websearch_to_tsquery('english', :q)
+                ORDER BY ts_rank(search_vector, websearch_to_tsquery('english', :q)) DESC, title
+                LIMIT 50
+            """, {"q": q})
+
+        has_trgm = connection.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).scalar()
+        if not has_trgm:
+            print("\n⚠️ pg_trgm not installed - skipping fuzzy benchmark")
+            return
+
+        connection.execute(text("SET pg_trgm.word_similarity_threshold = 0.5"))
+        for q in MISSPELLED:
+            print(f"\n🔤 {q}")
+            timed(connection, "ILIKE", """
+                SELECT id, title FROM bench_books
+                WHERE title ILIKE :like OR author ILIKE :like
+                ORDER BY title LIMIT 50
+            """, {"like": f"%{q}%"})
+            timed(connection, "FUZZY", """
+                SELECT id, title FROM bench_books
+                WHERE :q <% title OR :q <% author
+                ORDER BY greatest(word_similarity(:q, title), word_similarity(:q, coalesce(author, ''))) DESC, title
+                LIMIT 50
+            """, {"q": q})
+
+
+if __name__ == "__main__":
+    main()
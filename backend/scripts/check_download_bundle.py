@@ -0,0 +1,129 @@
+# backend/scripts/check_download_bundle.py
+"""
+ZIP bundle check for POST /books/download-bundle
+Builds bundles against the in-memory S3 stand-in from check_range_requests
+and a throwaway SQLite database, then reads them back with zipfile (and
+`unzip -t` when it is installed): member bytes and names, request order,
+the exact Content-Length, books with missing objects, filter bundles
+(mistyped filter values answered with 422), and zip64 records (forced on
+small files by lowering the zip64 threshold).
+
+Usage:
+    python scripts/check_download_bundle.py
+"""
+
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from check_range_requests import CONTENT, DB_PATH, StandInS3, check  # sets up the environment first
+
+from fastapi.testclient import TestClient
+
+import app.bundle as bundle
+import app.main as main
+from app import models
+from app.db import SessionLocal
+
+OBJECTS = {
+    "books/a.pdf": CONTENT,
+    "books/b.epub": CONTENT[::-1][:300000],
+    "books/c.pdf": b"",
+    "books/d.pdf": CONTENT[:5000],
+}
+
+
+def unzip_ok(data):
+    """`unzip -t` agrees the archive is intact, when unzip is available"""
+    if shutil.which("unzip") is None:
+        return True
+    with tempfile.NamedTemporaryFile(suffix=".zip") as archive:
+        archive.write(data)
+        archive.flush()
+        return subprocess.run(["unzip", "-tqq", archive.name], capture_output=True).returncode == 0
+
+
+def read_bundle(response):
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    check_ok = archive.testzip() is None
+    return archive, check_ok
+
+
+def main_check():
+    s3 = StandInS3(dict(OBJECTS))
+    main.s3_internal = s3
+    main.s3_presign = s3
+
+    db = SessionLocal()
+    books = [
+        models.Book(title="Odes", author="Keats", genre="Poetry", filename="a.pdf", s3_key="books/a.pdf"),
+        models.Book(title="War: and Peace?", author="Tolstoy", genre="Novel", filename="b.epub", s3_key="books/b.epub"),
+        models.Book(title="Odes", author="Keats", genre="Poetry", filename="c.pdf", s3_key="books/c.pdf"),
+        models.Book(title="Lost", author="Nobody", genre="Poetry", filename="x.pdf", s3_key="books/missing.pdf"),
+        models.Book(title="Sonnets", author="Shakespeare", genre="Poetry", filename="d.pdf", s3_key="books/d.pdf"),
+    ]
+    db.add_all(books)
+    db.commit()
+    ids = [book.id for book in books]
+    db.close()
+
+    client = TestClient(main.app)
+
+    response = client.post("/books/download-bundle", json={"ids": [ids[1], ids[0], ids[2], ids[3]]})
+    check("id bundle: 200 application/zip",
+          response.status_code == 200 and response.headers["content-type"] == "application/zip")
+    check("id bundle: Content-Length is exact", int(response.headers["content-length"]) == len(response.content))
+    archive, intact = read_bundle(response)
+    check("id bundle: CRCs verify", intact)
+    names = archive.namelist()
+    check("id bundle: request order, missing object left out, duplicate names numbered",
+          names == ["War and Peace - Tolstoy.epub", "Odes - Keats.pdf", "Odes - Keats (2).pdf"])
+    check("id bundle: member bytes", [archive.read(name) for name in names]
+          == [OBJECTS["books/b.epub"], OBJECTS["books/a.pdf"], b""])
+    check("id bundle: members are stored", all(info.compress_type == zipfile.ZIP_STORED for info in archive.infolist()))
+    check("id bundle: unzip -t", unzip_ok(response.content))
+
+    response = client.post("/books/download-bundle", json={"filter": {"genre": "Poetry"}})
+    archive, intact = read_bundle(response)
+    check("filter bundle: matching books by title",
+          intact and archive.namelist() == ["Odes - Keats.pdf", "Odes - Keats (2).pdf", "Sonnets - Shakespeare.pdf"])
+
+    response = client.post("/books/download-bundle", json={"filter": {"nope": 1}})
+    check("unknown filter column: 400", response.status_code == 400)
+    for mistyped in ({"is_public": [1]}, {"publication_year": "abc"}, {"publication_year": 2 ** 40}, {"tags": ["x"]}):
+        response = client.post("/books/download-bundle", json={"filter": mistyped})
+        check(f"mistyped filter {mistyped}: 422", response.status_code == 422)
+    response = client.post("/books/download-bundle", json={"filter": {"is_public": "true", "genre": "Novel"}})
+    check("filter values coerced to the column type", response.status_code == 200
+          and read_bundle(response)[0].namelist() == ["War and Peace - Tolstoy.epub"])
+    response = client.post("/books/download-bundle", json={"ids": [1], "filter": {"genre": "Poetry"}})
+    check("ids and filter together: 400", response.status_code == 400)
+    response = client.post("/books/download-bundle", json={"ids": [ids[3]]})
+    check("nothing downloadable: 404", response.status_code == 404)
+
+    limit = bundle.ZIP64_LIMIT
+    bundle.ZIP64_LIMIT = 100000  # a.pdf and b.epub sizes and every later offset now take zip64 fields
+    try:
+        response = client.post("/books/download-bundle", json={"ids": [ids[0], ids[4], ids[1], ids[2]]})
+    finally:
+        bundle.ZIP64_LIMIT = limit
+    check("zip64: end record and locator written", b"PK\x06\x06" in response.content[-200:]
+          and b"PK\x06\x07" in response.content[-200:])
+    check("zip64: Content-Length is exact", int(response.headers["content-length"]) == len(response.content))
+    archive, intact = read_bundle(response)
+    check("zip64: CRCs verify", intact)
+    check("zip64: member bytes", [archive.read(name) for name in archive.namelist()]
+          == [OBJECTS["books/a.pdf"], OBJECTS["books/d.pdf"], OBJECTS["books/b.epub"], b""])
+    check("zip64: unzip -t", unzip_ok(response.content))
+
+    os.remove(DB_PATH)
+
+
+if __name__ == "__main__":
+    main_check()
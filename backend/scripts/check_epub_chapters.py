@@ -0,0 +1,153 @@
+# backend/scripts/check_epub_chapters.py
+"""
+EPUB chapter check for /books/{id}/chapters and /books/{id}/chapters/{n}
+Builds EPUBs in memory (EPUB 3 with a nav document, EPUB 2 with an NCX, a
+300-chapter book whose central directory does not fit in the first tail
+read, and one with a long archive comment), serves them from the S3
+stand-in in check_range_requests, and checks chapter lists, titles and
+bytes, plus that a chapter read on a cached index is one small ranged GET.
+
+Usage:
+    python scripts/check_epub_chapters.py
+"""
+
+import io
+import os
+import sys
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from check_range_requests import DB_PATH, StandInS3, check  # sets up the environment first
+
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app import models
+from app.db import SessionLocal
+
+CONTAINER = """<?xml version="1.0"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/></rootfiles>
+</container>"""
+
+
+def chapter_body(n):
+    return (f'<?xml version="1.0"?><html xmlns="http://www.w3.org/1999/xhtml"><body><h1>Chapter {n}</h1>'
+            + "<p>The cannonade went on.</p>" * 200 + "</body></html>").encode()
+
+
+def make_epub(chapters, toc="nav", comment=b""):
+    manifest = "".join(
+        f'<item id="c{n}" href="text/ch%20{n}.xhtml" media-type="application/xhtml+xml"/>' for n in chapters
+    )
+    spine = "".join(f'<itemref idref="c{n}"/>' for n in chapters)
+    if toc == "nav":
+        manifest += '<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>'
+        links = "".join(f'<li><a href="text/ch%20{n}.xhtml#top">Part {n}</a></li>' for n in chapters)
+        toc_path, toc_body = "OEBPS/nav.xhtml", (
+            '<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops"><body>'
+            f'<nav epub:type="toc"><ol>{links}</ol></nav></body></html>'
+        )
+        spine_open = "<spine>"
+    else:
+        manifest += '<item id="ncx" href="toc.ncx" media-type="application/x-dtbncx+xml"/>'
+        points = "".join(
+            f'<navPoint id="p{n}"><navLabel><text>Book {n}</text></navLabel><content src="text/ch%20{n}.xhtml"/></navPoint>'
+            for n in chapters
+        )
+        toc_path, toc_body = "OEBPS/toc.ncx", (
+            f'<ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" version="2005-1"><navMap>{points}</navMap></ncx>'
+        )
+        spine_open = '<spine toc="ncx">'
+    package = (
+        '<package xmlns="http://www.idpf.org/2007/opf" version="3.0">'
+        '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/"><dc:title>War and Peace</dc:title></metadata>'
+        f'<manifest>{manifest}</manifest>{spine_open}{spine}</spine></package>'
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr(zipfile.ZipInfo("mimetype"), "application/epub+zip")
+        archive.writestr("META-INF/container.xml", CONTAINER, zipfile.ZIP_DEFLATED)
+        archive.writestr("OEBPS/content.opf", package, zipfile.ZIP_DEFLATED)
+        archive.writestr(toc_path, toc_body, zipfile.ZIP_DEFLATED)
+        for n in chapters:
+            info = zipfile.ZipInfo(f"OEBPS/text/ch {n}.xhtml")
+            info.compress_type = zipfile.ZIP_DEFLATED if n % 3 else zipfile.ZIP_STORED
+            with archive.open(info, "w", force_zip64=n % 2 == 0) as entry:
+                entry.write(chapter_body(n))
+        archive.comment = comment
+    return buffer.getvalue()
+
+
+def main_check():
+    objects = {
+        "books/nav.epub": make_epub(range(1, 6)),
+        "books/ncx.epub": make_epub(range(1, 4), toc="ncx"),
+        "books/long.epub": make_epub(range(1, 301)),
+        "books/comment.epub": make_epub(range(1, 3), comment=b"x" * 30000),
+        "books/broken.epub": b"not a zip at all",
+        # A valid end record pointing at a central directory of garbage
+        "books/garbled.epub": b"PK\x01\x02" + b"\xff" * 10 + b"PK\x05\x06" + bytes(4) + b"\x01\x00\x01\x00"
+                              + (14).to_bytes(4, "little") + bytes(4) + bytes(2),
+    }
+    s3 = StandInS3(objects)
+    main.s3_internal = s3
+    main.s3_presign = s3
+
+    db = SessionLocal()
+    books = {key: models.Book(title=key, filename=key.split("/")[1], s3_key=key) for key in objects}
+    books["pdf"] = models.Book(title="pdf", filename="a.pdf", s3_key="books/a.pdf")
+    books["gone"] = models.Book(title="gone", filename="gone.epub", s3_key="books/gone.epub")
+    db.add_all(books.values())
+    db.commit()
+    ids = {key: book.id for key, book in books.items()}
+    db.close()
+
+    client = TestClient(main.app)
+
+    response = client.get(f"/books/{ids['books/nav.epub']}/chapters")
+    chapters = response.json()["chapters"]
+    check("nav: spine order with nav titles",
+          [(c["number"], c["title"]) for c in chapters] == [(n, f"Part {n}") for n in range(1, 6)])
+    check("nav: package title", response.json()["title"] == "War and Peace")
+    check("nav: member paths resolved and unescaped", chapters[0]["href"] == "OEBPS/text/ch 1.xhtml")
+
+    url = f"/books/{ids['books/nav.epub']}/chapters"
+    response = client.get(f"{url}/4")
+    check("chapter: deflated bytes", response.status_code == 200 and response.content == chapter_body(4))
+    check("chapter: media type", response.headers["content-type"].startswith("application/xhtml+xml"))
+    response = client.get(f"{url}/3")
+    check("chapter: stored bytes", response.content == chapter_body(3))
+    response = client.get(f"{url}/3", headers={"If-None-Match": response.headers["etag"]})
+    check("chapter: 304 on a matching ETag", response.status_code == 304)
+
+    response = client.get(f"/books/{ids['books/ncx.epub']}/chapters")
+    check("ncx: titles from the NCX", [c["title"] for c in response.json()["chapters"]] == ["Book 1", "Book 2", "Book 3"])
+
+    response = client.get(f"/books/{ids['books/long.epub']}/chapters")
+    check("300 chapters: directory read past the tail", len(response.json()["chapters"]) == 300)
+    gets = len(s3.gets)
+    response = client.get(f"/books/{ids['books/long.epub']}/chapters/40")
+    start, end = (int(part) for part in s3.gets[-1][len("bytes="):].split("-"))
+    check("chapter 40: bytes", response.content == chapter_body(40))
+    check("chapter 40: one ranged GET of a few KB", len(s3.gets) == gets + 1 and end - start + 1 < 4096)
+    check("chapter 40: far less than the archive", end - start + 1 < len(objects["books/long.epub"]) // 100)
+
+    response = client.get(f"/books/{ids['books/comment.epub']}/chapters/2")
+    check("long archive comment: end record still found", response.content == chapter_body(2))
+
+    check("chapter out of range: 404", client.get(f"{url}/6").status_code == 404)
+    check("not an EPUB: 400", client.get(f"/books/{ids['pdf']}/chapters").status_code == 400)
+    check("corrupt EPUB: 422", client.get(f"/books/{ids['books/broken.epub']}/chapters").status_code == 422)
+    check("garbled central directory: 422",
+          client.get(f"/books/{ids['books/garbled.epub']}/chapters/1").status_code == 422)
+    check("object missing from storage: 404", client.get(f"/books/{ids['gone']}/chapters").status_code == 404
+          and client.get(f"/books/{ids['gone']}/chapters/1").status_code == 404)
+    check("index cached per book", client.get("/cache/stats").json()["epub_indexes"]["builds"] == 4)
+
+    os.remove(DB_PATH)
+
+
+if __name__ == "__main__":
+    main_check()
@@ -0,0 +1,150 @@
+# backend/scripts/check_range_requests.py
+"""
+Range / If-Range check for inline PDF streaming
+Runs GET /books/{id}/download?inline=true against an in-memory S3 stand-in
+(head_object / get_object with Range and IfMatch, like S3 and MinIO) and a
+throwaway SQLite database, then checks 200, 206, multipart/byteranges, 416
+and If-Range responses byte for byte.
+
+Usage:
+    python scripts/check_range_requests.py
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "ranges.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+# Exercise the S3 path; cache hits are ranged by FileResponse
+os.environ["OBJECT_CACHE_MAX_BYTES"] = "0"
+for key, value in {"S3_ACCESS_KEY": "check", "S3_SECRET_KEY": "check", "S3_BUCKET": "check"}.items():
+    os.environ.setdefault(key, value)
+
+from botocore.exceptions import ClientError
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app import models
+from app.db import SessionLocal
+
+CONTENT = bytes(range(256)) * 4096  # 1 MiB, every offset distinguishable
+ETAG = '"0123456789abcdef0123456789abcdef"'
+LAST_MODIFIED = datetime(2024, 5, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+
+class StandInBody:
+    def __init__(self, data):
+        self.data = data
+
+    def iter_chunks(self, chunk_size):
+        for offset in range(0, len(self.data), chunk_size):
+            yield self.data[offset:offset + chunk_size]
+
+    def close(self):
+        pass
+
+
+class StandInS3:
+    """The subset of the S3 API the inline reader uses, over one in-memory object"""
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.gets = []
+
+    def _object(self, Key):
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        return self.objects[Key]
+
+    def head_object(self, Bucket, Key):
+        data = self._object(Key)
+        return {"ContentLength": len(data), "ETag": ETAG, "LastModified": LAST_MODIFIED}
+
+    def get_object(self, Bucket, Key, Range=None, IfMatch=None):
+        data = self._object(Key)
+        self.gets.append(Range)
+        if IfMatch is not None and IfMatch != ETAG:
+            raise ClientError({"Error": {"Code": "PreconditionFailed"}}, "GetObject")
+        if Range:
+            start, end = (int(part) for part in Range[len("bytes="):].split("-"))
+            data = data[start:end + 1]
+        return {"ContentLength": len(data), "ETag": ETAG, "LastModified": LAST_MODIFIED, "Body": StandInBody(data)}
+
+
+def check(label, condition):
+    if not condition:
+        raise SystemExit(f"❌ {label}")
+    print(f"✅ {label}")
+
+
+def main_check():
+    s3 = StandInS3({"books/check.pdf": CONTENT})
+    main.s3_internal = s3
+    main.s3_presign = s3
+
+    db = SessionLocal()
+    book = models.Book(title="Range check", filename="check.pdf", s3_key="books/check.pdf", is_public=True)
+    db.add(book)
+    db.commit()
+    url = f"/books/{book.id}/download?inline=true"
+    db.close()
+
+    client = TestClient(main.app)
+
+    response = client.get(url)
+    check("no Range: 200 with the whole file", response.status_code == 200 and response.content == CONTENT)
+    check("no Range: Accept-Ranges advertised", response.headers.get("accept-ranges") == "bytes")
+
+    response = client.get(url, headers={"Range": "bytes=100-199"})
+    check("single range: 206 with exactly those bytes",
+          response.status_code == 206 and response.content == CONTENT[100:200])
+    check("single range: Content-Range",
+          response.headers["content-range"] == f"bytes 100-199/{len(CONTENT)}")
+    check("single range: only that range was fetched from S3", s3.gets[-1] == "bytes=100-199")
+
+    response = client.get(url, headers={"Range": "bytes=-500"})
+    check("suffix range: last 500 bytes", response.status_code == 206 and response.content == CONTENT[-500:])
+
+    response = client.get(url, headers={"Range": f"bytes={len(CONTENT) - 10}-"})
+    check("open-ended range: to the end", response.content == CONTENT[-10:])
+
+    response = client.get(url, headers={"Range": "bytes=0-9,1000-1009"})
+    content_type = response.headers["content-type"]
+    check("multi-range: 206 multipart/byteranges",
+          response.status_code == 206 and content_type.startswith("multipart/byteranges; boundary="))
+    boundary = content_type.split("boundary=")[1]
+    parts = [part for part in response.content.split(f"--{boundary}".encode()) if part.strip(b"\r\n-")]
+    bodies = [part.split(b"\r\n\r\n", 1)[1][:-2] for part in parts]
+    check("multi-range: both parts, in order", bodies == [CONTENT[0:10], CONTENT[1000:1010]])
+    check("multi-range: Content-Length matches the body",
+          int(response.headers["content-length"]) == len(response.content))
+
+    response = client.get(url, headers={"Range": "bytes=0-99,50-149"})
+    check("overlapping ranges are coalesced",
+          response.status_code == 206 and response.content == CONTENT[0:150])
+
+    response = client.get(url, headers={"Range": f"bytes={len(CONTENT)}-"})
+    check("unsatisfiable: 416 with bytes */size",
+          response.status_code == 416 and response.headers["content-range"] == f"bytes */{len(CONTENT)}")
+
+    response = client.get(url, headers={"Range": "bytes=oops"})
+    check("malformed Range is ignored", response.status_code == 200 and response.content == CONTENT)
+
+    response = client.get(url, headers={"Range": "bytes=0-9", "If-Range": ETAG})
+    check("If-Range with the current ETag: 206", response.status_code == 206)
+
+    response = client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    check("If-Range with a stale ETag: full 200", response.status_code == 200 and response.content == CONTENT)
+
+    response = client.get(url, headers={"Range": "bytes=0-9", "If-Range": "Wed, 01 May 2024 12:00:00 GMT"})
+    check("If-Range with the current date: 206", response.status_code == 206)
+
+    os.remove(DB_PATH)
+
+
+if __name__ == "__main__":
+    main_check()
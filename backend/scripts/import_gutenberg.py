@@ -20,6 +20,8 @@ from botocore.client import Config as BotoConfig
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 
+from app.dedupe import align_existing, existence_query, key_fields
+
 # Database URL from environment
 DATABASE_URL = os.getenv('DATABASE_URL', 'postgresql://postgres:postgres@db:5432/postgres')
 
@@ -29,6 +31,9 @@ S3_ACCESS_KEY = os.getenv('S3_ACCESS_KEY', 'minioadmin')
 S3_SECRET_KEY = os.getenv('S3_SECRET_KEY', 'minioadmin')
 S3_BUCKET = os.getenv('S3_BUCKET', 'digital-library')
 
+# Queue imported books for the search index when Meilisearch is in use
+MEILISEARCH_HOST = os.getenv('MEILISEARCH_HOST')
+
 class GutenbergImporter:
     def __init__(self):
         self.engine = create_engine(DATABASE_URL)
@@ -151,14 +156,17 @@ class GutenbergImporter:
             print(f"   ❌ S3 upload failed: {e}")
             return None
     
+    def author_string(self, book_data):
+        """Author names as stored in the books table"""
+        authors = [author.get('name', 'Unknown') for author in book_data.get('authors', [])]
+        return ', '.join(authors) if authors else 'Unknown Author'
+    
     def save_to_database(self, book_data, s3_key, file_size):
         """Save book metadata to database"""
         try:
             session = self.Session()
             
-            # Extract author names
-            authors = [author.get('name', 'Unknown') for author in book_data.get('authors', [])]
-            author_str = ', '.join(authors) if authors else 'Unknown Author'
+            author_str = self.author_string(book_data)
             
             # Extract subjects for tags and genre
             subjects = book_data.get('subjects', [])
@@ -169,21 +177,27 @@ class GutenbergImporter:
                 INSERT INTO books (
                     title, author, description, filename, s3_key,
                     copyright_status, license, source, source_url, 
+                    dedupe_key, source_id,
                     language, genre, tags, file_size,
                     is_public, is_featured, download_count, view_count,
                     created_at, updated_at, verification_date
                 ) VALUES (
                     :title, :author, :description, :filename, :s3_key,
                     :copyright_status, :license, :source, :source_url,
+                    :dedupe_key, :source_id,
                     :language, :genre, :tags, :file_size,
                     :is_public, :is_featured, :download_count, :view_count,
                     CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
                 )
+                RETURNING id
             """)
             
-            session.execute(insert_query, {
-                'title': book_data['title'][:255],  # Limit length
-                'author': author_str[:255],
+            title = book_data['title'][:255]  # Limit length
+            author = author_str[:255]
+            
+            book_id = session.execute(insert_query, {
+                'title': title,
+                'author': author,
                 'description': f"Classic literature from Project Gutenberg. Subjects: {', '.join(subjects[:3])}",
                 'filename': f"{book_data['title'][:50]}.pdf",
                 's3_key': s3_key,
@@ -191,6 +205,7 @@ class GutenbergImporter:
                 'license': 'Public Domain',
                 'source': 'Project Gutenberg',
                 'source_url': book_data['gutenberg_url'],
+                **key_fields(title, author, book_data['gutenberg_url']),
                 'language': 'en',
                 'genre': genre[:100],
                 'tags': json.dumps(subjects[:5]),  # First 5 subjects as tags
@@ -199,7 +214,13 @@ class GutenbergImporter:
                 'is_featured': book_data['download_count'] > 1000,  # Feature popular books
                 'download_count': 0,
                 'view_count': 0
-            })
+            }).scalar()
+            
+            if MEILISEARCH_HOST:
+                session.execute(
+                    text("INSERT INTO search_outbox (book_id, op) VALUES (:book_id, 'upsert')"),
+                    {'book_id': book_id}
+                )
             
             session.commit()
             session.close()
@@ -214,18 +235,33 @@ class GutenbergImporter:
                 session.close()
             return False
     
-    def book_exists(self, gutenberg_id):
-        """Check if book already exists in database"""
+    def invalidate_stats_snapshot(self):
+        """Rows were inserted behind the API's back - let /stats rebuild its snapshot"""
         try:
             session = self.Session()
-            result = session.execute(
-                text("SELECT COUNT(*) FROM books WHERE source_url LIKE :url"),
-                {'url': f'%gutenberg.org/ebooks/{gutenberg_id}%'}
-            ).scalar()
+            session.execute(text("DELETE FROM book_stats"))
+            session.commit()
             session.close()
-            return result > 0
-        except:
-            return False
+        except Exception as e:
+            print(f"   ⚠️ Could not reset stats snapshot: {e}")
+    
+    def existing_books(self, books):
+        """Which books are already in the database, by Gutenberg id or title + author
+
+        Same single indexed query as POST /books/exists, run once for the whole list.
+        """
+        candidates = [
+            (book['title'][:255], self.author_string(book)[:255], f"gutenberg:{book['id']}")
+            for book in books
+        ]
+        try:
+            session = self.Session()
+            rows = session.execute(existence_query(candidates, self.engine.dialect.name)).all()
+            session.close()
+            return [match is not None for match in align_existing(rows, candidates)]
+        except Exception as e:
+            print(f"   ⚠️ Duplicate check failed: {e}")
+            return [False] * len(books)
     
     def import_books(self, limit=100, start_from=0):
         """Main import process"""
@@ -244,11 +280,13 @@ class GutenbergImporter:
         skip_count = 0
         error_count = 0
         
-        for i, book_data in enumerate(books, 1):
+        already_imported = self.existing_books(books) if books else []
+        
+        for i, (book_data, exists) in enumerate(zip(books, already_imported), 1):
             print(f"\n📖 [{i}/{len(books)}] Processing: {book_data['title'][:60]}...")
             
             # Check if already exists
-            if self.book_exists(book_data['id']):
+            if exists:
                 print(f"   ⏭️ Already exists, skipping")
                 skip_count += 1
                 continue
@@ -275,6 +313,9 @@ class GutenbergImporter:
             # Respectful delay
             time.sleep(2)
         
+        if success_count:
+            self.invalidate_stats_snapshot()
+        
         print(f"\n🏁 Import completed!")
         print(f"✅ Successfully imported: {success_count} books")
         print(f"⏭️ Skipped (already exist): {skip_count} books")
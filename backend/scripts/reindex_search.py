@@ -0,0 +1,41 @@
+# backend/scripts/reindex_search.py
+"""
+Rebuild the Meilisearch index from the books table
+Run after enabling MEILISEARCH_HOST for the first time, after restoring a
+database backup, or whenever the index is suspected to have drifted.
+Day-to-day changes reach the index through the search_outbox table.
+
+Usage:
+    MEILISEARCH_HOST=http://meilisearch:7700 python scripts/reindex_search.py [--batch-size 1000]
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.db import SessionLocal
+from app.search_engine import SearchEngineError, reindex_all
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Rebuild the Meilisearch books index')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Books per indexing request (default: 1000)')
+
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        total = reindex_all(session, batch_size=args.batch_size)
+        print(f"✅ Reindexed {total} books")
+    except SearchEngineError as e:
+        print(f"❌ Reindex failed: {e}")
+        sys.exit(1)
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -53,32 +53,31 @@ Path(DOWNLOAD_DIR).mkdir(parents=True, exist_ok=True)
 # CHECK EXISTING BOOKS
 # ============================================================================
 
-def get_existing_books() -> List[Dict]:
-    """Get all books from database"""
-    try:
-        print("   Checking existing books...")
-        response = requests.get(f"{API_BASE_URL}/books", timeout=10)
-        if response.status_code == 200:
-            books = response.json()
-            print(f"   ✅ Found {len(books)} books")
-            return books
-        return []
-    except:
-        return []
+EXISTS_BATCH_SIZE = 1000
 
-def is_duplicate(book_info: Dict, existing_books: List[Dict]) -> bool:
-    """Check if book exists"""
-    title_lower = book_info['title'].lower().strip()
-    author_lower = book_info['author'].lower().strip()
-    
-    for existing in existing_books:
-        existing_title = (existing.get('title') or '').lower().strip()
-        existing_author = (existing.get('author') or '').lower().strip()
-        
-        if existing_title == title_lower and existing_author == author_lower:
-            return True
-    
-    return False
+def find_existing(books: List[Dict]) -> Optional[List[bool]]:
+    """Ask the server which books already exist (POST /books/exists, batched)
+
+    Matching is casefolded and accent-insensitive on title + author, served
+    by an index - no need to download the whole catalogue first.
+    """
+    try:
+        print(f"   Checking {len(books)} books against the library...")
+        exists = []
+        for start in range(0, len(books), EXISTS_BATCH_SIZE):
+            batch = books[start:start + EXISTS_BATCH_SIZE]
+            response = requests.post(
+                f"{API_BASE_URL}/books/exists",
+                json={"books": [{"title": book['title'], "author": book.get('author')} for book in batch]},
+                timeout=30
+            )
+            response.raise_for_status()
+            exists.extend(match is not None for match in response.json()["results"])
+        print(f"   ✅ {sum(exists)} already in the library")
+        return exists
+    except Exception as e:
+        print(f"   ⚠️ Duplicate check failed: {e}")
+        return None
 
 def filter_new_books(books: List[Dict]) -> tuple[List[Dict], List[Dict]]:
     """Filter out duplicates"""
@@ -86,13 +85,13 @@ def filter_new_books(books: List[Dict]) -> tuple[List[Dict], List[Dict]]:
     print("CHECKING FOR DUPLICATES")
     print("="*70)
     
-    existing_books = get_existing_books()
+    exists = find_existing(books) or [False] * len(books)
     
     new_books = []
     duplicates = []
     
-    for book in books:
-        if is_duplicate(book, existing_books):
+    for book, already_there in zip(books, exists):
+        if already_there:
             duplicates.append(book)
         else:
             new_books.append(book)
@@ -2,7 +2,7 @@
 """
 Update Book Covers via API
 ===========================
-Uses your existing PUT /books/{book_id} endpoint to update covers
+Sends the covers in batches to PATCH /api/v1/books/bulk
 
 Usage:
     python update_covers_via_api.py
@@ -11,28 +11,28 @@ Usage:
 import json
 import requests
 import sys
-import time
 
 API_BASE_URL = "http://localhost:8000"
+BATCH_SIZE = 1000
 
-def update_book_cover(book_id: int, cover_url: str) -> bool:
-    """Update a book's cover_url via API"""
+def update_book_covers(covers: dict) -> dict:
+    """Update cover_url for a batch of {book_id: cover_url}; returns {book_id: status}"""
     try:
-        response = requests.put(
-            f"{API_BASE_URL}/api/books/{book_id}",
-            json={"cover_url": cover_url},
-            timeout=10
+        response = requests.patch(
+            f"{API_BASE_URL}/api/v1/books/bulk",
+            json={"updates": [
+                {"id": int(book_id), "fields": {"cover_url": cover_url}}
+                for book_id, cover_url in covers.items()
+            ]},
+            timeout=60
         )
         
         if response.status_code == 200:
-            print(f"   ✅ Updated book {book_id}")
-            return True
-        else:
-            print(f"   ❌ Failed (status {response.status_code}): {response.text[:50]}")
-            return False
+            return {result["id"]: result["status"] for result in response.json()["results"]}
+        print(f"   ❌ Batch failed (status {response.status_code}): {response.text[:100]}")
     except Exception as e:
-        print(f"   ❌ Error: {str(e)[:50]}")
-        return False
+        print(f"   ❌ Error: {str(e)[:100]}")
+    return {int(book_id): "failed" for book_id in covers}
 
 def main():
     print("""
@@ -70,17 +70,17 @@ def main():
     successful = 0
     failed = 0
     
-    for idx, (book_id, cover_url) in enumerate(cover_mapping.items(), 1):
-        print(f"[{idx}/{len(cover_mapping)}] Book ID {book_id}")
-        
-        if update_book_cover(int(book_id), cover_url):
-            successful += 1
-        else:
-            failed += 1
+    items = list(cover_mapping.items())
+    for start in range(0, len(items), BATCH_SIZE):
+        batch = dict(items[start:start + BATCH_SIZE])
+        print(f"[{start + 1}-{start + len(batch)}/{len(cover_mapping)}] Updating batch...")
         
-        # Rate limiting
-        if idx % 5 == 0:
-            time.sleep(1)
+        for book_id, status in update_book_covers(batch).items():
+            if status == "updated":
+                successful += 1
+            else:
+                failed += 1
+                print(f"   ❌ Book ID {book_id}: {status}")
     
     # Summary
     print("\n" + "="*70)